@@ -0,0 +1,252 @@
+### backtest.py - Walk-forward HR prop backtest against historical lines
+# For every player x model version, predictions are made walk-forward: C is tuned
+# (warm-started C path, TimeSeriesSplit AUC) on the first training window only —
+# re-tuned every RETUNE_EVERY blocks if asked — and at each retrain boundary the
+# model (manifest features) is refit, warm-started, on games strictly before it,
+# then scores the block that follows. No C is chosen with later games in view.
+# Predictions are joined to a local odds file and every threshold is evaluated
+# at once with array operations — bet selection, P&L, ROI, drawdown, and
+# closing-line value (CLV).
+#
+# Odds file (default data/odds/hr_odds.csv), one row per player-game line:
+#   date, player_id, game_id, odds[, closing_odds]     American odds for 1+ HR
+# game_id (MLB gamePk; game_pk is accepted too) keeps doubleheader lines apart.
+#
+# Usage:
+#   python scripts/backtest.py                                  # active versions, all players
+#   python scripts/backtest.py witt julio --versions all --thresholds 0 0.02 0.05
+#   python scripts/backtest.py --retrain-every QS --retune-every 6 --workers 8
+
+import argparse
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import registry
+from model_training import TRAINING_PLAYERS, c_path_cv, design_matrix
+
+BASE_DIR       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ODDS_PATH      = os.path.join(BASE_DIR, "data", "odds", "hr_odds.csv")
+EXPERIMENT_DIR = os.path.join(BASE_DIR, "data", "experiments")
+
+THRESHOLDS    = [0.0, 0.02, 0.03, 0.05, 0.08]   # min edge (model prob - book implied prob) to bet
+RETRAIN_EVERY = "MS"                             # pandas offset alias — month start
+MIN_TRAIN     = 150                              # games required before the first prediction
+RETUNE_EVERY  = 0                                # re-tune C every N retrain blocks (0: first window only)
+
+
+# ─────────────────────────────────────────────
+# ODDS MATH (vectorized)
+# ─────────────────────────────────────────────
+
+def implied_prob(odds):
+    odds = np.asarray(odds, dtype="float64")
+    return np.where(odds < 0, -odds / (-odds + 100), 100 / (odds + 100))
+
+
+def payout(odds):
+    """Profit per 1 unit staked on a win."""
+    odds = np.asarray(odds, dtype="float64")
+    return np.where(odds < 0, 100 / -odds, odds / 100)
+
+
+ODDS_KEY = ["date", "player_id", "game_id"]
+
+
+def load_odds(path=ODDS_PATH):
+    odds = pd.read_csv(path, parse_dates=["date"]).rename(columns={"game_pk": "game_id"})
+    if "game_id" not in odds.columns:
+        raise ValueError(f"{path}: needs a game_id (gamePk) column — date + player_id is ambiguous for doubleheaders")
+    if "closing_odds" not in odds.columns:
+        odds["closing_odds"] = np.nan
+    return odds[ODDS_KEY + ["odds", "closing_odds"]]
+
+
+# ─────────────────────────────────────────────
+# WALK-FORWARD PREDICTIONS
+# ─────────────────────────────────────────────
+
+def _tune_c(X, y):
+    """Best C by mean fold AUC along the warm-started path, or None if no fold could be scored."""
+    path = c_path_cv(X, y)
+    mean_auc = np.nanmean(path["auc"], axis=1)
+    if np.isnan(mean_auc).all():
+        return None
+    return path["c_grid"][int(np.nanargmax(mean_auc))]
+
+
+def walk_forward(df, features, retrain_every=RETRAIN_EVERY, min_train=MIN_TRAIN, retune_every=RETUNE_EVERY):
+    """
+    Out-of-sample P(HR) per game. C is tuned (c_path_cv) on the first training
+    window — and again every retune_every blocks when > 0 — using earlier games
+    only. Each retrain boundary refits on all earlier games, warm-started from
+    the previous block's coefficients, and scores every game in the block at
+    once. Games before min_train rows of history get NaN; the C used for each
+    game is kept in column C.
+    """
+    df = df.dropna(subset=features).sort_values(["date", "game_id"]).reset_index(drop=True)
+    X  = df[features].to_numpy(dtype="float64")
+    y  = (df["hr"] >= 1).astype(int).to_numpy()
+    dates = df["date"].to_numpy()
+
+    p = np.full(len(df), np.nan)
+    c = np.full(len(df), np.nan)
+    boundaries = pd.date_range(df["date"].min(), df["date"].max() + pd.Timedelta(days=1), freq=retrain_every)
+    edges = np.searchsorted(dates, boundaries.to_numpy(), side="left").tolist() + [len(df)]
+
+    C, blocks = None, 0
+    model = LogisticRegression(max_iter=500, warm_start=True)
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start < min_train or end <= start or len(np.unique(y[:start])) < 2:
+            continue
+
+        if C is None or (retune_every and blocks % retune_every == 0):
+            C = _tune_c(X[:start], y[:start]) or C
+            if C is None:
+                continue
+        blocks += 1
+
+        scaler = StandardScaler().fit(X[:start])
+        model.set_params(C=C)
+        model.fit(scaler.transform(X[:start]), y[:start])
+        p[start:end] = model.predict_proba(scaler.transform(X[start:end]))[:, 1]
+        c[start:end] = C
+
+    df["p_hr"] = p
+    df["C"]    = c
+    return df
+
+
+# ─────────────────────────────────────────────
+# BET EVALUATION
+# ─────────────────────────────────────────────
+
+def evaluate_bets(p_hr, hit, odds, closing_odds, thresholds=THRESHOLDS):
+    """
+    One row per threshold: bets where edge > threshold, flat 1-unit stakes.
+    Thresholds are broadcast against games — no per-game or per-threshold loop
+    over the P&L.
+    """
+    thresholds = np.asarray(thresholds, dtype="float64")[:, None]
+    edge   = p_hr - implied_prob(odds)
+    profit = np.where(hit, payout(odds), -1.0)
+    bets   = edge[None, :] > thresholds                            # (thresholds, games)
+
+    pnl    = np.where(bets, profit[None, :], 0.0)
+    equity = np.cumsum(pnl, axis=1)
+    peak   = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    n_bets = bets.sum(axis=1)
+
+    clv      = implied_prob(closing_odds) - implied_prob(odds)     # > 0: got a better price than the close
+    has_clv  = bets & ~np.isnan(clv)[None, :]
+    clv_bets = np.where(has_clv, clv[None, :], 0.0)
+    n_clv    = has_clv.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame({
+            "threshold":    thresholds[:, 0],
+            "n_bets":       n_bets,
+            "hits":         (bets & hit[None, :]).sum(axis=1),
+            "pnl":          pnl.sum(axis=1).round(2),
+            "roi":          (pnl.sum(axis=1) / n_bets).round(4),
+            "max_drawdown": (peak - equity).max(axis=1).round(2),
+            "avg_edge":     (np.where(bets, edge[None, :], 0.0).sum(axis=1) / n_bets).round(4),
+            "avg_clv":      (clv_bets.sum(axis=1) / n_clv).round(4),
+            "beat_close":   (((clv_bets > 0) & has_clv).sum(axis=1) / n_clv).round(3),
+        })
+
+
+def backtest_config(key, version, features, df, odds, thresholds, retrain_every, retune_every=RETUNE_EVERY):
+    """Walk-forward one player x version and evaluate every threshold. Runs in a worker."""
+    warnings.filterwarnings("ignore")
+    df = walk_forward(df, features, retrain_every, retune_every=retune_every)
+    df = df.dropna(subset=["p_hr"]).merge(odds, on=ODDS_KEY, how="inner")
+    if df.empty:
+        return pd.DataFrame()
+
+    result = evaluate_bets(
+        df["p_hr"].to_numpy(), (df["hr"] >= 1).to_numpy(),
+        df["odds"].to_numpy(), df["closing_odds"].to_numpy(), thresholds,
+    )
+    result.insert(0, "version", version)
+    result.insert(0, "player", key)
+    result.insert(2, "games_priced", len(df))
+    result.insert(3, "median_C", float(df["C"].median()))
+    return result
+
+
+def run_backtests(keys=None, versions="active", thresholds=THRESHOLDS, retrain_every=RETRAIN_EVERY,
+                  odds_path=ODDS_PATH, workers=None, retune_every=RETUNE_EVERY):
+    """Every player x version config in parallel; returns one results table."""
+    keys = keys or list(TRAINING_PLAYERS)
+    odds = load_odds(odds_path)
+
+    configs = []
+    for key in keys:
+        entries = registry.entries(key)
+        if versions == "active":
+            entries = [registry.resolve(key)] if entries else []
+        elif versions != "all":
+            entries = [e for e in entries if e["version"] in versions]
+        for e in entries:
+            configs.append((key, e["version"], e["features"]))
+
+    # Design matrices are read (or built) once here — never concurrently in
+    # workers, which would race on the same feature-store file
+    matrices = {key: design_matrix(key) for key in sorted({key for key, _, _ in configs})}
+
+    print(f"🚀 Backtesting {len(configs)} player x version configs x {len(thresholds)} thresholds")
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(backtest_config, key, version, features, matrices[key], odds, thresholds,
+                        retrain_every, retune_every): (key, version)
+            for key, version, features in configs
+        }
+        for future in as_completed(futures):
+            key, version = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  ❌ {key} {version}: {e}")
+                continue
+            if result.empty:
+                print(f"  ⚠️ {key} {version}: no priced out-of-sample games")
+                continue
+            frames.append(result)
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values(["player", "version", "threshold"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest against historical HR prop lines.")
+    parser.add_argument("players", nargs="*", help="players to backtest (default: all in TRAINING_PLAYERS)")
+    parser.add_argument("--versions", nargs="*", default=["active"],
+                        help="'active' (default), 'all', or explicit versions like v9 v10")
+    parser.add_argument("--thresholds", nargs="*", type=float, default=THRESHOLDS)
+    parser.add_argument("--retrain-every", default=RETRAIN_EVERY, help="pandas offset alias, e.g. MS, QS, W")
+    parser.add_argument("--retune-every", type=int, default=RETUNE_EVERY,
+                        help="re-tune C every N retrain blocks (default 0: tune once on the first window)")
+    parser.add_argument("--odds", default=ODDS_PATH, help="historical odds CSV")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    versions = args.versions[0] if args.versions in (["active"], ["all"]) else args.versions
+    results  = run_backtests(args.players, versions, args.thresholds, args.retrain_every, args.odds, args.workers,
+                             args.retune_every)
+    if results.empty:
+        print("❌ No results.")
+    else:
+        os.makedirs(EXPERIMENT_DIR, exist_ok=True)
+        path = os.path.join(EXPERIMENT_DIR, f"backtest_{datetime.now():%Y%m%d_%H%M%S}.csv")
+        results.to_csv(path, index=False)
+        print(results.to_string(index=False))
+        print(f"\n✅ {len(results)} rows -> {os.path.relpath(path, BASE_DIR)}")
@@ -1,53 +1,66 @@
 ### data_collection.py - Fetch & Store Player Game Logs + Opposing Pitcher Stats
 # Refactored to be player-agnostic — supports Witt, Schwarber, and future players
 # All player-specific data keyed by player_id, not player name
+#
+# Importing this module has no side effects: no DB connection, no DDL.
+# The engine is created on first use (get_engine) and the schema is set up
+# explicitly with `python scripts/data_collection.py init-schema`.
+
+import argparse
+import io
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-import subprocess
+import pandas as pd
+import requests
+import sqlalchemy
+from sqlalchemy import create_engine, MetaData, Table, text
 
-try:
-    import requests
-except ModuleNotFoundError:
-    subprocess.run(["pip", "install", "requests"], check=True)
-    import requests
+import mlb_api
 
-try:
-    import pandas as pd
-except ModuleNotFoundError:
-    subprocess.run(["pip", "install", "pandas"], check=True)
-    import pandas as pd
 
-try:
-    import sqlalchemy
-except ModuleNotFoundError:
-    subprocess.run(["pip", "install", "sqlalchemy"], check=True)
-    import sqlalchemy
+# ─────────────────────────────────────────────
+# ENGINE
+# Lazy — predict.py and notebooks import this module without connecting
+# ─────────────────────────────────────────────
 
-try:
-    import psycopg2
-except ModuleNotFoundError:
-    subprocess.run(["pip", "install", "psycopg2-binary"], check=True)
-    import psycopg2
+_engine = None
 
-from sqlalchemy import create_engine, MetaData, Table, text
-from sqlalchemy.dialects.postgresql import insert
-from config import DATABASE_URL
-from datetime import datetime
 
-engine = create_engine(DATABASE_URL)
+def get_engine():
+    """Create the SQLAlchemy engine on first use and reuse it for the process."""
+    global _engine
+    if _engine is None:
+        from config import DATABASE_URL
+        _engine = create_engine(DATABASE_URL)
+    return _engine
+
+
+def __getattr__(name):
+    # Keeps `from data_collection import engine` working in notebooks and one-off scripts
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ─────────────────────────────────────────────
 # PLAYERS
-# Add new players here — player_id from MLB Stats API
+# Add new players here — player_id from MLB Stats API; key is the model
+# registry name (models/manifest.json, predict.py)
 # ─────────────────────────────────────────────
 
 PLAYERS = {
-    677951: {"name": "Bobby Witt Jr.",      "team_id": 118, "bats": "R"},
-    677594: {"name": "Julio Rodriguez",     "team_id": 136, "bats": "R"},
-    682985: {"name": "Riley Greene",        "team_id": 116, "bats": "L"},
-    694192: {"name": "Jackson Chourio", "team_id": 158, "bats": "R"},
-    686611: {"name": "Dylan Crews",     "team_id": 120, "bats": "R"},
-
+    677951: {"key": "witt",      "name": "Bobby Witt Jr.",      "team_id": 118, "bats": "R"},
+    677594: {"key": "julio",     "name": "Julio Rodriguez",     "team_id": 136, "bats": "R"},
+    682985: {"key": "greene",    "name": "Riley Greene",        "team_id": 116, "bats": "L"},
+    694192: {"key": "chourio",   "name": "Jackson Chourio",     "team_id": 158, "bats": "R"},
+    686611: {"key": "crews",     "name": "Dylan Crews",         "team_id": 120, "bats": "R"},
+    663757: {"key": "grisham",   "name": "Trent Grisham",       "team_id": 147, "bats": "L"},
+    683002: {"key": "henderson", "name": "Gunnar Henderson",    "team_id": 110, "bats": "L"},
+    608070: {"key": "ramirez",   "name": "Jose Ramirez",        "team_id": 114, "bats": "S"},
+    656941: {"key": "schwarber", "name": "Kyle Schwarber",      "team_id": 143, "bats": "L"},
 }
 
 
@@ -89,42 +102,97 @@ PARK_FACTORS = {
 }
 
 
+# ─────────────────────────────────────────────
+# CONCURRENCY
+# Worker pool size for per-game fan-out — request rate is capped
+# globally in mlb_api (REQUESTS_PER_SECOND), shared by every worker
+# ─────────────────────────────────────────────
+
+MAX_WORKERS = 8
+
+
 # ─────────────────────────────────────────────
 # UPSERT HELPER
 # ─────────────────────────────────────────────
 
+_table_cache = {}
+
+
+def get_table(table_name):
+    """Reflect a table once per process — every later upsert reuses the cached schema."""
+    if table_name not in _table_cache:
+        _table_cache[table_name] = Table(table_name, MetaData(), autoload_with=get_engine())
+    return _table_cache[table_name]
+
+
 def upsert_table(df, table_name, unique_columns):
-    # Build upsert from DataFrame columns directly — avoids SQLAlchemy reflection
-    # caching stale schema and missing newly added columns like gb_rate
-    records = df.to_dict(orient="records")
-    if not records:
+    """
+    Bulk upsert: stream df through COPY into a temp staging table, then merge
+    with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE from staging.
+
+    Only the DataFrame's columns are written/updated — a table can gain new
+    columns (like gb_rate) without every caller having to supply them.
+    """
+    if df.empty:
         return
 
-    with engine.connect() as conn:
-        metadata = MetaData()
-        table = Table(table_name, metadata, autoload_with=engine)
-        stmt = insert(table).values(records)
-        # Build update set from DataFrame columns, not table reflection
-        update_columns = {
-            col: stmt.excluded[col]
-            for col in df.columns
-            if col not in unique_columns
-        }
-        upsert_stmt = stmt.on_conflict_do_update(
-            index_elements=unique_columns,
-            set_=update_columns
-        )
-        conn.execute(upsert_stmt)
-        conn.commit()
+    table = get_table(table_name)
+    missing = [col for col in df.columns if col not in table.c]
+    if missing:
+        raise ValueError(f"{table_name} has no column(s) {missing}")
+
+    # Last write wins within a batch — ON CONFLICT can't touch the same row twice
+    df = df.drop_duplicates(subset=unique_columns, keep="last").copy()
+
+    # Integer columns with gaps arrive as float64 ("3.0") which COPY rejects
+    for col in df.columns:
+        if isinstance(table.c[col].type, sqlalchemy.Integer) and df[col].dtype.kind == "f":
+            df[col] = df[col].astype("Int64")
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep="\\N")
+    buffer.seek(0)
+
+    engine  = get_engine()
+    quote   = engine.dialect.identifier_preparer.quote
+    stage   = quote(f"_stage_{table_name}")
+    target  = quote(table_name)
+    columns = ", ".join(quote(col) for col in df.columns)
+    keys    = ", ".join(quote(col) for col in unique_columns)
+    updates = ", ".join(
+        f"{quote(col)} = EXCLUDED.{quote(col)}"
+        for col in df.columns
+        if col not in unique_columns
+    )
+    on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE {stage} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+            cur.copy_expert(f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            cur.execute(
+                f"INSERT INTO {target} ({columns}) "
+                f"SELECT {columns} FROM {stage} "
+                f"ON CONFLICT ({keys}) {on_conflict}"
+            )
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
 
 
 # ─────────────────────────────────────────────
-# TABLE CREATION
+# SCHEMA MIGRATIONS
+# Applied in version order, each recorded in schema_version.
+# Append new migrations to the end — never edit or renumber an applied one.
 # ─────────────────────────────────────────────
 
-def create_tables():
-    create_statements = [
-        text("""
+MIGRATIONS = [
+    (1, "base tables", [
+        """
         CREATE TABLE IF NOT EXISTS player_game_logs (
             game_id INTEGER NOT NULL,
             player_id INTEGER NOT NULL,
@@ -146,8 +214,8 @@ def create_tables():
             ops TEXT,
             UNIQUE (game_id, player_id)
         );
-        """),
-        text("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS pitcher_game_logs (
             game_id INTEGER NOT NULL,
             date DATE,
@@ -167,8 +235,8 @@ def create_tables():
             is_first_time_opponent BOOLEAN DEFAULT FALSE,
             UNIQUE (game_id)
         );
-        """),
-        text("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS park_factors (
             team_id INTEGER PRIMARY KEY,
             park_name TEXT,
@@ -178,8 +246,8 @@ def create_tables():
             park_factor_3b INTEGER,
             park_factor_hr INTEGER
         );
-        """),
-        text("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS bullpen_stats (
             game_id INTEGER NOT NULL,
             opponent_id INTEGER,
@@ -189,42 +257,250 @@ def create_tables():
             bullpen_k_per_9 FLOAT,
             UNIQUE (game_id)
         );
-        """),
-    ]
+        """,
+    ]),
+    (2, "pitcher_game_logs last5 / vs RHB / first-time / gb_rate columns", [
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS era_last5 FLOAT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS whip_last5 FLOAT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS k_per_9_last5 FLOAT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS era_vs_rhb FLOAT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS whip_vs_rhb FLOAT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS is_first_time_opponent BOOLEAN DEFAULT FALSE;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS gb_rate FLOAT;",
+    ]),
+    (3, "copy legacy witt_game_logs into player_game_logs", [
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('witt_game_logs') IS NOT NULL THEN
+                INSERT INTO player_game_logs (
+                    game_id, player_id, date, team, season, opponent,
+                    opponent_id, home_away, pa, h, hr, tb, sb, cs, bb, so, rbi, ops
+                )
+                SELECT game_id, 677951, date, team, season, opponent,
+                       opponent_id, home_away, pa, h, hr, tb, sb, cs, bb, so, rbi, ops
+                FROM witt_game_logs
+                ON CONFLICT (game_id, player_id) DO NOTHING;
+            END IF;
+        END $$;
+        """,
+    ]),
+    (4, "indexes for as-of pitcher and player watermark queries", [
+        "CREATE INDEX IF NOT EXISTS idx_pitcher_game_logs_pitcher_season_date "
+        "ON pitcher_game_logs (pitcher_id, season, date);",
+        "CREATE INDEX IF NOT EXISTS idx_player_game_logs_player_date "
+        "ON player_game_logs (player_id, date);",
+    ]),
+    (5, "key pitcher_game_logs and bullpen_stats by (game_id, side)", [
+        # side = home/away of the pitching team; existing rows are the opponent of a tracked player
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS side TEXT;",
+        "ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS team_id INTEGER;",
+        "ALTER TABLE bullpen_stats ADD COLUMN IF NOT EXISTS side TEXT;",
+        # Only games where every tracked player was on the same side are unambiguous —
+        # if tracked players faced each other, the single legacy row could be either
+        # starter, so it stays NULL and is refetched (see get_games_missing_context)
+        """
+        UPDATE pitcher_game_logs p
+        SET side = g.side, team_id = g.opponent_id
+        FROM (
+            SELECT game_id,
+                   MIN(CASE WHEN home_away = 'home' THEN 'away' ELSE 'home' END) AS side,
+                   MIN(opponent_id) AS opponent_id
+            FROM player_game_logs
+            GROUP BY game_id
+            HAVING COUNT(DISTINCT home_away) = 1
+        ) g
+        WHERE g.game_id = p.game_id AND p.side IS NULL;
+        """,
+        """
+        UPDATE bullpen_stats b
+        SET side = g.side
+        FROM (
+            SELECT game_id,
+                   MIN(CASE WHEN home_away = 'home' THEN 'away' ELSE 'home' END) AS side
+            FROM player_game_logs
+            GROUP BY game_id
+            HAVING COUNT(DISTINCT home_away) = 1
+        ) g
+        WHERE g.game_id = b.game_id AND b.side IS NULL;
+        """,
+        # Ambiguous and unmatched (prefetched future) rows — re-pulled on the next run.
+        # Copied to _legacy_* tables first so nothing is lost if a re-pull fails
+        "CREATE TABLE IF NOT EXISTS _legacy_pitcher_game_logs AS "
+        "SELECT * FROM pitcher_game_logs WHERE side IS NULL;",
+        "CREATE TABLE IF NOT EXISTS _legacy_bullpen_stats AS "
+        "SELECT * FROM bullpen_stats WHERE side IS NULL;",
+        "DELETE FROM pitcher_game_logs WHERE side IS NULL;",
+        "DELETE FROM bullpen_stats WHERE side IS NULL;",
+        "ALTER TABLE pitcher_game_logs ALTER COLUMN side SET NOT NULL;",
+        "ALTER TABLE bullpen_stats ALTER COLUMN side SET NOT NULL;",
+        "ALTER TABLE pitcher_game_logs DROP CONSTRAINT IF EXISTS pitcher_game_logs_game_id_key;",
+        "ALTER TABLE bullpen_stats DROP CONSTRAINT IF EXISTS bullpen_stats_game_id_key;",
+        "ALTER TABLE pitcher_game_logs ADD CONSTRAINT pitcher_game_logs_game_side_key UNIQUE (game_id, side);",
+        "ALTER TABLE bullpen_stats ADD CONSTRAINT bullpen_stats_game_side_key UNIQUE (game_id, side);",
+        # A starter row is shared by every tracked player in the game, so "first time
+        # this pitcher faces this player" can't live on it — derive it per player instead
+        # (the old per-game values are kept in _legacy_first_time_opponent)
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'pitcher_game_logs' AND column_name = 'is_first_time_opponent'
+            ) THEN
+                CREATE TABLE IF NOT EXISTS _legacy_first_time_opponent AS
+                SELECT game_id, side, pitcher_id, is_first_time_opponent FROM pitcher_game_logs;
+            END IF;
+        END $$;
+        """,
+        "ALTER TABLE pitcher_game_logs DROP COLUMN IF EXISTS is_first_time_opponent;",
+        """
+        CREATE OR REPLACE VIEW player_opposing_starters AS
+        SELECT
+            g.player_id, g.game_id, g.date, p.side, p.pitcher_id,
+            ROW_NUMBER() OVER (
+                PARTITION BY g.player_id, p.pitcher_id ORDER BY g.date, g.game_id
+            ) = 1 AS is_first_time_opponent
+        FROM player_game_logs g
+        JOIN pitcher_game_logs p ON p.game_id = g.game_id AND p.side <> g.home_away;
+        """,
+    ]),
+    (6, "pitcher_appearances / pitcher_profiles + pitcher_running_stats view", [
+        """
+        CREATE TABLE IF NOT EXISTS pitcher_appearances (
+            pitcher_id INTEGER NOT NULL,
+            game_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            season INTEGER NOT NULL,
+            team_id INTEGER,
+            gs SMALLINT,
+            outs SMALLINT,
+            er SMALLINT,
+            h SMALLINT,
+            bb SMALLINT,
+            k SMALLINT,
+            go SMALLINT,
+            ao SMALLINT,
+            PRIMARY KEY (pitcher_id, game_id)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_pitcher_appearances_pitcher_season_date "
+        "ON pitcher_appearances (pitcher_id, season, date);",
+        """
+        CREATE TABLE IF NOT EXISTS pitcher_profiles (
+            pitcher_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            throws TEXT,
+            era_vs_rhb FLOAT,
+            whip_vs_rhb FLOAT,
+            PRIMARY KEY (pitcher_id, season)
+        );
+        """,
+        # Running season totals and last-5 totals after each qualifying (>= 1 IP) appearance.
+        # Filters on pitcher_id/season are pushed below the window, so an as-of lookup
+        # reads one pitcher's rows through the index above.
+        """
+        CREATE OR REPLACE VIEW pitcher_running_stats AS
+        SELECT
+            pitcher_id, season, date, game_id,
+            COUNT(*)  OVER season_to_date AS appearances,
+            COUNT(*) FILTER (WHERE gs > 0) OVER season_to_date AS starts,
+            SUM(outs) OVER season_to_date AS outs,
+            SUM(er)   OVER season_to_date AS er,
+            SUM(h)    OVER season_to_date AS h,
+            SUM(bb)   OVER season_to_date AS bb,
+            SUM(k)    OVER season_to_date AS k,
+            SUM(go)   OVER season_to_date AS go,
+            SUM(ao)   OVER season_to_date AS ao,
+            SUM(outs) OVER last5 AS outs_last5,
+            SUM(er)   OVER last5 AS er_last5,
+            SUM(h)    OVER last5 AS h_last5,
+            SUM(bb)   OVER last5 AS bb_last5,
+            SUM(k)    OVER last5 AS k_last5
+        FROM pitcher_appearances
+        WHERE outs >= 3
+        WINDOW
+            season_to_date AS (PARTITION BY pitcher_id, season ORDER BY date, game_id
+                               ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+            last5          AS (PARTITION BY pitcher_id, season ORDER BY date, game_id
+                               ROWS BETWEEN 4 PRECEDING AND CURRENT ROW);
+        """,
+    ]),
+    (7, "probable_starters + season lines on pitcher_profiles", [
+        """
+        CREATE TABLE IF NOT EXISTS probable_starters (
+            game_id INTEGER NOT NULL,
+            side TEXT NOT NULL,
+            date DATE,
+            season INTEGER,
+            team_id INTEGER,
+            opponent_id INTEGER,
+            pitcher_id INTEGER,
+            pitcher_name TEXT,
+            previous_pitcher_id INTEGER,
+            first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            changed_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (game_id, side)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_probable_starters_date ON probable_starters (date);",
+        "ALTER TABLE pitcher_profiles ADD COLUMN IF NOT EXISTS season_ip TEXT;",
+        "ALTER TABLE pitcher_profiles ADD COLUMN IF NOT EXISTS season_era FLOAT;",
+        "ALTER TABLE pitcher_profiles ADD COLUMN IF NOT EXISTS season_k INTEGER;",
+        "ALTER TABLE pitcher_profiles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;",
+    ]),
+    (8, "game_context_attempts — capped retries for games missing starter/bullpen rows", [
+        """
+        CREATE TABLE IF NOT EXISTS game_context_attempts (
+            game_id INTEGER PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_tried TIMESTAMP
+        );
+        """,
+    ]),
+    # The prior-season fallback reads pitcher_running_stats, so the raw season
+    # line migration 7 stored was never read
+    (9, "drop unread season lines from pitcher_profiles", [
+        "ALTER TABLE pitcher_profiles DROP COLUMN IF EXISTS season_ip;",
+        "ALTER TABLE pitcher_profiles DROP COLUMN IF EXISTS season_era;",
+        "ALTER TABLE pitcher_profiles DROP COLUMN IF EXISTS season_k;",
+    ]),
+]
 
-    # Migrations — add new columns and migrate old witt_game_logs if it exists
-    migrate_statements = [
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS era_last5 FLOAT;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS whip_last5 FLOAT;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS k_per_9_last5 FLOAT;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS era_vs_rhb FLOAT;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS whip_vs_rhb FLOAT;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS is_first_time_opponent BOOLEAN DEFAULT FALSE;"),
-        text("ALTER TABLE pitcher_game_logs ADD COLUMN IF NOT EXISTS gb_rate FLOAT;"),
-        # Migrate old witt_game_logs into player_game_logs if it exists
-        text("""
-        INSERT INTO player_game_logs (
-            game_id, player_id, date, team, season, opponent,
-            opponent_id, home_away, pa, h, hr, tb, sb, cs, bb, so, rbi, ops
-        )
-        SELECT game_id, 677951, date, team, season, opponent,
-               opponent_id, home_away, pa, h, hr, tb, sb, cs, bb, so, rbi, ops
-        FROM witt_game_logs
-        ON CONFLICT (game_id, player_id) DO NOTHING;
-        """),
-    ]
 
-    with engine.connect() as conn:
-        for statement in create_statements:
-            conn.execute(statement)
-        for statement in migrate_statements:
-            try:
-                conn.execute(statement)
-            except Exception:
-                pass  # migration may already be done or old table may not exist
+def create_tables():
+    """
+    Bring the schema up to date. Reads the current version once and applies
+    only newer migrations, each in its own transaction — a fully migrated
+    database costs a single query.
+    """
+    latest = MIGRATIONS[-1][0]
+
+    with get_engine().connect() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """))
+        current = conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
         conn.commit()
 
-create_tables()
+        if current >= latest:
+            return
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text("""
+                INSERT INTO schema_version (version, description) VALUES (:v, :d)
+            """), {"v": version, "d": description})
+            conn.commit()
+            print(f"  Applied migration {version}: {description}")
 
 
 # ─────────────────────────────────────────────
@@ -252,10 +528,10 @@ def fetch_player_game_logs(player_id, seasons):
     for season in seasons:
         try:
             url = (
-                f"https://statsapi.mlb.com/api/v1/people/{player_id}/stats"
+                f"{mlb_api.BASE_URL}/people/{player_id}/stats"
                 f"?stats=gameLog&group=hitting&season={season}"
             )
-            response = requests.get(url)
+            response = mlb_api.get(url)
             response.raise_for_status()
             data = response.json()
         except requests.exceptions.RequestException as e:
@@ -292,74 +568,75 @@ def fetch_player_game_logs(player_id, seasons):
 
 
 # ─────────────────────────────────────────────
-# OPPOSING PITCHER LOOKUP
+# GAME STARTERS
+# One boxscore per gamePk gives both sides' starters
 # ─────────────────────────────────────────────
 
-def get_opposing_starting_pitcher(game_id, player_team_id):
-    """Look up the opposing starting pitcher for a given game."""
+SIDES    = ("away", "home")
+OPPOSITE = {"home": "away", "away": "home"}
+
+
+def parse_game_starters(boxscore):
+    """{side: {pitcher_id, pitcher_name, team_id}} for each side with a listed starter."""
+    starters = {}
+    teams = boxscore.get("teams", {})
+    for side in SIDES:
+        team_info = teams.get(side, {})
+        pitchers  = team_info.get("pitchers", [])
+        if not pitchers:
+            continue
+        starter_id  = pitchers[0]
+        player_info = team_info.get("players", {}).get(f"ID{starter_id}", {}).get("person", {})
+        starters[side] = {
+            "pitcher_id":   starter_id,
+            "pitcher_name": player_info.get("fullName", "Unknown"),
+            "team_id":      team_info.get("team", {}).get("id"),
+        }
+    return starters
+
+
+def get_game_starters(game_id):
+    """Fetch a game's boxscore once and return both starters."""
     try:
-        url = f"https://statsapi.mlb.com/api/v1/game/{game_id}/boxscore"
-        response = requests.get(url)
+        url = f"{mlb_api.BASE_URL}/game/{game_id}/boxscore"
+        response = mlb_api.get(url)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
         print(f"⚠️ Boxscore fetch failed for game {game_id}: {e}")
         return None
 
-    teams = data.get("teams", {})
-    for side in ["away", "home"]:
-        team_info = teams.get(side, {})
-        team_id = team_info.get("team", {}).get("id")
-        if team_id != player_team_id:
-            pitchers = team_info.get("pitchers", [])
-            if pitchers:
-                starter_id = pitchers[0]
-                players = team_info.get("players", {})
-                player_key = f"ID{starter_id}"
-                player_info = players.get(player_key, {}).get("person", {})
-                return {
-                    "pitcher_id":   starter_id,
-                    "pitcher_name": player_info.get("fullName", "Unknown"),
-                }
-
-    return None
+    return parse_game_starters(data)
 
 
 # ─────────────────────────────────────────────
-# PITCHER SEASON STATS
-# Cumulative ERA/WHIP/K9, last 5 starts, vs RHB splits
+# PITCHER SEASON LOG CACHE
+# Game log, handedness and vs RHB split per (pitcher_id, season), held until
+# stored — as-of stats are read back from pitcher_running_stats
 # ─────────────────────────────────────────────
 
-def get_pitcher_season_stats(pitcher_id, season, before_date):
-    """Compute a pitcher's stats entering a specific game."""
-    LEAGUE_AVG = {"era": 4.20, "whip": 1.30, "k_per_9": 8.8, "gb_rate": 0.44}
+PITCHER_LEAGUE_AVG = {"era": 4.20, "whip": 1.30, "k_per_9": 8.8, "gb_rate": 0.44}
+
+_pitcher_season_cache = {}
+_unsaved_pitcher_logs = set()    # (pitcher_id, season) fetched since the last store_pitcher_appearances()
+_pitcher_season_cache_lock = threading.Lock()
 
+
+def innings_to_outs(ip_str):
+    """Convert MLB innings pitched string (e.g. '6.1') to outs recorded."""
     try:
-        gamelog_url = (
-            f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}/stats"
-            f"?stats=gameLog&group=pitching&season={season}"
-        )
-        gamelog_response = requests.get(gamelog_url)
-        gamelog_response.raise_for_status()
-        gamelog_data = gamelog_response.json()
-
-        bio_url = f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}"
-        bio_response = requests.get(bio_url)
-        bio_response.raise_for_status()
-        bio_data = bio_response.json()
-
-        splits_url = (
-            f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}/stats"
-            f"?stats=statSplits&group=pitching&season={season}&sitCodes=vr"
-        )
-        splits_response = requests.get(splits_url)
-        splits_response.raise_for_status()
-        splits_data = splits_response.json()
+        ip_whole, ip_frac = divmod(float(ip_str), 1)
+        return int(ip_whole) * 3 + int(round(ip_frac * 10))
+    except (ValueError, TypeError):
+        return 0
 
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Pitcher fetch failed for {pitcher_id}, {season}: {e}")
-        return None
 
+def build_pitcher_season_log(gamelog_data, bio_data, splits_data):
+    """
+    Turn raw API payloads into the rows store_pitcher_appearances() writes:
+    every appearance (outs instead of IP so sums stay exact — the >= 1 IP
+    filter is the view's), handedness and the vs RHB split.
+    """
     throws = None
     people = bio_data.get("people", [])
     if people:
@@ -369,63 +646,27 @@ def get_pitcher_season_stats(pitcher_id, season, before_date):
         gamelog_data.get("stats", [{}])[0].get("splits", [])
         if gamelog_data.get("stats") else []
     )
-    prior_games = [
-        g for g in all_splits
-        if g.get("date", "9999-99-99") < before_date
-        and parse_innings(g.get("stat", {}).get("inningsPitched", "0")) >= 1.0
-    ]
-
-    if not prior_games:
-        print(f"  ℹ️ No prior appearances for pitcher {pitcher_id} before {before_date}. Using league averages.")
-        return {
-            "throws": throws,
-            **LEAGUE_AVG,
-            "era_last5": LEAGUE_AVG["era"],
-            "whip_last5": LEAGUE_AVG["whip"],
-            "k_per_9_last5": LEAGUE_AVG["k_per_9"],
-            "era_vs_rhb": LEAGUE_AVG["era"],
-            "whip_vs_rhb": LEAGUE_AVG["whip"],
-            "gb_rate": LEAGUE_AVG["gb_rate"],
+    appearances = [
+        {
+            "game_id": g.get("game", {}).get("gamePk"),
+            "date":    g.get("date"),
+            "team_id": g.get("team", {}).get("id"),
+            "gs":      g.get("stat", {}).get("gamesStarted", 0),
+            "outs":    innings_to_outs(g.get("stat", {}).get("inningsPitched", "0")),
+            "er":      g.get("stat", {}).get("earnedRuns", 0),
+            "h":       g.get("stat", {}).get("hits", 0),
+            "bb":      g.get("stat", {}).get("baseOnBalls", 0),
+            "k":       g.get("stat", {}).get("strikeOuts", 0),
+            "go":      g.get("stat", {}).get("groundOuts", 0),
+            "ao":      g.get("stat", {}).get("airOuts", 0),
         }
+        for g in all_splits
+        if g.get("game", {}).get("gamePk") and g.get("date")
+    ]
 
-    def accumulate(games):
-        er, inn, h, bb, k, go, ao = 0, 0.0, 0, 0, 0, 0, 0
-        for g in games:
-            s = g.get("stat", {})
-            inn += parse_innings(s.get("inningsPitched", "0"))
-            er  += s.get("earnedRuns", 0)
-            h   += s.get("hits", 0)
-            bb  += s.get("baseOnBalls", 0)
-            k   += s.get("strikeOuts", 0)
-            go  += s.get("groundOuts", 0)
-            ao  += s.get("airOuts", 0)
-        return er, inn, h, bb, k, go, ao
-
-    er, inn, h, bb, k, go, ao = accumulate(prior_games)
-    if inn == 0:
-        era, whip, k9 = LEAGUE_AVG["era"], LEAGUE_AVG["whip"], LEAGUE_AVG["k_per_9"]
-    else:
-        era  = round((er / inn) * 9, 2)
-        whip = round((h + bb) / inn, 2)
-        k9   = round((k / inn) * 9, 2)
-
-    # GB rate = ground outs / (ground outs + air outs)
-    # Uses MLB Stats API groundOuts/flyOuts — directionally equivalent to FanGraphs GB%
-    total_batted = go + ao
-    gb_rate = round(go / total_batted, 3) if total_batted > 0 else LEAGUE_AVG["gb_rate"]
-
-    last5 = prior_games[-5:]
-    er5, inn5, h5, bb5, k5, _, _ = accumulate(last5)
-    if inn5 == 0:
-        era5, whip5, k9_5 = LEAGUE_AVG["era"], LEAGUE_AVG["whip"], LEAGUE_AVG["k_per_9"]
-    else:
-        era5  = round((er5 / inn5) * 9, 2)
-        whip5 = round((h5 + bb5) / inn5, 2)
-        k9_5  = round((k5 / inn5) * 9, 2)
-
-    rhb_splits = splits_data.get("stats", [{}])[0].get("splits", []) if splits_data.get("stats") else []
-    era_vs_rhb  = LEAGUE_AVG["era"]
-    whip_vs_rhb = LEAGUE_AVG["whip"]
+    rhb_splits  = splits_data.get("stats", [{}])[0].get("splits", []) if splits_data.get("stats") else []
+    era_vs_rhb  = PITCHER_LEAGUE_AVG["era"]
+    whip_vs_rhb = PITCHER_LEAGUE_AVG["whip"]
 
     if rhb_splits:
         s = rhb_splits[0].get("stat", {})
@@ -435,376 +676,516 @@ def get_pitcher_season_stats(pitcher_id, season, before_date):
             whip_vs_rhb = round((s.get("hits", 0) + s.get("baseOnBalls", 0)) / rhb_ip, 2)
 
     return {
-        "throws":        throws,
-        "era":           era,
-        "whip":          whip,
-        "k_per_9":       k9,
-        "era_last5":     era5,
-        "whip_last5":    whip5,
-        "k_per_9_last5": k9_5,
-        "era_vs_rhb":    era_vs_rhb,
-        "whip_vs_rhb":   whip_vs_rhb,
-        "gb_rate":       gb_rate,
+        "throws":      throws,
+        "appearances": appearances,
+        "era_vs_rhb":  era_vs_rhb,
+        "whip_vs_rhb": whip_vs_rhb,
     }
 
 
 # ─────────────────────────────────────────────
-# PITCHER LAZY LOADER
-# Called from predict.py — gets clean season stats
-# for any pitcher regardless of whether Witt has faced them
+# BULK PITCHER HYDRATION
+# One people?personIds= call per batch per season returns game log,
+# vs RHB split and handedness for every pitcher in the batch
 # ─────────────────────────────────────────────
 
-def get_or_fetch_pitcher_season_stats(pitcher_name, pitcher_id, season):
-    """
-    Lazy loader for pitcher season stats.
+PEOPLE_BATCH_SIZE = 50      # personIds per request — keeps the URL well under server limits
+
 
-    Logic:
-    1. Check pitcher_game_logs for this season — need >= 5 starts for reliable stats
-    2. If not enough current season data, check prior season
-    3. If neither has enough data, fetch directly from MLB Stats API
-       using full season cumulative stats (not game-by-game which is noisy early)
-    4. Cache result in pitcher_game_logs for future use
+def _stats_by_type(person):
+    """{type displayName: {"stats": [{"splits": [...]}]}} from a hydrated people record."""
+    by_type = {}
+    for block in person.get("stats", []):
+        kind = block.get("type", {}).get("displayName")
+        if kind:
+            by_type.setdefault(kind, {"stats": [{"splits": []}]})["stats"][0]["splits"].extend(block.get("splits", []))
+    return by_type
 
-    This solves the early season problem where ERA 18.0 from one bad start
-    corrupts predictions for pitchers Witt hasn't faced much.
+
+def hydrate_pitchers(pitcher_ids, seasons):
     """
-    LEAGUE_AVG = {"era": 4.20, "whip": 1.30, "k_per_9": 8.8, "gb_rate": 0.44}
-    MIN_STARTS = 5
+    Warm the pitcher season cache for many pitchers at once.
 
-    # ── Check DB for current and prior season ──
-    with engine.connect() as conn:
-        result = pd.read_sql(text("""
-            SELECT era, whip, k_per_9, era_last5, whip_last5,
-                   era_vs_rhb, gb_rate, throws, season, date
-            FROM pitcher_game_logs
-            WHERE pitcher_id = :pid
-            ORDER BY date DESC
-        """), conn, params={"pid": pitcher_id})
+    For each season, uncached pitchers are requested PEOPLE_BATCH_SIZE at a
+    time with hydrate=stats(gameLog, statSplits vr), so a day's
+    probable starters cost one request per season rather than three per
+    pitcher-season. Returns {(pitcher_id, season): log} for every pair that
+    is now cached.
+    """
+    pitcher_ids = sorted({int(pid) for pid in pitcher_ids if pid})
+    logs = {}
 
-    if not result.empty:
-        current = result[result["season"] == season]
-        prior   = result[result["season"] == season - 1]
+    for season in seasons:
+        missing = [pid for pid in pitcher_ids if (pid, season) not in _pitcher_season_cache]
 
-        if len(current) >= MIN_STARTS:
-            row = current.iloc[0]
-            print(f"  Using {season} DB stats ({len(current)} appearances)")
-            return _row_to_stats(row)
+        for i in range(0, len(missing), PEOPLE_BATCH_SIZE):
+            batch = missing[i:i + PEOPLE_BATCH_SIZE]
+            try:
+                people = mlb_api.get_json(f"{mlb_api.BASE_URL}/people", params={
+                    "personIds": ",".join(str(pid) for pid in batch),
+                    "hydrate":   f"stats(group=[pitching],type=[gameLog,statSplits],sitCodes=[vr],season={season})",
+                }).get("people", [])
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Pitcher batch fetch failed ({len(batch)} pitchers, {season}): {e}")
+                continue
+
+            for person in people:
+                by_type = _stats_by_type(person)
+                log = build_pitcher_season_log(
+                    by_type.get("gameLog", {}),
+                    {"people": [person]},
+                    by_type.get("statSplits", {}),
+                )
+                with _pitcher_season_cache_lock:
+                    if (person["id"], season) not in _pitcher_season_cache:
+                        _pitcher_season_cache[(person["id"], season)] = log
+                        _unsaved_pitcher_logs.add((person["id"], season))
+
+        logs.update({
+            (pid, season): _pitcher_season_cache[(pid, season)]
+            for pid in pitcher_ids if (pid, season) in _pitcher_season_cache
+        })
 
-        if len(prior) >= MIN_STARTS:
-            row = prior.iloc[0]
-            print(f"  ⚠️ Only {len(current)} start(s) in {season} — using {season-1} DB stats")
-            return _row_to_stats(row)
+    return logs
 
-    # ── Not enough DB data — fetch full season from API ──
-    print(f"  Fetching {season} season stats from MLB API for {pitcher_name}...")
-    try:
-        stats_url = (
-            f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}/stats"
-            f"?stats=season&group=pitching&season={season}"
-        )
-        stats_resp = requests.get(stats_url)
-        stats_resp.raise_for_status()
-        stats_data = stats_resp.json()
-
-        splits_url = (
-            f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}/stats"
-            f"?stats=statSplits&group=pitching&season={season}&sitCodes=vr"
-        )
-        splits_resp = requests.get(splits_url)
-        splits_resp.raise_for_status()
-        splits_data = splits_resp.json()
-
-        bio_url = f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}"
-        bio_resp = requests.get(bio_url)
-        bio_resp.raise_for_status()
-        bio_data = bio_resp.json()
 
-    except requests.exceptions.RequestException as e:
-        print(f"  ⚠️ API fetch failed: {e}. Using league averages.")
-        return {**LEAGUE_AVG, "era_last5": LEAGUE_AVG["era"],
-                "era_vs_rhb": LEAGUE_AVG["era"], "pitcher_r": 1}
+def store_pitcher_appearances():
+    """
+    Persist pitcher season logs fetched since the last call — raw appearances
+    to pitcher_appearances; handedness and vs RHB split to pitcher_profiles. Logs already stored are not written again.
+    Returns the number of appearance rows written.
+    """
+    with _pitcher_season_cache_lock:
+        pending = sorted(_unsaved_pitcher_logs)
+        _unsaved_pitcher_logs.clear()
+
+    appearances = []
+    profiles    = []
+    now         = datetime.now()
+    for pitcher_id, season in pending:
+        log = _pitcher_season_cache[(pitcher_id, season)]
+        appearances.extend({"pitcher_id": pitcher_id, "season": season, **a} for a in log["appearances"])
+        profiles.append({
+            "pitcher_id":  pitcher_id,
+            "season":      season,
+            "throws":      log["throws"],
+            "era_vs_rhb":  log["era_vs_rhb"],
+            "whip_vs_rhb": log["whip_vs_rhb"],
+            "updated_at":  now,
+        })
 
-    # Handedness
-    throws = None
-    people = bio_data.get("people", [])
-    if people:
-        throws = people[0].get("pitchHand", {}).get("code")
+    if profiles:
+        upsert_table(pd.DataFrame(profiles), "pitcher_profiles", ["pitcher_id", "season"])
+    if appearances:
+        upsert_table(pd.DataFrame(appearances), "pitcher_appearances", ["pitcher_id", "game_id"])
+    return len(appearances)
 
-    # Season cumulative stats
-    season_splits = (
-        stats_data.get("stats", [{}])[0].get("splits", [])
-        if stats_data.get("stats") else []
-    )
 
-    if not season_splits:
-        # Try prior season from API
-        print(f"  No {season} MLB stats found. Trying {season-1}...")
-        try:
-            prev_url = (
-                f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}/stats"
-                f"?stats=season&group=pitching&season={season-1}"
-            )
-            prev_resp = requests.get(prev_url)
-            prev_resp.raise_for_status()
-            prev_data = prev_resp.json()
-            season_splits = (
-                prev_data.get("stats", [{}])[0].get("splits", [])
-                if prev_data.get("stats") else []
-            )
-        except Exception:
-            pass
-
-    if not season_splits:
-        print(f"  ⚠️ No stats found. Using league averages.")
-        return {**LEAGUE_AVG, "era_last5": LEAGUE_AVG["era"],
-                "era_vs_rhb": LEAGUE_AVG["era"], "pitcher_r": int(throws == "R") if throws else 1}
-
-    s   = season_splits[0].get("stat", {})
-    inn = parse_innings(s.get("inningsPitched", "0"))
-
-    if inn < 5:
-        print(f"  ⚠️ Only {inn:.1f} IP found. Using league averages.")
-        return {**LEAGUE_AVG, "era_last5": LEAGUE_AVG["era"],
-                "era_vs_rhb": LEAGUE_AVG["era"], "pitcher_r": int(throws == "R") if throws else 1}
-
-    era  = round((s.get("earnedRuns", 0) / inn) * 9, 2)
-    whip = round((s.get("hits", 0) + s.get("baseOnBalls", 0)) / inn, 2)
-    k9   = round((s.get("strikeOuts", 0) / inn) * 9, 2)
-
-    # GB rate from groundOuts/flyOuts — same source as get_pitcher_season_stats
-    go = s.get("groundOuts", 0)
-    ao = s.get("airOuts", 0)
-    gb_rate = round(go / (go + ao), 3) if (go + ao) > 0 else LEAGUE_AVG["gb_rate"]
-
-    # vs RHB
-    rhb = splits_data.get("stats", [{}])[0].get("splits", []) if splits_data.get("stats") else []
-    era_vs_rhb = LEAGUE_AVG["era"]
-    if rhb:
-        rs     = rhb[0].get("stat", {})
-        rhb_ip = parse_innings(rs.get("inningsPitched", "0"))
-        if rhb_ip > 0:
-            era_vs_rhb = round((rs.get("earnedRuns", 0) / rhb_ip) * 9, 2)
+# ─────────────────────────────────────────────
+# PITCHER SEASON STATS
+# Cumulative ERA/WHIP/K9, last 5 starts, vs RHB splits
+# ─────────────────────────────────────────────
 
-    print(f"  ✅ ERA {era}, WHIP {whip}, K/9 {k9}, GB% {gb_rate:.3f} ({inn:.1f} IP)")
+def pitcher_rates(t):
+    """(ERA, WHIP, K/9) from counting-stat totals with outs; league average for 0 outs."""
+    if not t["outs"]:
+        return PITCHER_LEAGUE_AVG["era"], PITCHER_LEAGUE_AVG["whip"], PITCHER_LEAGUE_AVG["k_per_9"]
+    inn = t["outs"] / 3
+    return (
+        round((t["er"] / inn) * 9, 2),
+        round((t["h"] + t["bb"]) / inn, 2),
+        round((t["k"] / inn) * 9, 2),
+    )
 
-    return {
-        "era":        era,
-        "whip":       whip,
-        "k_per_9":    k9,
-        "era_last5":  era,
-        "era_vs_rhb": era_vs_rhb,
-        "gb_rate":    gb_rate,
-        "pitcher_r":  int(throws == "R") if throws else 1,
-    }
+
+def gb_rate_from(go, ao):
+    # GB rate = ground outs / (ground outs + air outs)
+    # Uses MLB Stats API groundOuts/flyOuts — directionally equivalent to FanGraphs GB%
+    total_batted = go + ao
+    return round(go / total_batted, 3) if total_batted > 0 else PITCHER_LEAGUE_AVG["gb_rate"]
 
 
-def _row_to_stats(row):
-    """Convert a pitcher_game_logs DB row to the stats dict predict.py expects."""
+def league_avg_pitcher_stats(throws):
+    """Stats for a pitcher with no qualifying appearance yet — league averages, own handedness."""
     return {
-        "era":        row["era"],
-        "whip":       row["whip"],
-        "k_per_9":    row["k_per_9"],
-        "era_last5":  row["era_last5"] if pd.notna(row["era_last5"]) else row["era"],
-        "era_vs_rhb": row["era_vs_rhb"] if pd.notna(row["era_vs_rhb"]) else row["era"],
-        "gb_rate":    row["gb_rate"] if pd.notna(row["gb_rate"]) else 0.44,
-        "pitcher_r":  1 if row["throws"] == "R" else 0,
+        "throws":        throws,
+        **PITCHER_LEAGUE_AVG,
+        "era_last5":     PITCHER_LEAGUE_AVG["era"],
+        "whip_last5":    PITCHER_LEAGUE_AVG["whip"],
+        "k_per_9_last5": PITCHER_LEAGUE_AVG["k_per_9"],
+        "era_vs_rhb":    PITCHER_LEAGUE_AVG["era"],
+        "whip_vs_rhb":   PITCHER_LEAGUE_AVG["whip"],
     }
 
 
 # ─────────────────────────────────────────────
-# BULLPEN STATS
+# PITCHER STATS FROM THE DB
+# Any number of (pitcher, season, date) lookups in one query — each an
+# indexed LATERAL probe of pitcher_running_stats, no API call. Below
+# PITCHER_MIN_OUTS this season, the prior season's final line is used instead
 # ─────────────────────────────────────────────
 
-def get_bullpen_stats(opponent_id, season, before_date):
-    LEAGUE_BP = {"bullpen_era": 4.10, "bullpen_whip": 1.28, "bullpen_k_per_9": 9.2}
-
-    try:
-        team_url = (
-            f"https://statsapi.mlb.com/api/v1/teams/{opponent_id}/stats"
-            f"?stats=season&group=pitching&season={season}&playerPool=qualifier"
-        )
-        response = requests.get(team_url)
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Bullpen fetch failed for team {opponent_id}, {season}: {e}")
-        return LEAGUE_BP
+PITCHER_MIN_OUTS = 30     # 10 IP — fewer and one bad outing swamps the season line
+
+PITCHER_AS_OF_SQL = text("""
+    SELECT
+        q.pitcher_id, q.season, q.before_date,
+        r.appearances, r.starts,
+        r.outs, r.er, r.h, r.bb, r.k, r.go, r.ao,
+        r.outs_last5, r.er_last5, r.h_last5, r.bb_last5, r.k_last5,
+        pp.throws, pp.era_vs_rhb, pp.whip_vs_rhb,
+        pr.appearances AS prior_appearances, pr.starts AS prior_starts,
+        pr.outs AS prior_outs, pr.er AS prior_er, pr.h AS prior_h, pr.bb AS prior_bb,
+        pr.k AS prior_k, pr.go AS prior_go, pr.ao AS prior_ao,
+        pr.outs_last5 AS prior_outs_last5, pr.er_last5 AS prior_er_last5, pr.h_last5 AS prior_h_last5,
+        pr.bb_last5 AS prior_bb_last5, pr.k_last5 AS prior_k_last5,
+        ppp.throws AS prior_throws, ppp.era_vs_rhb AS prior_era_vs_rhb, ppp.whip_vs_rhb AS prior_whip_vs_rhb
+    FROM UNNEST(CAST(:pids AS INTEGER[]), CAST(:seasons AS INTEGER[]), CAST(:befores AS DATE[]))
+         AS q(pitcher_id, season, before_date)
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM pitcher_running_stats r
+        WHERE r.pitcher_id = q.pitcher_id
+          AND r.season = q.season
+          AND r.date < q.before_date
+        ORDER BY r.date DESC, r.game_id DESC
+        LIMIT 1
+    ) r ON TRUE
+    -- Prior season's last row = its full-season totals (and its final five outings)
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM pitcher_running_stats pr
+        WHERE pr.pitcher_id = q.pitcher_id
+          AND pr.season = q.season - 1
+        ORDER BY pr.date DESC, pr.game_id DESC
+        LIMIT 1
+    ) pr ON TRUE
+    LEFT JOIN pitcher_profiles pp
+           ON pp.pitcher_id = q.pitcher_id AND pp.season = q.season
+    LEFT JOIN pitcher_profiles ppp
+           ON ppp.pitcher_id = q.pitcher_id AND ppp.season = q.season - 1
+""")
+
+
+def _as_date(d):
+    return pd.Timestamp(d).date()
+
+
+def _stats_from_totals(r, prefix, throws, era_vs_rhb, whip_vs_rhb):
+    """Stats dict from one side (current: prefix "", prior season: "prior_") of a PITCHER_AS_OF_SQL row."""
+    era, whip, k9     = pitcher_rates({f: r[prefix + f] for f in ("outs", "er", "h", "bb", "k")})
+    era5, whip5, k9_5 = pitcher_rates({f: r[f"{prefix}{f}_last5"] for f in ("outs", "er", "h", "bb", "k")})
+    return {
+        "appearances":   r[prefix + "appearances"],
+        "starts":        r[prefix + "starts"],
+        "throws":        throws,
+        "era":           era,
+        "whip":          whip,
+        "k_per_9":       k9,
+        "era_last5":     era5,
+        "whip_last5":    whip5,
+        "k_per_9_last5": k9_5,
+        "era_vs_rhb":    era_vs_rhb if era_vs_rhb is not None else PITCHER_LEAGUE_AVG["era"],
+        "whip_vs_rhb":   whip_vs_rhb if whip_vs_rhb is not None else PITCHER_LEAGUE_AVG["whip"],
+        "gb_rate":       gb_rate_from(r[prefix + "go"], r[prefix + "ao"]),
+    }
 
-    splits = data.get("stats", [{}])[0].get("splits", []) if data.get("stats") else []
-    if not splits:
-        return LEAGUE_BP
 
-    s = splits[0].get("stat", {})
-    inn = parse_innings(s.get("inningsPitched", "0"))
-    if inn == 0:
-        return LEAGUE_BP
+def pitcher_stats_from_row(r):
+    """
+    One PITCHER_AS_OF_SQL row to a stats dict, or None when nothing is stored.
 
+    Season-to-date once the pitcher has PITCHER_MIN_OUTS this season, else the
+    prior season's final line if that has PITCHER_MIN_OUTS, else league
+    averages with his own handedness — the rule predict.py has always used.
+    "stats_season" is the season the line comes from (None for league average).
+    """
+    throws = r["throws"] or r["prior_throws"]
+    if (r["outs"] or 0) >= PITCHER_MIN_OUTS:
+        return {**_stats_from_totals(r, "", throws, r["era_vs_rhb"], r["whip_vs_rhb"]),
+                "stats_season": r["season"]}
+    if (r["prior_outs"] or 0) >= PITCHER_MIN_OUTS:
+        return {**_stats_from_totals(r, "prior_", throws, r["prior_era_vs_rhb"], r["prior_whip_vs_rhb"]),
+                "stats_season": r["season"] - 1}
+    if throws is None:
+        return None
     return {
-        "bullpen_era":     round((s.get("earnedRuns", 0) / inn) * 9, 2),
-        "bullpen_whip":    round((s.get("hits", 0) + s.get("baseOnBalls", 0)) / inn, 2),
-        "bullpen_k_per_9": round((s.get("strikeOuts", 0) / inn) * 9, 2),
+        "appearances":  r["appearances"] or 0,
+        "starts":       r["starts"] or 0,
+        **league_avg_pitcher_stats(throws),
+        "stats_season": None,
     }
 
 
-# ─────────────────────────────────────────────
-# FETCH PITCHER GAME LOGS
-# Tracks is_first_time_opponent per player
-# ─────────────────────────────────────────────
-
-def fetch_pitcher_game_logs(player_df, player_id):
+def pitcher_stats_from_db(lookups):
     """
-    For each game in a player's game log, look up the opposing starting pitcher
-    and their season stats.
-
-    is_first_time_opponent = True when this pitcher appears for the first time
-    in this player's history. Useful for debugging and potential future feature.
+    As-of stats for many (pitcher_id, season, before_date) lookups in one
+    query: {(pitcher_id, season, date): stats dict (see pitcher_stats_from_row)}.
+    A pitcher with nothing stored for that season or the one before is absent.
     """
-    player_info    = PLAYERS.get(player_id, {})
-    player_team_id = player_info.get("team_id", 118)
+    lookups = sorted({(int(pid), int(season), _as_date(d)) for pid, season, d in lookups if pid})
+    if not lookups:
+        return {}
 
-    seen_pitcher_ids = set()
-    pitcher_rows     = []
-    seen_game_ids    = set()
+    pids, seasons, befores = (list(col) for col in zip(*lookups))
+    with get_engine().connect() as conn:
+        rows = conn.execute(PITCHER_AS_OF_SQL, {
+            "pids": pids, "seasons": seasons, "befores": befores,
+        }).mappings().fetchall()
 
-    player_df_sorted = player_df.sort_values("date").reset_index(drop=True)
+    out = {}
+    for r in rows:
+        stats = pitcher_stats_from_row(r)
+        if stats is not None:
+            out[(r["pitcher_id"], r["season"], r["before_date"])] = stats
+    return out
 
-    for _, row in player_df_sorted.iterrows():
-        game_id = row["game_id"]
-        season  = row["season"]
-        date    = row["date"]
 
-        if game_id in seen_game_ids or pd.isna(game_id):
-            continue
-        seen_game_ids.add(game_id)
-
-        pitcher_info = get_opposing_starting_pitcher(int(game_id), player_team_id)
-        if not pitcher_info:
-            print(f"⚠️ Could not identify starting pitcher for game {game_id}. Skipping.")
-            continue
+def profile_is_current(updated_at, season, day, today=None):
+    """
+    True when a pitcher-season profile refreshed at updated_at already covers a
+    lookup for day: refreshed after the season ended, or on/after the day — or
+    today, for an upcoming game (nothing newer exists to fetch yet).
+    """
+    if updated_at is None:
+        return False
+    return updated_at.year > season or updated_at.date() >= min(day, today or datetime.today().date())
 
-        pitcher_id   = pitcher_info["pitcher_id"]
-        pitcher_name = pitcher_info["pitcher_name"]
 
-        is_first_time = pitcher_id not in seen_pitcher_ids
-        seen_pitcher_ids.add(pitcher_id)
+def warm_pitcher_appearances(lookups):
+    """
+    Make sure pitcher_appearances covers every (pitcher_id, season, before_date)
+    lookup — and the prior season pitcher_stats_from_db falls back to — before
+    it is answered from SQL. A pitcher-season is current per profile_is_current()
+    — so a prior season is fetched at most once after it ends, and an upcoming
+    game's starter at most once a day; only stale ones are
+    hydrated from the API — one people call per season per 50 pitchers — and stored.
+    Returns the number of appearance rows written.
+    """
+    lookups = {(int(pid), int(season), _as_date(d)) for pid, season, d in lookups if pid}
+    if not lookups:
+        return 0
+    lookups |= {(pid, season - 1, day) for pid, season, day in lookups}
+
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT pitcher_id, season, updated_at
+            FROM pitcher_profiles
+            WHERE pitcher_id = ANY(:pids) AND season = ANY(:seasons)
+        """), {
+            "pids":    sorted({pid for pid, _, _ in lookups}),
+            "seasons": sorted({season for _, season, _ in lookups}),
+        }).mappings().fetchall()
+    refreshed = {(r["pitcher_id"], r["season"]): r["updated_at"] for r in rows if r["updated_at"] is not None}
+
+    today     = datetime.today().date()
+    by_season = {}
+    for pid, season, day in lookups:
+        if not profile_is_current(refreshed.get((pid, season)), season, day, today):
+            by_season.setdefault(season, set()).add(pid)
+    for season, pitcher_ids in sorted(by_season.items()):
+        hydrate_pitchers(pitcher_ids, [season])
+
+    n_stale = sum(len(pids) for pids in by_season.values())
+    n_rows  = store_pitcher_appearances()
+    print(f"  ✅ {n_stale} pitcher-season(s) refreshed from the API, "
+          f"{len({(pid, season) for pid, season, _ in lookups}) - n_stale} already stored"
+          f" — {n_rows} appearance row(s) written")
+    return n_rows
 
-        stats = get_pitcher_season_stats(pitcher_id, season, before_date=str(date))
-        if not stats:
-            continue
 
-        pitcher_rows.append({
-            "game_id":                int(game_id),
-            "date":                   date,
-            "season":                 season,
-            "pitcher_id":             pitcher_id,
-            "pitcher_name":           pitcher_name,
-            "throws":                 stats["throws"],
-            "era":                    stats["era"],
-            "whip":                   stats["whip"],
-            "k_per_9":                stats["k_per_9"],
-            "era_last5":              stats["era_last5"],
-            "whip_last5":             stats["whip_last5"],
-            "k_per_9_last5":          stats["k_per_9_last5"],
-            "era_vs_rhb":             stats["era_vs_rhb"],
-            "whip_vs_rhb":            stats["whip_vs_rhb"],
-            "gb_rate":                stats.get("gb_rate", 0.44),
-            "is_first_time_opponent": is_first_time,
-        })
+# ─────────────────────────────────────────────
+# BULLPEN STATS
+# One team pitching game log fetch per (team_id, season); relief-only
+# appearances (gamesStarted == 0) summed per date into prefix sums so every
+# before_date lookup is a bisect — no end-of-season lookahead
+# ─────────────────────────────────────────────
 
-    return pd.DataFrame(pitcher_rows)
+BULLPEN_LEAGUE_AVG = {"bullpen_era": 4.10, "bullpen_whip": 1.28, "bullpen_k_per_9": 9.2}
+BULLPEN_SUM_FIELDS = ["er", "outs", "h", "bb", "k"]
+BULLPEN_MIN_OUTS   = 60     # ~20 relief innings before a team's own numbers replace the league average
 
+_bullpen_season_cache = {}
+_bullpen_season_locks = {}
+_bullpen_season_locks_guard = threading.Lock()
 
-# ─────────────────────────────────────────────
-# FETCH TODAY'S PITCHER
-# Proactively pulls tonight's opponent starter stats
-# even if the player has never faced them before
-# ─────────────────────────────────────────────
 
-def fetch_todays_pitcher(player_id, game_date=None):
+def build_bullpen_season_log(gamelog_data):
     """
-    Look up tonight's scheduled game, identify the opposing starter,
-    and pull their current season stats if not already in pitcher_game_logs.
-
-    Handles doubleheaders by processing all games on the date.
-    Sets is_first_time_opponent = True for pitchers never seen before.
+    Relief appearances from a team's per-pitcher game logs, summed by date.
+    cum[field][n] is the total over the first n dates with relief work.
     """
-    player_info    = PLAYERS.get(player_id, {})
-    player_team_id = player_info.get("team_id")
-    season         = datetime.today().year
-    date_str       = game_date or datetime.today().strftime('%Y-%m-%d')
+    all_splits = (
+        gamelog_data.get("stats", [{}])[0].get("splits", [])
+        if gamelog_data.get("stats") else []
+    )
 
-    if not player_team_id:
-        print(f"⚠️ Player {player_id} not in PLAYERS dict.")
-        return
+    by_date = {}
+    for g in all_splits:
+        s = g.get("stat", {})
+        if s.get("gamesStarted", 0) or not g.get("date"):
+            continue
+        day = by_date.setdefault(g["date"], dict.fromkeys(BULLPEN_SUM_FIELDS, 0))
+        day["er"]   += s.get("earnedRuns", 0)
+        day["outs"] += innings_to_outs(s.get("inningsPitched", "0"))
+        day["h"]    += s.get("hits", 0)
+        day["bb"]   += s.get("baseOnBalls", 0)
+        day["k"]    += s.get("strikeOuts", 0)
+
+    dates = sorted(by_date)
+    cum   = {field: [0] for field in BULLPEN_SUM_FIELDS}
+    for d in dates:
+        for field in BULLPEN_SUM_FIELDS:
+            cum[field].append(cum[field][-1] + by_date[d][field])
+
+    return {"dates": dates, "cum": cum}
+
+
+def get_bullpen_season_log(team_id, season):
+    """Fetch (once) and cache a team's relief log. Failed fetches are not cached."""
+    key = (team_id, season)
+    if key in _bullpen_season_cache:
+        return _bullpen_season_cache[key]
+
+    with _bullpen_season_locks_guard:
+        key_lock = _bullpen_season_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        if key in _bullpen_season_cache:
+            return _bullpen_season_cache[key]
+        try:
+            response = mlb_api.get(
+                f"{mlb_api.BASE_URL}/stats",
+                params={
+                    "stats":      "gameLog",
+                    "group":      "pitching",
+                    "season":     season,
+                    "teamId":     team_id,
+                    "playerPool": "ALL",
+                    "limit":      10000,
+                },
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Bullpen fetch failed for team {team_id}, {season}: {e}")
+            return None
+        log = build_bullpen_season_log(response.json())
+        _bullpen_season_cache[key] = log
+        return log
+
+
+def bullpen_stats_as_of(log, before_date):
+    """Relief ERA/WHIP/K9 over every date strictly before before_date, or None if too few outs."""
+    n = bisect_left(log["dates"], before_date)
+    t = {field: log["cum"][field][n] for field in BULLPEN_SUM_FIELDS}
+    if t["outs"] < BULLPEN_MIN_OUTS:
+        return None
 
-    try:
-        schedule_url = (
-            f"https://statsapi.mlb.com/api/v1/schedule"
-            f"?sportId=1&teamId={player_team_id}&date={date_str}"
-        )
-        response = requests.get(schedule_url)
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Schedule fetch failed: {e}")
-        return
+    inn = t["outs"] / 3
+    return {
+        "bullpen_era":     round((t["er"] / inn) * 9, 2),
+        "bullpen_whip":    round((t["h"] + t["bb"]) / inn, 2),
+        "bullpen_k_per_9": round((t["k"] / inn) * 9, 2),
+    }
 
-    dates = data.get("dates", [])
-    if not dates:
-        print(f"  No games scheduled for team {player_team_id} on {date_str}")
-        return
 
-    for game in dates[0].get("games", []):
-        game_id = game.get("gamePk")
-        if not game_id:
-            continue
+def get_bullpen_stats(opponent_id, season, before_date):
+    """Opponent bullpen entering a game — league average until the team has BULLPEN_MIN_OUTS of relief work."""
+    log = get_bullpen_season_log(opponent_id, season)
+    if log is None:
+        return BULLPEN_LEAGUE_AVG
 
-        with engine.connect() as conn:
-            existing = pd.read_sql(text("""
-                SELECT game_id FROM pitcher_game_logs WHERE game_id = :gid
-            """), conn, params={"gid": game_id})
+    return bullpen_stats_as_of(log, str(before_date)) or BULLPEN_LEAGUE_AVG
 
-        if not existing.empty:
-            print(f"  Pitcher data already exists for game {game_id}. Skipping.")
-            continue
 
-        teams = game.get("teams", {})
-        for side in ["away", "home"]:
-            team_data = teams.get(side, {})
-            if team_data.get("team", {}).get("id") != player_team_id:
-                probable     = team_data.get("probablePitcher", {})
-                pitcher_id   = probable.get("id")
-                pitcher_name = probable.get("fullName", "Unknown")
+# ─────────────────────────────────────────────
+# FETCH GAME CONTEXT
+# Game-centric: each gamePk is resolved once no matter how many tracked
+# players were in it — both starters and both bullpens, keyed by (game_id, side)
+# ─────────────────────────────────────────────
 
-                if not pitcher_id:
-                    print(f"  No probable pitcher listed for game {game_id} yet.")
-                    continue
+def collect_games(*player_dfs):
+    """Unique (game_id, season, date) across any number of player game logs, in date order."""
+    frames = [df[["game_id", "season", "date"]] for df in player_dfs if not df.empty]
+    if not frames:
+        return []
+    games = (
+        pd.concat(frames, ignore_index=True)
+          .dropna(subset=["game_id"])
+          .drop_duplicates("game_id")
+          .sort_values(["date", "game_id"])
+    )
+    return [(int(g), int(season), date) for g, season, date in games.itertuples(index=False)]
 
-                print(f"  Tonight's pitcher: {pitcher_name} (id: {pitcher_id})")
 
-                with engine.connect() as conn:
-                    prior = pd.read_sql(text("""
-                        SELECT COUNT(*) as n FROM pitcher_game_logs
-                        WHERE pitcher_id = :pid
-                    """), conn, params={"pid": pitcher_id})
+def _resolve_game(game, starters, pitcher_stats):
+    """Both starters' and both bullpens' as-of stats for one game (starter stats already queried)."""
+    game_id, season, date = game
+
+    resolved = {}
+    for side, info in starters.items():
+        resolved[side] = {
+            **info,
+            "stats":   pitcher_stats.get((info["pitcher_id"], season, _as_date(date))),
+            "bullpen": get_bullpen_stats(info["team_id"], season, before_date=str(date)) if info["team_id"] else None,
+        }
+    return resolved
 
-                is_first_time = prior.iloc[0]["n"] == 0
 
-                if is_first_time:
-                    print(f"  First time opponent — fetching {season} season stats...")
-                else:
-                    print(f"  Known pitcher — fetching current season stats...")
+def fetch_game_context(games, max_workers=MAX_WORKERS):
+    """
+    For each (game_id, season, date), look up both starting pitchers and
+    both bullpens as of the game. Returns (pitcher rows, bullpen rows), one
+    row per (game_id, side) — side is the pitching team's home/away.
+
+    Boxscores and bullpen lookups run on a pool of max_workers threads (all
+    requests share the global rate limiter). max_workers=1 runs serially.
+    Between the two passes, starters whose stored appearances aren't current
+    are hydrated in bulk and stored, then every starter's as-of stats come
+    from one pitcher_running_stats query.
+
+    is_first_time_opponent is per player, so it isn't stored on these rows —
+    the player_opposing_starters view derives it from (player_id, pitcher_id)
+    in date order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        starters = list(pool.map(get_game_starters, [g[0] for g in games]))
+
+        lookups = [
+            (info["pitcher_id"], season, date)
+            for (_, season, date), game_starters in zip(games, starters)
+            for info in (game_starters or {}).values()
+        ]
+        warm_pitcher_appearances(lookups)
+        pitcher_stats = pitcher_stats_from_db(lookups)
+
+        results = list(pool.map(
+            lambda gs: _resolve_game(gs[0], gs[1], pitcher_stats) if gs[1] else None, zip(games, starters),
+        ))
+
+    pitcher_rows = []
+    bullpen_rows = []
+
+    for (game_id, season, date), resolved in zip(games, results):
+        if not resolved:
+            print(f"⚠️ Could not identify starting pitchers for game {game_id}. Skipping.")
+            continue
 
-                stats = get_pitcher_season_stats(pitcher_id, season, before_date=date_str)
-                if not stats:
-                    return
+        for side in SIDES:
+            info = resolved.get(side)
+            if not info:
+                continue
 
-                row = {
+            stats = info["stats"]
+            if stats:
+                pitcher_rows.append({
                     "game_id":                game_id,
-                    "date":                   date_str,
+                    "side":                   side,
+                    "team_id":                info["team_id"],
+                    "date":                   date,
                     "season":                 season,
-                    "pitcher_id":             pitcher_id,
-                    "pitcher_name":           pitcher_name,
+                    "pitcher_id":             info["pitcher_id"],
+                    "pitcher_name":           info["pitcher_name"],
                     "throws":                 stats["throws"],
                     "era":                    stats["era"],
                     "whip":                   stats["whip"],
@@ -814,45 +1195,231 @@ def fetch_todays_pitcher(player_id, game_date=None):
                     "k_per_9_last5":          stats["k_per_9_last5"],
                     "era_vs_rhb":             stats["era_vs_rhb"],
                     "whip_vs_rhb":            stats["whip_vs_rhb"],
-                    "gb_rate":                stats.get("gb_rate", 0.44),
-                    "is_first_time_opponent": is_first_time,
-                }
+                    "gb_rate":                stats["gb_rate"],
+                })
+
+            if info["bullpen"]:
+                bullpen_rows.append({
+                    "game_id":         game_id,
+                    "side":            side,
+                    "opponent_id":     info["team_id"],
+                    "season":          season,
+                    "bullpen_era":     info["bullpen"]["bullpen_era"],
+                    "bullpen_whip":    info["bullpen"]["bullpen_whip"],
+                    "bullpen_k_per_9": info["bullpen"]["bullpen_k_per_9"],
+                })
 
-                df = pd.DataFrame([row])
-                upsert_table(df, "pitcher_game_logs", ["game_id"])
-                print(f"  ✅ Stored pitcher stats for {pitcher_name} (game {game_id})")
+    return pd.DataFrame(pitcher_rows), pd.DataFrame(bullpen_rows)
 
 
 # ─────────────────────────────────────────────
-# FETCH BULLPEN GAME LOGS
+# PROBABLE STARTER PREFETCH
+# One league schedule call covers the next PREFETCH_DAYS; every probable
+# starter facing a tracked team is warmed in bulk and stored ahead of time
 # ─────────────────────────────────────────────
 
-def fetch_bullpen_game_logs(player_df):
-    bullpen_rows  = []
-    seen_game_ids = set()
+PREFETCH_DAYS = 3
 
-    for _, row in player_df.iterrows():
-        game_id     = row["game_id"]
-        season      = row["season"]
-        date        = row["date"]
-        opponent_id = row["opponent_id"]
 
-        if game_id in seen_game_ids or pd.isna(game_id) or pd.isna(opponent_id):
-            continue
-        seen_game_ids.add(game_id)
+def fetch_probable_starters(start_date=None, days=PREFETCH_DAYS, team_ids=None):
+    """
+    Probable starters facing any of team_ids (default: every PLAYERS team)
+    from start_date through start_date + days - 1, in a single schedule call.
+    One row per (game_id, side) — side is the pitching team's home/away.
+    TBD probables come back with pitcher_id None.
+    """
+    team_ids   = set(team_ids or {info["team_id"] for info in PLAYERS.values()})
+    start_date = pd.Timestamp(start_date or datetime.today()).normalize()
+    end_date   = start_date + pd.Timedelta(days=days - 1)
 
-        stats = get_bullpen_stats(int(opponent_id), season, before_date=str(date))
+    try:
+        data = mlb_api.get_json(f"{mlb_api.BASE_URL}/schedule", params={
+            "sportId":   1,
+            "startDate": start_date.strftime('%Y-%m-%d'),
+            "endDate":   end_date.strftime('%Y-%m-%d'),
+            "hydrate":   "probablePitcher",
+        })
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Schedule fetch failed: {e}")
+        return pd.DataFrame()
+
+    rows = []
+    for day in data.get("dates", []):
+        for game in day.get("games", []):
+            teams = game.get("teams", {})
+            for side in SIDES:
+                team_id     = teams.get(side, {}).get("team", {}).get("id")
+                opponent_id = teams.get(OPPOSITE[side], {}).get("team", {}).get("id")
+                if opponent_id not in team_ids:
+                    continue
+                probable = teams.get(side, {}).get("probablePitcher") or {}
+                rows.append({
+                    "game_id":      game["gamePk"],
+                    "side":         side,
+                    "date":         day["date"],
+                    "season":       int(game.get("season") or day["date"][:4]),
+                    "team_id":      team_id,
+                    "opponent_id":  opponent_id,
+                    "pitcher_id":   probable.get("id"),
+                    "pitcher_name": probable.get("fullName", "TBD"),
+                })
+    return pd.DataFrame(rows)
+
+
+def _stored_probables(game_ids):
+    """Last sweep's probables for these games, one query: {(game_id, side): row}."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT game_id, side, pitcher_id, pitcher_name, previous_pitcher_id, changed_at
+            FROM probable_starters
+            WHERE game_id = ANY(:gids)
+        """), {"gids": [int(g) for g in game_ids]}).mappings().fetchall()
+    return {(r["game_id"], r["side"]): dict(r) for r in rows}
+
+
+def classify_probable(prev, pitcher_id, now):
+    """
+    Diff one (game_id, side) probable against the last sweep's stored row
+    (prev, or None if never seen). Returns (status, history): status is "new",
+    "unchanged", "changed", "scratched" (announced -> TBD) or None (still TBD);
+    history is the row's previous_pitcher_id / changed_at, moved forward only
+    when the starter changed or was scratched. A starter announced after a
+    scratch is "new" — the slot was TBD — and keeps the scratched pitcher as
+    previous_pitcher_id.
+    """
+    prev_pid = prev["pitcher_id"] if prev else None
+    if pitcher_id is None:
+        status = "scratched" if prev_pid else None
+    elif prev_pid is None:
+        status = "new"
+    elif prev_pid == pitcher_id:
+        status = "unchanged"
+    else:
+        status = "changed"
 
-        bullpen_rows.append({
-            "game_id":         int(game_id),
-            "opponent_id":     int(opponent_id),
-            "season":          season,
-            "bullpen_era":     stats["bullpen_era"],
-            "bullpen_whip":    stats["bullpen_whip"],
-            "bullpen_k_per_9": stats["bullpen_k_per_9"],
+    if status in ("changed", "scratched"):
+        return status, {"previous_pitcher_id": prev_pid, "changed_at": now}
+    return status, {
+        "previous_pitcher_id": (prev or {}).get("previous_pitcher_id"),
+        "changed_at":          (prev or {}).get("changed_at"),
+    }
+
+
+def prefetch_probables(start_date=None, days=PREFETCH_DAYS, team_ids=None):
+    """
+    Sweep the schedule, diff probables against the last sweep, bring every
+    announced starter's current and prior season up to date in bulk (the prior
+    one backs the PITCHER_MIN_OUTS fallback), then store:
+      pitcher_profiles / pitcher_appearances — what pitcher_running_stats reads
+      probable_starters  — who is scheduled, with changes since the last sweep
+      pitcher_game_logs  — as-of stats per (game_id, side) from
+                           pitcher_running_stats, ready for features
+      bullpen_stats      — the same sides' bullpens as of the game date, so
+                           serving never calls the API for them
+    Returns {"new", "changed", "scratched", "unchanged"} lists of (game_id, side).
+    """
+    probables = fetch_probable_starters(start_date, days, team_ids)
+    changes   = {"new": [], "changed": [], "scratched": [], "unchanged": []}
+    if probables.empty:
+        print(f"  No games against tracked teams in the next {days} day(s).")
+        return changes
+
+    now    = datetime.now()
+    stored = _stored_probables(probables["game_id"].unique())
+
+    records = []
+    for row in probables.to_dict("records"):
+        key   = (row["game_id"], row["side"])
+        prev  = stored.get(key)
+        pid   = row["pitcher_id"]
+        pid   = None if pd.isna(pid) else int(pid)
+        row["pitcher_id"] = pid
+
+        status, history = classify_probable(prev, pid, now)
+        if status:
+            changes[status].append(key)
+        records.append({**row, **history, "updated_at": now})
+
+        if status in ("changed", "scratched"):
+            print(f"  🔁 Game {row['game_id']} ({row['side']}): "
+                  f"{prev['pitcher_name']} -> {row['pitcher_name']}")
+
+    # Only starters not refreshed since their game date (or today, for upcoming games) hit the API —
+    # one people call per season per 50 pitchers
+    announced = [r for r in records if r["pitcher_id"]]
+    lookups   = [(r["pitcher_id"], r["season"], r["date"]) for r in announced]
+    warm_pitcher_appearances(lookups)
+    pitcher_stats = pitcher_stats_from_db(lookups)
+
+    pitcher_rows = []
+    for r in announced:
+        stats = pitcher_stats.get((r["pitcher_id"], r["season"], _as_date(r["date"])))
+        if not stats:
+            continue
+        pitcher_rows.append({
+            "game_id":                r["game_id"],
+            "side":                   r["side"],
+            "team_id":                r["team_id"],
+            "date":                   r["date"],
+            "season":                 r["season"],
+            "pitcher_id":             r["pitcher_id"],
+            "pitcher_name":           r["pitcher_name"],
+            "throws":                 stats["throws"],
+            "era":                    stats["era"],
+            "whip":                   stats["whip"],
+            "k_per_9":                stats["k_per_9"],
+            "era_last5":              stats["era_last5"],
+            "whip_last5":             stats["whip_last5"],
+            "k_per_9_last5":          stats["k_per_9_last5"],
+            "era_vs_rhb":             stats["era_vs_rhb"],
+            "whip_vs_rhb":            stats["whip_vs_rhb"],
+            "gb_rate":                stats["gb_rate"],
         })
 
-    return pd.DataFrame(bullpen_rows)
+    upsert_table(pd.DataFrame(records), "probable_starters", ["game_id", "side"])
+    if changes["scratched"]:
+        # A scratched probable's stats row would otherwise keep feeding predictions
+        with get_engine().begin() as conn:
+            conn.execute(text("""
+                DELETE FROM pitcher_game_logs p
+                USING probable_starters ps
+                WHERE ps.game_id = p.game_id AND ps.side = p.side
+                  AND ps.pitcher_id IS NULL AND ps.game_id = ANY(:gids)
+            """), {"gids": [int(g) for g, _ in changes["scratched"]]})
+    if pitcher_rows:
+        upsert_table(pd.DataFrame(pitcher_rows), "pitcher_game_logs", ["game_id", "side"])
+
+    # Bullpens facing tracked teams — one season log per team, fetched in parallel
+    team_seasons = {(r["team_id"], r["season"]) for r in records if r["team_id"]}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        list(pool.map(lambda ts: get_bullpen_season_log(*ts), team_seasons))
+    bullpen_rows = [
+        {
+            "game_id":     r["game_id"],
+            "side":        r["side"],
+            "opponent_id": r["team_id"],
+            "season":      r["season"],
+            **get_bullpen_stats(r["team_id"], r["season"], before_date=str(r["date"])),
+        }
+        for r in records if r["team_id"]
+    ]
+    if bullpen_rows:
+        upsert_table(pd.DataFrame(bullpen_rows), "bullpen_stats", ["game_id", "side"])
+
+    tbd = sum(1 for r in records if not r["pitcher_id"])
+    print(f"  ✅ {len(announced)} probable starter(s) warmed across {probables['game_id'].nunique()} game(s)"
+          f" — {len(changes['new'])} new, {len(changes['changed'])} changed, "
+          f"{len(changes['scratched'])} scratched, {tbd} TBD")
+    return changes
+
+
+def fetch_todays_pitcher(player_id, game_date=None):
+    """Single-team, single-day prefetch — kept for callers of the old per-player entry point."""
+    player_team_id = PLAYERS.get(player_id, {}).get("team_id")
+    if not player_team_id:
+        print(f"⚠️ Player {player_id} not in PLAYERS dict.")
+        return
+    return prefetch_probables(game_date, days=1, team_ids=[player_team_id])
 
 
 # ─────────────────────────────────────────────
@@ -876,12 +1443,124 @@ def upsert_park_factors():
     upsert_table(df, "park_factors", ["team_id"])
 
 
+# ─────────────────────────────────────────────
+# INCREMENTAL WATERMARKS
+# Last stored game date per player — daily runs only pull games on/after it
+# ─────────────────────────────────────────────
+
+START_SEASON = 2022
+
+
+def get_player_watermark(player_id):
+    """Date of the player's most recent row in player_game_logs, or None if none stored."""
+    with get_engine().connect() as conn:
+        result = conn.execute(text("""
+            SELECT MAX(date) FROM player_game_logs WHERE player_id = :pid
+        """), {"pid": player_id}).fetchone()
+
+    if not result or result[0] is None:
+        return None
+    return pd.Timestamp(result[0]).date()
+
+
+def fetch_new_game_logs(player_id, this_season, full_refresh=False):
+    """
+    Player game logs not yet stored — every season since START_SEASON on a
+    full refresh or an empty table, otherwise games on/after the watermark.
+    Games on the watermark date are re-pulled so a doubleheader finishing
+    after the last run isn't missed. Returns (watermark, df).
+    """
+    watermark = None if full_refresh else get_player_watermark(player_id)
+    first     = watermark.year if watermark else START_SEASON
+    df        = fetch_player_game_logs(player_id, list(range(first, this_season + 1)))
+
+    if watermark and not df.empty:
+        df = df[df["date"] >= str(watermark)].reset_index(drop=True)
+    return watermark, df
+
+
+MAX_CONTEXT_ATTEMPTS = 3    # runs that may fail to resolve a game before it stops being retried
+
+# Player games without the opposing starter or bullpen row
+MISSING_CONTEXT_SQL = """
+    SELECT DISTINCT g.game_id, g.season, g.date
+    FROM player_game_logs g
+    LEFT JOIN pitcher_game_logs p ON p.game_id = g.game_id AND p.side <> g.home_away
+    LEFT JOIN bullpen_stats b     ON b.game_id = g.game_id AND b.side <> g.home_away
+    WHERE (p.game_id IS NULL OR b.game_id IS NULL)
+"""
+
+
+def get_games_missing_context():
+    """
+    Stored player games without the opposing starter or bullpen row —
+    (game_id, season, date) in date order. Covers rows migration 5 could not
+    assign a side to and any earlier boxscore failure. Games that have
+    already failed MAX_CONTEXT_ATTEMPTS runs are left out (delete their
+    game_context_attempts row to retry one).
+    """
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT m.game_id, m.season, m.date
+            FROM ({MISSING_CONTEXT_SQL}) m
+            LEFT JOIN game_context_attempts a ON a.game_id = m.game_id
+            WHERE COALESCE(a.attempts, 0) < :max_attempts
+            ORDER BY m.date, m.game_id
+        """), {"max_attempts": MAX_CONTEXT_ATTEMPTS}).fetchall()
+    return [(int(g), int(season), str(date)) for g, season, date in rows]
+
+
+def record_context_attempts(game_ids):
+    """
+    Count one more failed attempt for every game in game_ids still missing its
+    starter or bullpen row; returns how many were counted and how many have
+    now used up MAX_CONTEXT_ATTEMPTS.
+    """
+    if not game_ids:
+        return 0, 0
+    with get_engine().begin() as conn:
+        attempts = conn.execute(text(f"""
+            INSERT INTO game_context_attempts (game_id, attempts, last_tried)
+            SELECT DISTINCT m.game_id, 1, CURRENT_TIMESTAMP
+            FROM ({MISSING_CONTEXT_SQL} AND g.game_id = ANY(:gids)) m
+            ON CONFLICT (game_id) DO UPDATE
+               SET attempts   = game_context_attempts.attempts + 1,
+                   last_tried = EXCLUDED.last_tried
+            RETURNING attempts
+        """), {"gids": [int(g) for g in game_ids]}).scalars().all()
+    return len(attempts), sum(1 for n in attempts if n >= MAX_CONTEXT_ATTEMPTS)
+
+
 # ─────────────────────────────────────────────
 # RUN PIPELINE
 # ─────────────────────────────────────────────
 
 if __name__ == "__main__":
-    seasons = list(range(2022, pd.Timestamp.today().year + 1))
+    parser = argparse.ArgumentParser(description="Fetch and store player game logs, opposing pitchers and bullpen stats.")
+    parser.add_argument("command", nargs="?", default="collect", choices=["collect", "init-schema", "prefetch"],
+                        help="collect (default) runs the pipeline; init-schema only creates tables and runs migrations; "
+                             "prefetch only sweeps upcoming probable starters")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help=f"re-pull every season since {START_SEASON} instead of only games on/after each player's watermark")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"worker threads for boxscore/pitcher lookups (default {MAX_WORKERS})")
+    parser.add_argument("--days", type=int, default=PREFETCH_DAYS,
+                        help=f"days of schedule to prefetch probable starters for (default {PREFETCH_DAYS})")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.command == "init-schema":
+        print("✅ Schema initialized.")
+        raise SystemExit(0)
+
+    if args.command == "prefetch":
+        print(f"Prefetching probable starters for the next {args.days} day(s)...")
+        prefetch_probables(days=args.days)
+        mlb_api.print_stats()
+        raise SystemExit(0)
+
+    this_season = pd.Timestamp.today().year
+    new_game_logs = []
 
     for player_id, player_info in PLAYERS.items():
         player_name = player_info["name"]
@@ -889,37 +1568,55 @@ if __name__ == "__main__":
         print(f"Processing {player_name} (id: {player_id})")
         print(f"{'='*50}")
 
-        # 1. Fetch and upsert player game logs
+        # 1. Fetch and upsert player game logs on/after the watermark
         print(f"Fetching game logs...")
-        df_game_logs = fetch_player_game_logs(player_id, seasons)
-
-        if not df_game_logs.empty:
+        watermark, df_game_logs = fetch_new_game_logs(player_id, this_season, full_refresh=args.full_refresh)
+        if watermark:
+            print(f"Incremental: games on/after {watermark}")
+        else:
+            print(f"Full refresh: seasons {START_SEASON}-{this_season}")
+
+        if df_game_logs.empty:
+            print(f"No new games for {player_name}.")
+        else:
             upsert_table(df_game_logs, "player_game_logs", ["game_id", "player_id"])
-            print(f"✅ player_game_logs upserted for {player_name}!")
+            print(f"✅ player_game_logs upserted for {player_name}! ({len(df_game_logs)} games)")
+            new_game_logs.append(df_game_logs)
+
+    # 2. Starters and bullpens — once per game across every tracked player,
+    #    plus any stored game still missing its opposing starter or bullpen
+    games = collect_games(*new_game_logs)
+    new_ids = {g[0] for g in games}
+    games  += [g for g in get_games_missing_context() if g[0] not in new_ids]
+    games.sort(key=lambda g: (str(g[2]), g[0]))
+    if games:
+        print(f"\n{'='*50}")
+        print(f"Resolving {len(games)} games for {len(new_game_logs)} players")
+        print(f"{'='*50}")
 
-        # 2. Fetch and upsert opposing pitcher stats
-        print(f"Fetching opposing pitcher stats...")
-        df_pitchers = fetch_pitcher_game_logs(df_game_logs, player_id)
+        df_pitchers, df_bullpen = fetch_game_context(games, max_workers=args.workers)
 
         if not df_pitchers.empty:
-            upsert_table(df_pitchers, "pitcher_game_logs", ["game_id"])
-            print(f"✅ pitcher_game_logs upserted!")
-
-        # 3. Fetch and upsert bullpen stats
-        print(f"Fetching bullpen stats...")
-        df_bullpen = fetch_bullpen_game_logs(df_game_logs)
+            upsert_table(df_pitchers, "pitcher_game_logs", ["game_id", "side"])
+            print(f"✅ pitcher_game_logs upserted! ({len(df_pitchers)} starters)")
 
         if not df_bullpen.empty:
-            upsert_table(df_bullpen, "bullpen_stats", ["game_id"])
-            print(f"✅ bullpen_stats upserted!")
+            upsert_table(df_bullpen, "bullpen_stats", ["game_id", "side"])
+            print(f"✅ bullpen_stats upserted! ({len(df_bullpen)} bullpens)")
+
+        n_failed, n_given_up = record_context_attempts([g[0] for g in games])
+        if n_failed:
+            print(f"⚠️ {n_failed} game(s) still missing a starter or bullpen — "
+                  f"{n_given_up} reached {MAX_CONTEXT_ATTEMPTS} attempts and won't be retried")
 
-        # 4. Proactively fetch tonight's pitcher
-        print(f"Fetching today's pitcher...")
-        fetch_todays_pitcher(player_id)
+    # 3. Probable starters for upcoming games against every tracked team
+    print(f"\nPrefetching probable starters for the next {args.days} day(s)...")
+    prefetch_probables(days=args.days)
 
-    # 5. Upsert park factors (shared across all players)
+    # 4. Upsert park factors (shared across all players)
     print(f"\nUpserting park factors...")
     upsert_park_factors()
     print(f"✅ park_factors upserted!")
 
+    mlb_api.print_stats()
     print(f"\n🚀 Data collection complete!")
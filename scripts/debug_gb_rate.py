@@ -1,18 +1,18 @@
 ### debug_gb_rate.py — inspect MLB Stats API pitcher game log fields
 ### Run from your project root: python debug_gb_rate.py
 
-import requests
+import mlb_api
 
 # Shane Bieber — first pitcher in your table
 PITCHER_ID = 669456
 SEASON = 2023
 
 url = (
-    f"https://statsapi.mlb.com/api/v1/people/{PITCHER_ID}/stats"
+    f"{mlb_api.BASE_URL}/people/{PITCHER_ID}/stats"
     f"?stats=gameLog&group=pitching&season={SEASON}"
 )
 
-response = requests.get(url)
+response = mlb_api.get(url)
 data = response.json()
 splits = data.get("stats", [{}])[0].get("splits", [])
 
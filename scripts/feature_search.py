@@ -0,0 +1,227 @@
+### feature_search.py - Feature-subset experiments over a cached design matrix
+# Replaces copying a notebook per feature-set idea (V5 -> V10). One player's
+# design matrix is loaded once from the feature store, restricted to rows with
+# every candidate feature present (so subsets are compared on the same games),
+# and handed to each worker process once. Candidates are scored with the same
+# warm-started C-path CV as model_training (fold-local scaling), then ranked.
+#
+# Modes:
+#   explicit — named feature lists (JSON file {"name": [features]})
+#   ablation — the base set, each feature dropped, each superset feature added
+#   forward  — greedy forward selection from the superset
+#
+# The superset defaults to every rolling Statcast feature (statcast_features)
+# plus the game-context columns; --superset replaces it.
+#
+# Usage:
+#   python scripts/feature_search.py witt --mode ablation
+#   python scripts/feature_search.py witt --mode ablation --superset barrel_rate_30 barrel_rate_ewm15 era
+#   python scripts/feature_search.py witt --mode forward --max-features 10 --workers 8
+#   python scripts/feature_search.py julio --mode explicit --lists experiments.json
+#
+# Leaderboards are written to data/experiments/{player}_{mode}_{timestamp}.csv
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from model_training import TRAINING_PLAYERS, c_path_cv, calibration_table, design_matrix
+from statcast_features import rolling_feature_names
+
+BASE_DIR       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPERIMENT_DIR = os.path.join(BASE_DIR, "data", "experiments")
+
+CONTEXT_FEATURES = [
+    'is_home', 'pitcher_r', 'days_rest',
+    'era', 'whip', 'k_per_9', 'era_last5', 'whip_last5', 'k_per_9_last5',
+    'era_vs_rhb', 'whip_vs_rhb', 'gb_rate',
+    'bullpen_era', 'bullpen_whip', 'bullpen_k_per_9',
+    'park_factor', 'park_factor_hr',
+]
+
+SUPERSET = rolling_feature_names() + CONTEXT_FEATURES
+
+
+# ─────────────────────────────────────────────
+# WORKERS — design matrix installed once per process
+# ─────────────────────────────────────────────
+
+_X       = None
+_y       = None
+_hr      = None
+_columns = None
+
+
+def _init_worker(X, y, hr, columns):
+    global _X, _y, _hr, _columns
+    _X, _y, _hr, _columns = X, y, hr, {c: i for i, c in enumerate(columns)}
+
+
+def _evaluate(features):
+    """CV AUC / calibration spread for one feature subset of the shared matrix."""
+    cols     = [_columns[f] for f in features]
+    path     = c_path_cv(_X[:, cols], _y)
+    mean_auc = np.nanmean(path['auc'], axis=1)
+    best     = int(np.nanargmax(mean_auc))
+
+    oof    = path['oof'][best]
+    scored = ~np.isnan(oof)
+    _, spread = calibration_table(oof[scored], _hr[scored])
+
+    return {
+        'features':   list(features),
+        'n_features': len(features),
+        'best_C':     path['c_grid'][best],
+        'cv_auc':     round(float(mean_auc[best]), 4),
+        'cv_auc_std': round(float(np.nanstd(path['auc'][best])), 4),
+        'cv_spread':  round(spread, 3),
+    }
+
+
+# ─────────────────────────────────────────────
+# SEARCH
+# ─────────────────────────────────────────────
+
+class FeatureSearch:
+    """Evaluates feature subsets for one player in a process pool, memoizing each subset."""
+
+    def __init__(self, key, superset=None, workers=None, refresh_features=False):
+        df = design_matrix(key, refresh=refresh_features)
+        if superset is None:
+            missing  = [f for f in SUPERSET if f not in df.columns]
+            superset = [f for f in SUPERSET if f in df.columns]
+            if missing:
+                print(f"  ⚠️ {key}: feature store has no {missing} — run with --refresh-features to include them")
+        else:
+            superset = list(dict.fromkeys(superset))
+            missing  = [f for f in superset if f not in df.columns]
+            if missing:
+                raise ValueError(f"--superset names {missing}, not in {key}'s feature store")
+        df = df.dropna(subset=superset).sort_values(['date', 'game_id']).reset_index(drop=True)
+
+        self.key      = key
+        self.superset = superset
+        self.n_games  = len(df)
+        self.results  = {}
+
+        X  = df[superset].to_numpy(dtype="float64")
+        hr = df['hr'].to_numpy()
+        y  = (hr >= 1).astype(int)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(X, y, hr, superset),
+        )
+        print(f"🚀 {key}: {self.n_games} games x {len(superset)} candidate features")
+
+    def close(self):
+        self.pool.shutdown()
+
+    def check(self, features):
+        """Raise before anything reaches the pool if features names anything outside the superset."""
+        unknown = sorted(set(features) - set(self.superset))
+        if unknown:
+            raise ValueError(f"{unknown} not in the superset — add them with --superset "
+                             f"(have: {', '.join(self.superset)})")
+
+    def evaluate(self, subsets):
+        """Score every subset not already seen, in parallel; returns results in input order."""
+        for s in subsets:
+            self.check(s)
+        keys    = [tuple(sorted(s)) for s in subsets]
+        pending = {}
+        for k, s in zip(keys, subsets):
+            if k not in self.results:
+                pending.setdefault(k, list(s))
+        for k, result in zip(pending, self.pool.map(_evaluate, pending.values())):
+            self.results[k] = result
+        return [self.results[k] for k in keys]
+
+    def explicit(self, named_lists):
+        results = self.evaluate(list(named_lists.values()))
+        return [{'name': name, **r} for name, r in zip(named_lists, results)]
+
+    def ablation(self, base):
+        """Base set, every drop-one, and every add-one from the superset."""
+        base = list(base)
+        named = {'base': base}
+        for f in base:
+            named[f'-{f}'] = [x for x in base if x != f]
+        for f in self.superset:
+            if f not in base:
+                named[f'+{f}'] = base + [f]
+        return self.explicit(named)
+
+    def forward(self, max_features=10, start=()):
+        """Greedy forward selection: each round adds the feature that raises CV AUC most."""
+        chosen, rows, best_auc = list(start), [], -np.inf
+        while len(chosen) < max_features:
+            candidates = [f for f in self.superset if f not in chosen]
+            if not candidates:
+                break
+            results = self.evaluate([chosen + [f] for f in candidates])
+            i, top  = max(enumerate(results), key=lambda ir: ir[1]['cv_auc'])
+            added   = candidates[i]
+            rows.append({'name': f'step {len(chosen) + 1}: +{added}', **top})
+            print(f"  step {len(chosen) + 1}: +{added:<18} CV AUC {top['cv_auc']:.3f}  spread {top['cv_spread']:.3f}")
+            if top['cv_auc'] <= best_auc:
+                break
+            best_auc = top['cv_auc']
+            chosen = chosen + [added]
+        return rows
+
+
+def leaderboard(rows):
+    board = pd.DataFrame(rows)
+    board['features'] = board['features'].map(', '.join)
+    return board.sort_values(['cv_auc', 'cv_spread'], ascending=False).reset_index(drop=True)
+
+
+def save_leaderboard(board, key, mode):
+    os.makedirs(EXPERIMENT_DIR, exist_ok=True)
+    path = os.path.join(EXPERIMENT_DIR, f"{key}_{mode}_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    board.to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature-subset search for one player.")
+    parser.add_argument("player", choices=list(TRAINING_PLAYERS))
+    parser.add_argument("--mode", choices=["explicit", "ablation", "forward"], default="ablation")
+    parser.add_argument("--lists", help="explicit: JSON file of {name: [features]}")
+    parser.add_argument("--max-features", type=int, default=10, help="forward: stop at this many features")
+    parser.add_argument("--superset", nargs="+", metavar="FEATURE",
+                        help="candidate features (default: every rolling Statcast feature + context columns)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--refresh-features", action="store_true")
+    parser.add_argument("--top", type=int, default=20, help="rows of the leaderboard to print")
+    args = parser.parse_args()
+
+    if args.mode == "explicit" and not args.lists:
+        parser.error("--mode explicit needs --lists")
+
+    try:
+        search = FeatureSearch(args.player, superset=args.superset, workers=args.workers,
+                               refresh_features=args.refresh_features)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        if args.mode == "explicit":
+            with open(args.lists) as f:
+                rows = search.explicit(json.load(f))
+        elif args.mode == "ablation":
+            rows = search.ablation(TRAINING_PLAYERS[args.player]['features'])
+        else:
+            rows = search.forward(args.max_features)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        search.close()
+
+    board = leaderboard(rows)
+    path  = save_leaderboard(board, args.player, args.mode)
+    print(board.head(args.top).to_string(index=False))
+    print(f"\n✅ {len(board)} experiments -> {os.path.relpath(path, BASE_DIR)}")
@@ -0,0 +1,373 @@
+### feature_store.py - Point-in-time feature store
+# One materialized row per (player_id, game_id) with every model feature computed
+# strictly from data available before first pitch:
+#   - pitcher stats are as-of the game date (pitcher_game_logs)
+#   - Statcast rolling features use prior games only (statcast_features)
+#   - days_rest looks back to the previous game
+# Stored as Parquet under data/features/store/ so training reads locally instead
+# of re-running the SQL join + Statcast scrape in every notebook. as_of() serves
+# the same row for a game that hasn't been played yet, from the rolling Statcast
+# state and the prefetched starter, so predict.py scores exactly what training saw.
+#
+# Usage:
+#   python scripts/feature_store.py build              # every player in PLAYERS
+#   python scripts/feature_store.py build 677951
+#
+#   from feature_store import training_frame, as_of
+#   df  = training_frame([677951, 677594], ['barrel_rate_15', 'era', 'park_factor'])
+#   row = as_of(677951, '2025-06-14')                     # stored pre-game row
+#   row = as_of(677951, '2026-04-02', {'game_pk': 778123, 'opponent_id': 114,
+#                                      'is_home': 1, 'pitcher_id': 669456})
+#   rows = as_of_many('2026-04-02', [{'player_id': 677951, 'game_pk': 778123, ...}, ...])
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import statcast_cache
+from data_collection import (
+    BULLPEN_LEAGUE_AVG, OPPOSITE, PITCHER_LEAGUE_AVG, PLAYERS, get_engine, league_avg_pitcher_stats,
+    pitcher_stats_from_db, warm_pitcher_appearances,
+)
+from statcast_features import aggregate_games, add_rolling_features, load_rolling_state, rolling_feature_names
+
+BASE_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, "data", "features", "store")
+
+KEY_COLUMNS = ["player_id", "game_id", "date", "season"]
+LABEL_COLUMNS = ["hr", "tb", "hr_binary"]
+
+DAYS_REST_DEFAULT = 1    # first game of a season
+
+# pitcher_r by starter hand — anything else (unknown) stays NaN, in training and serving alike
+PITCHER_R = {"R": 1, "L": 0}
+
+PITCHER_COLUMNS = [
+    "throws", "era", "whip", "k_per_9", "era_last5", "whip_last5", "k_per_9_last5",
+    "era_vs_rhb", "whip_vs_rhb", "gb_rate",
+]
+BULLPEN_COLUMNS = ["bullpen_era", "bullpen_whip", "bullpen_k_per_9"]
+
+_frames = {}
+
+
+def _store_path(player_id):
+    return os.path.join(STORE_DIR, f"player_id={player_id}.parquet")
+
+
+# ─────────────────────────────────────────────
+# BUILD
+# ─────────────────────────────────────────────
+
+def _load_base(player_id, team_id):
+    """Game logs joined to opposing starter, bullpen and park — one row per game."""
+    with get_engine().connect() as conn:
+        return pd.read_sql(text("""
+            SELECT
+                g.game_id, g.player_id, g.date, g.season, g.home_away, g.opponent_id,
+                g.hr, g.tb,
+                p.pitcher_id, p.throws,
+                p.era, p.whip, p.k_per_9,
+                p.era_last5, p.whip_last5, p.k_per_9_last5,
+                p.era_vs_rhb, p.whip_vs_rhb, p.gb_rate,
+                fo.is_first_time_opponent,
+                b.bullpen_era, b.bullpen_whip, b.bullpen_k_per_9,
+                pf.park_factor, pf.park_factor_hr
+            FROM player_game_logs g
+            -- side is the pitching team's home/away: the opponent's is the other one
+            LEFT JOIN pitcher_game_logs p ON p.game_id = g.game_id AND p.side <> g.home_away
+            LEFT JOIN bullpen_stats b     ON b.game_id = g.game_id AND b.side <> g.home_away
+            LEFT JOIN player_opposing_starters fo
+                   ON fo.player_id = g.player_id AND fo.game_id = g.game_id
+            LEFT JOIN park_factors pf ON pf.team_id = (
+                CASE WHEN g.home_away = 'home' THEN :team_id
+                     ELSE g.opponent_id
+                END
+            )
+            WHERE g.player_id = :pid
+            ORDER BY g.date, g.game_id
+        """), conn, params={"pid": player_id, "team_id": team_id})
+
+
+def _load_statcast_features(player_id):
+    """Per-game rolling Statcast features from the local cache (no network)."""
+    meta = statcast_cache.read_meta(player_id)
+    if not meta:
+        print(f"  ⚠️ No Statcast cache for {player_id} — run statcast_cache.py backfill first")
+        return pd.DataFrame(columns=["game_pk"] + rolling_feature_names())
+
+    pitches = statcast_cache.load_batter(player_id, meta["fetched_from"], meta["pulled_through"])
+    if pitches.empty:
+        return pd.DataFrame(columns=["game_pk"] + rolling_feature_names())
+
+    games = add_rolling_features(aggregate_games(pitches))
+    return games[["game_pk"] + rolling_feature_names()]
+
+
+def build_player_features(player_id, team_id):
+    """Materialize one player's point-in-time feature rows."""
+    df = _load_base(player_id, team_id)
+    if df.empty:
+        return df
+
+    df["date"] = pd.to_datetime(df["date"])
+    df = df.sort_values(["date", "game_id"]).reset_index(drop=True)
+
+    statcast = _load_statcast_features(player_id)
+    df = df.merge(statcast, left_on="game_id", right_on="game_pk", how="left").drop(columns="game_pk")
+
+    df["hr_binary"] = (df["hr"] >= 1).astype(int)
+    df["is_home"]   = (df["home_away"] == "home").astype(int)
+    df["pitcher_r"] = df["throws"].map(PITCHER_R)
+    df["is_first_time_opponent"] = df["is_first_time_opponent"].fillna(False).astype(int)
+
+    # days_rest — calendar days off before this game, capped at 4, within a season
+    df["days_rest"] = (
+        df.groupby("season")["date"].diff().dt.days.sub(1).clip(0, 4).fillna(DAYS_REST_DEFAULT)
+    )
+    df["gb_rate"] = df["gb_rate"].fillna(PITCHER_LEAGUE_AVG["gb_rate"])
+
+    return df
+
+
+def materialize(player_ids=None):
+    """Rebuild and write the store for the given players (default: all PLAYERS)."""
+    for player_id in player_ids or list(PLAYERS):
+        info = PLAYERS.get(player_id)
+        if not info:
+            print(f"⚠️ Player {player_id} not in PLAYERS dict. Skipping.")
+            continue
+
+        df = build_player_features(player_id, info["team_id"])
+        write_player(player_id, df)
+        print(f"✅ {info['name']}: {len(df)} feature rows")
+
+
+def write_player(player_id, df):
+    """Replace a player's stored rows."""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = _store_path(player_id)
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    _frames.pop(player_id, None)
+
+
+# ─────────────────────────────────────────────
+# READ
+# ─────────────────────────────────────────────
+
+def has_player(player_id):
+    return os.path.exists(_store_path(player_id))
+
+
+def load_player(player_id):
+    """A player's stored feature rows, sorted by date — cached in memory after the first read."""
+    if player_id not in _frames:
+        path = _store_path(player_id)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No feature store for {player_id} — run feature_store.py build {player_id}")
+        _frames[player_id] = pd.read_parquet(path).sort_values(["date", "game_id"]).reset_index(drop=True)
+    return _frames[player_id]
+
+
+# Context for upcoming games, one row per requested matchup: the player's
+# previous game, the first-time-opponent flag, the starter's hand from any
+# stored season, park, and the prefetched
+# starter and bullpen for (game_id, side) — side is the opposing team's home/away
+NEXT_GAME_SQL = text("""
+    SELECT
+        m.idx,
+        (SELECT MAX(g.date) FROM player_game_logs g
+          WHERE g.player_id = m.player_id AND g.date < :date) AS last_date,
+        NOT EXISTS (
+            SELECT 1 FROM player_opposing_starters fo
+            WHERE fo.player_id = m.player_id AND fo.pitcher_id = m.pitcher_id AND fo.date < :date
+        ) AS is_first_time_opponent,
+        (SELECT pp.throws FROM pitcher_profiles pp
+          WHERE pp.pitcher_id = m.pitcher_id AND pp.throws IS NOT NULL
+          ORDER BY pp.season DESC LIMIT 1) AS known_throws,
+        pf.park_factor, pf.park_factor_hr,
+        p.pitcher_id AS prefetched_pitcher_id,
+        p.throws, p.era, p.whip, p.k_per_9,
+        p.era_last5, p.whip_last5, p.k_per_9_last5,
+        p.era_vs_rhb, p.whip_vs_rhb, p.gb_rate,
+        b.bullpen_era, b.bullpen_whip, b.bullpen_k_per_9
+    FROM UNNEST(
+        CAST(:idx AS INTEGER[]), CAST(:pids AS INTEGER[]), CAST(:game_ids AS INTEGER[]),
+        CAST(:sides AS TEXT[]), CAST(:pitcher_ids AS INTEGER[]), CAST(:park_team_ids AS INTEGER[])
+    ) AS m(idx, player_id, game_id, side, pitcher_id, park_team_id)
+    LEFT JOIN park_factors pf     ON pf.team_id = m.park_team_id
+    LEFT JOIN pitcher_game_logs p ON p.game_id = m.game_id AND p.side = m.side
+                                 AND p.pitcher_id = m.pitcher_id
+    LEFT JOIN bullpen_stats b     ON b.game_id = m.game_id AND b.side = m.side
+""")
+
+
+def _stored_row(player_id, day, game_pk=None):
+    """The player's stored row for day (and game_pk, if given), or None."""
+    if not has_player(player_id):
+        return None
+    df   = load_player(player_id)
+    hits = df[df["date"] == day]
+    if game_pk:
+        hits = hits[hits["game_id"] == game_pk]
+    return None if hits.empty else hits.iloc[-1]
+
+
+def as_of(player_id, date, matchup=None, features=None):
+    """
+    Feature row for the player's game on date, built strictly from data
+    before first pitch.
+
+    A game already in the store comes back as its stored row (with a matchup,
+    only if game_pk matches). Otherwise — tonight's game — the row is built the
+    same way from current state: Statcast from the rolling state, the opposing
+    starter from the prefetched pitcher_game_logs row, bullpen and park as of
+    the date. matchup needs opponent_id, is_home and pitcher_id; game_pk,
+    park_team_id and throws (the starter's hand, from the probable-starter or
+    schedule data) are optional. Bullpen columns come from the prefetched
+    bullpen_stats row (league average without one) and are only built when
+    features is None or asks for them. Returns None when there is no stored
+    game and no matchup, or when the rolling state has already moved past date.
+    """
+    if not matchup:
+        return _stored_row(player_id, pd.Timestamp(date).normalize())
+    return as_of_many(date, [{**matchup, "player_id": player_id}], features)[0]
+
+
+def as_of_many(date, matchups, features=None):
+    """
+    as_of() for every matchup on one date (each a matchup dict plus
+    player_id), in order — one context query for all the unplayed games,
+    then one warm + one as-of pitcher read for starters the prefetch
+    didn't store. A starter with no stats even after the warm gets league
+    averages with his hand from the matchup's throws or any stored season
+    (pitcher_r NaN if neither has it), and the row is flagged pitcher_imputed = 1.
+    """
+    day  = pd.Timestamp(date).normalize()
+    rows = [_stored_row(m["player_id"], day, m.get("game_pk")) for m in matchups]
+
+    pending = {}
+    for i, m in enumerate(matchups):
+        if rows[i] is not None:
+            continue
+        state = load_rolling_state(m["player_id"])
+        if state.last_game and pd.Timestamp(state.last_game[0]) >= day:
+            print(f"  ⚠️ Rolling state for {m['player_id']} already includes {state.last_game[0]} "
+                  f"— no as-of row for {day.date()}")
+            continue
+        pending[i] = state
+    if not pending:
+        return rows
+
+    contexts = _next_game_contexts(day, {i: matchups[i] for i in pending})
+
+    # Prefetched row for this (game, starter) first; a late swap or a game the
+    # prefetch didn't cover goes through the same as-of view the pipeline uses
+    lookups = [
+        (int(matchups[i]["pitcher_id"]), day.year, day.date())
+        for i, ctx in contexts.items() if ctx["prefetched_pitcher_id"] is None
+    ]
+    pitcher_stats = {}
+    if lookups:
+        warm_pitcher_appearances(lookups)
+        pitcher_stats = pitcher_stats_from_db(lookups)
+
+    with_bullpen = features is None or any(col in features for col in BULLPEN_COLUMNS)
+    for i, state in pending.items():
+        m, ctx = matchups[i], contexts[i]
+        imputed = False
+        if ctx["prefetched_pitcher_id"] is not None:
+            pitcher = {col: ctx[col] for col in PITCHER_COLUMNS}
+        else:
+            pitcher = pitcher_stats.get((int(m["pitcher_id"]), day.year, day.date()))
+            if pitcher is None:
+                imputed = True
+                throws  = m.get("throws") or ctx["known_throws"]
+                pitcher = league_avg_pitcher_stats(throws)
+                print(f"  ⚠️ No stats stored for pitcher {m['pitcher_id']} — league averages"
+                      f"{'' if throws else ', handedness unknown'}")
+        rows[i] = _next_game_row(m, day, ctx, pitcher, state, with_bullpen, imputed)
+    return rows
+
+
+def _next_game_contexts(day, matchups):
+    """{index: NEXT_GAME_SQL row} for {index: matchup} — one query."""
+    cols = {"idx": [], "pids": [], "game_ids": [], "sides": [], "pitcher_ids": [], "park_team_ids": []}
+    for i, m in matchups.items():
+        opponent_id = int(m["opponent_id"])
+        cols["idx"].append(i)
+        cols["pids"].append(int(m["player_id"]))
+        cols["game_ids"].append(m.get("game_pk"))
+        cols["sides"].append(OPPOSITE["home" if m["is_home"] else "away"])
+        cols["pitcher_ids"].append(int(m["pitcher_id"]))
+        cols["park_team_ids"].append(m.get("park_team_id") or (
+            PLAYERS.get(m["player_id"], {}).get("team_id") if m["is_home"] else opponent_id
+        ))
+
+    with get_engine().connect() as conn:
+        rows = conn.execute(NEXT_GAME_SQL, {**cols, "date": day.date()}).mappings().fetchall()
+    return {r["idx"]: r for r in rows}
+
+
+def _next_game_row(matchup, day, ctx, pitcher, state, with_bullpen, imputed=False):
+    """
+    One upcoming-game row — the same columns build_player_features() derives,
+    plus pitcher_imputed. pitcher_r is NaN when the starter's hand is unknown.
+    """
+    season    = day.year
+    last_date = pd.Timestamp(ctx["last_date"]) if ctx["last_date"] is not None else None
+    if last_date is not None and last_date.year == season:
+        days_rest = min(max((day - last_date).days - 1, 0), 4)
+    else:
+        days_rest = DAYS_REST_DEFAULT
+
+    row = {
+        "player_id":              matchup["player_id"],
+        "game_id":                matchup.get("game_pk"),
+        "date":                   day,
+        "season":                 season,
+        "home_away":              "home" if matchup["is_home"] else "away",
+        "opponent_id":            int(matchup["opponent_id"]),
+        "pitcher_id":             int(matchup["pitcher_id"]),
+        **{col: pitcher[col] for col in PITCHER_COLUMNS},
+        "is_first_time_opponent": int(ctx["is_first_time_opponent"]),
+        "park_factor":            ctx["park_factor"],
+        "park_factor_hr":         ctx["park_factor_hr"],
+        **state.as_of(),
+        "is_home":                int(matchup["is_home"]),
+        "pitcher_r":              PITCHER_R.get(pitcher["throws"], np.nan),
+        "pitcher_imputed":        int(imputed),
+        "days_rest":              days_rest,
+    }
+    row["gb_rate"] = PITCHER_LEAGUE_AVG["gb_rate"] if row["gb_rate"] is None else row["gb_rate"]
+    if with_bullpen:
+        # Prefetched by prefetch_probables for upcoming games — never the live API here
+        bullpen = BULLPEN_LEAGUE_AVG if ctx["bullpen_era"] is None else ctx
+        row.update({col: bullpen[col] for col in BULLPEN_COLUMNS})
+    return pd.Series(row)
+
+
+def training_frame(player_ids, feature_list, dropna=True):
+    """
+    Stacked feature rows for several players: keys + labels + feature_list.
+    Rows missing any requested feature are dropped unless dropna=False.
+    """
+    frames = [load_player(pid) for pid in player_ids]
+    df = pd.concat(frames, ignore_index=True)[KEY_COLUMNS + LABEL_COLUMNS + list(feature_list)]
+    if dropna:
+        df = df.dropna(subset=list(feature_list))
+    return df.sort_values(["date", "player_id", "game_id"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize the point-in-time feature store.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("player_ids", nargs="*", type=int,
+                        help="players to build (default: every player in PLAYERS)")
+    args = parser.parse_args()
+
+    materialize(args.player_ids)
@@ -0,0 +1,100 @@
+### fused_model.py - Scaler-folded logistic artifacts and a NumPy-only scorer
+# StandardScaler -> LogisticRegression is one dot product at serving time:
+#   logit = coef . (x - mean) / scale + intercept
+#         = (coef / scale) . x + (intercept - coef . mean / scale)
+# export_fused() folds the scaler into the coefficients and writes a small
+# versioned .npz (models/fused/) with the feature order embedded. FusedLogistic
+# scores with NumPy alone — no sklearn import or unpickling on the serving path.
+# Each artifact records a content hash of the pickles it came from
+# (source_fingerprint), so staleness never depends on file mtimes.
+
+import hashlib
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 2    # v2: + source fingerprint
+
+
+def fuse(model, scaler):
+    """(coef, intercept) for raw, unscaled features from a fitted scaler + binary logistic model."""
+    coef = np.asarray(model.coef_, dtype="float64").ravel()
+    if np.asarray(model.coef_).shape[0] != 1:
+        raise ValueError("Only binary logistic models can be fused")
+
+    # sklearn still fits mean_ / scale_ when with_mean / with_std is False — only fold what transform() applies
+    mean  = getattr(scaler, "mean_", None) if getattr(scaler, "with_mean", True) else None
+    scale = getattr(scaler, "scale_", None) if getattr(scaler, "with_std", True) else None
+    mean  = np.zeros_like(coef) if mean is None else np.asarray(mean, dtype="float64")
+    scale = np.ones_like(coef) if scale is None else np.asarray(scale, dtype="float64")
+
+    fused_coef      = coef / scale
+    fused_intercept = float(np.asarray(model.intercept_).ravel()[0] - fused_coef @ mean)
+    return fused_coef, fused_intercept
+
+
+def source_fingerprint(*paths):
+    """sha256 over the bytes of the given files, in order — what an artifact was exported from."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def export_fused(model, scaler, features, path, baseline=None, source=""):
+    """Write the fused artifact to path (.npz, uncompressed); source is the pickles' fingerprint."""
+    coef, intercept = fuse(model, scaler)
+    if len(features) != len(coef):
+        raise ValueError(f"{len(features)} feature names for {len(coef)} coefficients")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        format_version=np.int32(FORMAT_VERSION),
+        features=np.array(features, dtype=str),
+        coef=coef,
+        intercept=np.float64(intercept),
+        baseline=np.float64(np.nan if baseline is None else baseline),
+        source=np.array(source, dtype=str),
+    )
+    os.replace(tmp, path)
+    return path
+
+
+class FusedLogistic:
+    """NumPy-only scorer for a fused artifact."""
+
+    def __init__(self, features, coef, intercept, baseline=None, source=""):
+        self.features  = list(features)
+        self.coef      = np.asarray(coef, dtype="float64")
+        self.intercept = float(intercept)
+        self.baseline  = baseline
+        self.source    = source
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            version = int(npz["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{path}: format v{version}, expected v{FORMAT_VERSION}")
+            baseline = float(npz["baseline"])
+            return cls(
+                npz["features"].tolist(),
+                npz["coef"],
+                float(npz["intercept"]),
+                None if np.isnan(baseline) else baseline,
+                str(npz["source"]),
+            )
+
+    def logit(self, X):
+        """X: DataFrame (columns picked by name) or array already in feature order."""
+        if hasattr(X, "columns"):
+            X = X[self.features].to_numpy(dtype="float64")
+        X = np.asarray(X, dtype="float64")
+        return X @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        """P(HR) per row — 1-D, unlike sklearn's two-column output."""
+        return np.exp(-np.logaddexp(0.0, -self.logit(X)))
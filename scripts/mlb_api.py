@@ -0,0 +1,161 @@
+### mlb_api.py - Shared HTTP client for MLB Stats API calls
+# One pooled keep-alive session for data_collection.py, predict.py and debug scripts
+# Default timeouts, exponential-backoff retries on 429/5xx, global rate limit,
+# and counters for requests / retries / bytes
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_URL = "https://statsapi.mlb.com/api/v1"    # every caller builds its URL from this
+
+
+# ─────────────────────────────────────────────
+# SETTINGS
+# ─────────────────────────────────────────────
+
+DEFAULT_TIMEOUT     = (5, 30)   # (connect, read) seconds — no call may hang forever
+MAX_RETRIES         = 4
+BACKOFF_FACTOR      = 0.5       # sleeps 0.5s, 1s, 2s, 4s between retries
+RETRY_STATUSES      = (429, 500, 502, 503, 504)
+POOL_MAXSIZE        = 16        # max open connections per host
+REQUESTS_PER_SECOND = 10        # global cap shared by every thread
+
+
+# ─────────────────────────────────────────────
+# COUNTERS
+# ─────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats      = {"requests": 0, "retries": 0, "bytes": 0, "errors": 0}
+
+
+def _bump(counter, n=1):
+    with _stats_lock:
+        _stats[counter] += n
+
+
+def get_stats():
+    """Snapshot of request / retry / byte / error counters since the last reset."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def print_stats():
+    s = get_stats()
+    print(
+        f"  MLB API: {s['requests']} requests  |  {s['retries']} retries  |  "
+        f"{s['errors']} errors  |  {s['bytes'] / 1024:.0f} KB"
+    )
+
+
+# ─────────────────────────────────────────────
+# RATE LIMITER
+# ─────────────────────────────────────────────
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at least 1/rate seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock    = threading.Lock()
+        self._next    = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now   = time.monotonic()
+            slot  = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+
+# ─────────────────────────────────────────────
+# SESSION
+# ─────────────────────────────────────────────
+
+class _CountingRetry(Retry):
+    """urllib3 Retry that records every retry attempt in the shared counters."""
+
+    def increment(self, *args, **kwargs):
+        _bump("retries")
+        return super().increment(*args, **kwargs)
+
+
+_session      = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = _CountingRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,   # hand the final response back so callers' raise_for_status() applies
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=4,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,         # cap concurrent connections per host instead of opening extras
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Process-wide pooled session, created on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+# ─────────────────────────────────────────────
+# REQUESTS
+# ─────────────────────────────────────────────
+
+def get(url, params=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Rate-limited GET through the shared session.
+    Returns the requests.Response; raises requests.exceptions.RequestException
+    on connection failure or timeout once retries are exhausted.
+    """
+    rate_limiter.wait()
+    _bump("requests")
+    try:
+        response = get_session().get(url, params=params, timeout=timeout)
+    except requests.exceptions.RequestException:
+        _bump("errors")
+        raise
+    _bump("bytes", len(response.content))
+    if response.status_code >= 400:
+        _bump("errors")
+    return response
+
+
+def get_json(url, params=None, timeout=DEFAULT_TIMEOUT):
+    """GET, raise on HTTP error status, and decode JSON."""
+    response = get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
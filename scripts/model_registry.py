@@ -0,0 +1,268 @@
+### model_registry.py - Warm in-process model registry
+# Artifacts in models/ are described by models/manifest.json
+# (player, kind, version, model/scaler files, features, baseline, active). Model/scaler pairs
+# are unpickled on first use and kept for the life of the process, one entry per
+# (player, kind, version) served, so a long-lived process pays deserialization
+# once; a pair is reloaded when either file changes on disk.
+#
+# get_fused() serves the scaler-folded NumPy artifact (fused_model.py) instead,
+# from its own cache.
+# Serving never re-exports: a missing artifact, or one whose recorded pickle
+# fingerprint no longer matches the pickles, is an error until `export` is run.
+#
+# Usage:
+#   python scripts/model_registry.py scan           # rebuild manifest.json from models/
+#   python scripts/model_registry.py export [--all] # write fused artifacts (active models by default)
+#
+#   from model_registry import registry
+#   m = registry.get("witt")                 # active hr_logistic model for witt
+#   m["model"].predict_proba(m["scaler"].transform(X[m["features"]]))
+
+import argparse
+import json
+import os
+import re
+import threading
+import warnings
+from fused_model import FusedLogistic, export_fused, source_fingerprint
+
+BASE_DIR      = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR    = os.path.join(BASE_DIR, "models")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "manifest.json")
+FUSED_DIR     = os.path.join(MODELS_DIR, "fused")
+
+DEFAULT_KIND = "hr_logistic"
+
+# {player}_{kind}[_v{N}]_scaler.pkl — unversioned files are the original v0 artifacts
+ARTIFACT_RE = re.compile(r"^(?P<player>[a-z]+)_(?P<kind>[a-z_]+?)(?:_(?P<version>v\d+))?_scaler\.pkl$")
+
+
+def _version_num(version):
+    return int(version.lstrip("v") or 0)
+
+
+def next_version(player, kind=DEFAULT_KIND, models_dir=MODELS_DIR):
+    """First unused version for player/kind on disk — 'v11' after v10, 'v1' for a new player."""
+    taken = [
+        _version_num(m["version"] or "v0")
+        for m in map(ARTIFACT_RE.match, os.listdir(models_dir))
+        if m and m["player"] == player and m["kind"] == kind
+    ]
+    return f"v{max(taken, default=0) + 1}"
+
+
+def _source_fingerprint(entry):
+    return source_fingerprint(
+        os.path.join(MODELS_DIR, entry["model_file"]),
+        os.path.join(MODELS_DIR, entry["scaler_file"]),
+    )
+
+
+def fused_path(entry):
+    return os.path.join(FUSED_DIR, f"{entry['player']}_{entry['kind']}_{entry['version']}.npz")
+
+
+# ─────────────────────────────────────────────
+# MANIFEST
+# ─────────────────────────────────────────────
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)["models"]
+
+
+def scan_models(models_dir=MODELS_DIR, manifest_path=MANIFEST_PATH):
+    """
+    Rebuild the manifest from the model/scaler pairs on disk. Feature order is
+    read from the scaler (feature_names_in_); baseline and active carry over
+    from the existing manifest.
+    """
+    existing = {}
+    if os.path.exists(manifest_path):
+        existing = {(e["player"], e["kind"], e["version"]): e for e in load_manifest(manifest_path)}
+
+    entries = []
+    for fname in sorted(os.listdir(models_dir)):
+        match = ARTIFACT_RE.match(fname)
+        if not match:
+            continue
+        player, kind = match["player"], match["kind"]
+        version = match["version"] or "v0"
+        model_file = fname.replace("_scaler.pkl", "_model.pkl")
+        if not os.path.exists(os.path.join(models_dir, model_file)):
+            continue
+
+        import joblib
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            scaler = joblib.load(os.path.join(models_dir, fname))
+
+        prior = existing.get((player, kind, version), {})
+        entries.append({
+            "player":   player,
+            "kind":     kind,
+            "version":  version,
+            "model_file":  model_file,
+            "scaler_file": fname,
+            "features":    [str(f) for f in getattr(scaler, "feature_names_in_", [])],
+            "baseline":    prior.get("baseline"),
+            "active":      prior.get("active", False),
+        })
+
+    entries.sort(key=lambda e: (e["player"], e["kind"], _version_num(e["version"])))
+    with open(manifest_path, "w") as f:
+        json.dump({"models": entries}, f, indent=2)
+        f.write("\n")
+    print(f"✅ manifest.json: {len(entries)} models")
+    return entries
+
+
+def update_manifest_entry(player, version, kind=DEFAULT_KIND, manifest_path=MANIFEST_PATH, **fields):
+    """Set fields (e.g. baseline, active) on one manifest entry; active=True deactivates its siblings."""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    found = False
+    for e in manifest["models"]:
+        if e["player"] != player or e["kind"] != kind:
+            continue
+        if e["version"] == version:
+            e.update(fields)
+            found = True
+        elif fields.get("active"):
+            e["active"] = False
+    if not found:
+        raise KeyError(f"No {kind} {version} for '{player}' in {manifest_path} — run scan first")
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+# ─────────────────────────────────────────────
+# REGISTRY
+# ─────────────────────────────────────────────
+
+class ModelRegistry:
+    """
+    Lazy, hot-reloading cache of manifest models. Unbounded: one entry per
+    (player, kind, version) actually served — a slate walks every active model,
+    so any smaller bound would evict each one just before it is needed again.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path   = manifest_path
+        self._entries        = []
+        self._manifest_mtime = None
+        self._pickles        = {}   # (player, kind, version) -> (mtimes, model, scaler)
+        self._fused          = {}   # (player, kind, version) -> (source fingerprint, scorer)
+        self._lock           = threading.Lock()
+
+    def _refresh_manifest(self):
+        mtime = os.path.getmtime(self.manifest_path)
+        if mtime != self._manifest_mtime:
+            self._entries        = load_manifest(self.manifest_path)
+            self._manifest_mtime = mtime
+
+    def entries(self, player=None, kind=DEFAULT_KIND):
+        with self._lock:
+            self._refresh_manifest()
+            return [e for e in self._entries
+                    if (player is None or e["player"] == player) and e["kind"] == kind]
+
+    def resolve(self, player, version=None, kind=DEFAULT_KIND):
+        """Manifest entry for player — the given version, else the active one, else the latest."""
+        candidates = self.entries(player, kind)
+        if not candidates:
+            raise KeyError(f"No {kind} model for '{player}' in {self.manifest_path}")
+        if version:
+            for e in candidates:
+                if e["version"] == version:
+                    return e
+            raise KeyError(f"No {kind} {version} for '{player}' — have {[e['version'] for e in candidates]}")
+        active = [e for e in candidates if e["active"]]
+        return max(active or candidates, key=lambda e: _version_num(e["version"]))
+
+    def get(self, player, version=None, kind=DEFAULT_KIND):
+        """
+        Manifest entry plus loaded "model" and "scaler". Served from memory
+        unless either file changed since it was loaded.
+        """
+        entry = self.resolve(player, version, kind)
+        key   = (entry["player"], entry["kind"], entry["version"])
+        model_path  = os.path.join(MODELS_DIR, entry["model_file"])
+        scaler_path = os.path.join(MODELS_DIR, entry["scaler_file"])
+        mtimes = (os.path.getmtime(model_path), os.path.getmtime(scaler_path))
+
+        with self._lock:
+            cached = self._pickles.get(key)
+            if cached and cached[0] == mtimes:
+                _, model, scaler = cached
+                return {**entry, "model": model, "scaler": scaler}
+
+        import joblib   # pulls in sklearn on unpickle — only when pickles are actually needed
+        model, scaler = joblib.load(model_path), joblib.load(scaler_path)
+        with self._lock:
+            self._pickles[key] = (mtimes, model, scaler)
+        return {**entry, "model": model, "scaler": scaler}
+
+    def export(self, player, version=None, kind=DEFAULT_KIND):
+        """Fold the entry's scaler into its model and write the fused artifact, fingerprinted."""
+        loaded = self.get(player, version, kind)
+        return export_fused(loaded["model"], loaded["scaler"], loaded["features"],
+                            fused_path(loaded), baseline=loaded["baseline"],
+                            source=_source_fingerprint(loaded))
+
+    def get_fused(self, player, version=None, kind=DEFAULT_KIND):
+        """
+        FusedLogistic scorer for the entry — NumPy only, never re-exported here.
+        Raises if the artifact is missing or was exported from different
+        pickles (content hash, not mtime — checkouts and copies don't matter).
+        The baseline is the manifest's current one.
+        """
+        entry = self.resolve(player, version, kind)
+        path  = fused_path(entry)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No fused artifact for {entry['player']} {entry['version']} — "
+                                    f"run `python scripts/model_registry.py export`")
+
+        key    = (entry["player"], entry["kind"], entry["version"])
+        source = _source_fingerprint(entry)
+        with self._lock:
+            cached = self._fused.get(key)
+            if cached and cached[0] == source:
+                cached[1].baseline = entry["baseline"]
+                return cached[1]
+
+        scorer = FusedLogistic.load(path)
+        if scorer.source != source:
+            raise ValueError(f"{os.path.relpath(path, BASE_DIR)} was exported from different pickles — "
+                             f"run `python scripts/model_registry.py export`")
+        scorer.baseline = entry["baseline"]
+        with self._lock:
+            self._fused[key] = (source, scorer)
+        return scorer
+
+    def clear(self):
+        with self._lock:
+            self._pickles.clear()
+            self._fused.clear()
+
+
+registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model manifest tools.")
+    parser.add_argument("command", choices=["scan", "export"])
+    parser.add_argument("--all", action="store_true",
+                        help="export: every hr_logistic model, not just the active ones")
+    args = parser.parse_args()
+
+    if args.command == "scan":
+        scan_models()
+    else:
+        entries = registry.entries()
+        for e in entries:
+            if args.all or e["active"]:
+                print(f"✅ {e['player']} {e['version']} -> {os.path.relpath(registry.export(e['player'], e['version']), BASE_DIR)}")
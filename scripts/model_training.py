@@ -0,0 +1,304 @@
+### model_training.py - Headless HR model training for every player
+# Replaces the per-player model-building notebooks: same data, features and
+# model (StandardScaler -> LogisticRegression, C tuned by TimeSeriesSplit AUC over a
+# warm-started C path with fold-local scaling),
+# driven by TRAINING_PLAYERS (every player in data_collection.PLAYERS) and run
+# across a process pool.
+#
+# Design matrices come from the point-in-time feature store (data/features/store/)
+# and are only rebuilt with --refresh-features. Each run writes
+#   models/{player}_hr_logistic_{version}_model.pkl / _scaler.pkl
+#   models/metrics/{player}_hr_logistic_{version}.json
+# and refreshes models/manifest.json. Without --version each player gets its next
+# unused version, so a run never overwrites existing (production) artifacts; the
+# new entries only become active — baseline and all — with --activate.
+#
+# Usage:
+#   python scripts/model_training.py train                     # every player, next version each
+#   python scripts/model_training.py train witt julio --workers 2
+#   python scripts/model_training.py train witt --version v11 --refresh-features --activate
+
+import argparse
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+import feature_store
+import model_registry
+from data_collection import PLAYERS
+
+BASE_DIR    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR  = os.path.join(BASE_DIR, "models")
+METRICS_DIR = os.path.join(MODELS_DIR, "metrics")
+
+
+# ─────────────────────────────────────────────
+# PLAYER CONFIG
+# ─────────────────────────────────────────────
+
+V10_FEATURES = [
+    'avg_exit_velo_15',
+    'barrel_rate_15',
+    'hard_hit_rate_15',
+    'hr_zone_rate_15',
+    'is_home',
+    'pitcher_r',
+    'era',
+    'k_per_9',
+    'park_factor',
+]
+V10_NO_K9 = [f for f in V10_FEATURES if f != 'k_per_9']
+
+# Training settings that differ from the defaults, by model key — everyone else
+# in data_collection.PLAYERS trains on V10_FEATURES from TRAINING_DEFAULTS' start
+TRAINING_DEFAULTS  = {'statcast_start': '2022-04-01', 'features': V10_FEATURES}
+TRAINING_OVERRIDES = {
+    'greene':    {'features': V10_NO_K9},
+    'chourio':   {'statcast_start': '2024-03-01'},
+    'crews':     {'statcast_start': '2024-08-01'},
+    'grisham':   {'features': V10_NO_K9},
+    'henderson': {'features': V10_NO_K9},
+    'ramirez':   {'features': [f for f in V10_FEATURES if f != 'pitcher_r']},
+    'schwarber': {'features': V10_NO_K9},
+}
+
+TRAINING_PLAYERS = {
+    info['key']: {
+        'player_id': player_id,
+        'team_id':   info['team_id'],
+        **TRAINING_DEFAULTS,
+        **TRAINING_OVERRIDES.get(info['key'], {}),
+    }
+    for player_id, info in PLAYERS.items()
+}
+
+C_GRID   = [0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0]
+N_SPLITS = 5
+N_BINS   = 5     # calibration table quantile bins
+
+
+# ─────────────────────────────────────────────
+# DESIGN MATRIX
+# ─────────────────────────────────────────────
+
+def design_matrix(key, refresh=False):
+    """
+    Stored point-in-time rows for the player, from statcast_start on.
+    Read from the feature store unless refresh (or nothing stored yet), in which
+    case the Statcast cache is topped up and the rows are rebuilt from the DB.
+    """
+    cfg = TRAINING_PLAYERS[key]
+    pid = cfg['player_id']
+
+    if refresh or not feature_store.has_player(pid):
+        from statcast_cache import update_batter
+        update_batter(pid, start=cfg['statcast_start'])
+        feature_store.write_player(pid, feature_store.build_player_features(pid, cfg['team_id']))
+
+    df = feature_store.load_player(pid)
+    return df[df['date'] >= pd.Timestamp(cfg['statcast_start'])].reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────
+# TRAINING
+# ─────────────────────────────────────────────
+
+def c_path_cv(X, y, c_grid=C_GRID, n_splits=N_SPLITS):
+    """
+    Out-of-fold predictions for every C in one pass over TimeSeriesSplit folds.
+
+    Each fold fits its own scaler on the training rows only, then walks the C
+    path from strongest to weakest regularization, warm-starting each fit from
+    the previous coefficients. Returns the cached predictions
+    (oof[c_index, row], NaN outside test folds), fold id per row, and per-C
+    fold AUC / accuracy — every metric comes from the same fits.
+    """
+    X = np.asarray(X, dtype="float64")
+    y = np.asarray(y)
+    c_grid = sorted(c_grid)
+
+    oof     = np.full((len(c_grid), len(y)), np.nan)
+    fold_of = np.full(len(y), -1)
+    auc     = np.full((len(c_grid), n_splits), np.nan)
+    acc     = np.full((len(c_grid), n_splits), np.nan)
+
+    for k, (train_idx, test_idx) in enumerate(TimeSeriesSplit(n_splits=n_splits).split(X)):
+        scaler  = StandardScaler().fit(X[train_idx])
+        X_train = scaler.transform(X[train_idx])
+        X_test  = scaler.transform(X[test_idx])
+        fold_of[test_idx] = k
+
+        model = LogisticRegression(max_iter=500, warm_start=True)
+        for i, c in enumerate(c_grid):
+            model.set_params(C=c)
+            model.fit(X_train, y[train_idx])
+            p = model.predict_proba(X_test)[:, 1]
+            oof[i, test_idx] = p
+            if len(np.unique(y[test_idx])) > 1:
+                auc[i, k] = roc_auc_score(y[test_idx], p)
+            acc[i, k] = accuracy_score(y[test_idx], p >= 0.5)
+
+    return {'c_grid': c_grid, 'oof': oof, 'fold_of': fold_of, 'auc': auc, 'acc': acc}
+
+
+def tune_c(X, y):
+    """Best C by mean out-of-fold AUC along the warm-started path."""
+    path = c_path_cv(X, y)
+    mean_auc = np.nanmean(path['auc'], axis=1)
+    best     = int(np.nanargmax(mean_auc))
+    return {
+        **path,
+        'best':   best,
+        'best_C': path['c_grid'][best],
+        'c_path': dict(zip(path['c_grid'], mean_auc.round(4).tolist())),
+        'cv_auc': path['auc'][best],
+        'cv_acc': path['acc'][best],
+    }
+
+
+def calibration_table(p_hr, hr, bins=N_BINS):
+    frame = pd.DataFrame({'p_hr': p_hr, 'hr': hr})
+    frame['pred_bin'] = pd.qcut(frame['p_hr'], q=bins, labels=False, duplicates='drop')
+    calibration = frame.groupby('pred_bin').agg(
+        mean_predicted=('p_hr', 'mean'),
+        actual_rate=('hr', lambda x: (x >= 1).mean()),
+        n=('hr', 'count'),
+    ).round(3)
+    spread = calibration['actual_rate'].iloc[-1] - calibration['actual_rate'].iloc[0]
+    return calibration, float(spread)
+
+
+def train_player(key, df, features, version):
+    """Fit one player's model on its design matrix; save artifacts + metrics JSON. Runs in a worker."""
+    warnings.filterwarnings("ignore")
+
+    df_model = df.dropna(subset=features).sort_values(['date', 'game_id']).reset_index(drop=True)
+    X = df_model[features]
+    y = (df_model['hr'] >= 1).astype(int)
+
+    # CV is scaled fold-locally inside tune_c; the shipped scaler sees all rows
+    tuned = tune_c(X, y)
+
+    scaler   = StandardScaler()
+    X_scaled = pd.DataFrame(scaler.fit_transform(X), columns=features)
+    model    = LogisticRegression(C=tuned['best_C'], max_iter=500)
+    model.fit(X_scaled, y)
+
+    p_hr = model.predict_proba(X_scaled)[:, 1]
+    calibration, spread = calibration_table(p_hr, df_model['hr'].to_numpy())
+
+    # Out-of-sample calibration from the cached fold predictions at best C
+    oof     = tuned['oof'][tuned['best']]
+    scored  = ~np.isnan(oof)
+    _, cv_spread = calibration_table(oof[scored], df_model['hr'].to_numpy()[scored])
+
+    stem = f"{key}_hr_logistic_{version}"
+    joblib.dump(model,  os.path.join(MODELS_DIR, f"{stem}_model.pkl"))
+    joblib.dump(scaler, os.path.join(MODELS_DIR, f"{stem}_scaler.pkl"))
+
+    metrics = {
+        'player':       key,
+        'version':      version,
+        'trained_at':   datetime.now().isoformat(timespec='seconds'),
+        'features':     features,
+        'n_games':      int(len(df_model)),
+        'date_range':   [str(df_model['date'].min().date()), str(df_model['date'].max().date())],
+        'hr_rate':      round(float(y.mean()), 3),
+        'best_C':       tuned['best_C'],
+        'c_path_auc':   tuned['c_path'],
+        'cv_auc':       round(float(np.nanmean(tuned['cv_auc'])), 4),
+        'cv_auc_std':   round(float(np.nanstd(tuned['cv_auc'])), 4),
+        'cv_auc_folds': tuned['cv_auc'].round(4).tolist(),
+        'cv_acc':       round(float(tuned['cv_acc'].mean()), 4),
+        'cv_spread':    round(cv_spread, 3),
+        'insample_auc': round(float(roc_auc_score(y, p_hr)), 4),
+        'insample_acc': round(float(accuracy_score(y, model.predict(X_scaled))), 4),
+        'calibration':  calibration.reset_index().to_dict('records'),
+        'spread':       round(spread, 3),
+        'odds_ratios':  dict(zip(features, np.exp(model.coef_[0]).round(3).tolist())),
+    }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, f"{stem}.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+        f.write("\n")
+    return metrics
+
+
+def train_all(keys=None, workers=None, refresh_features=False, version=None, activate=False):
+    """Build (or read) every design matrix, then train all players in parallel."""
+    keys = keys or list(TRAINING_PLAYERS)
+    unknown = [k for k in keys if k not in TRAINING_PLAYERS]
+    if unknown:
+        print(f"❌ Unknown player(s) {unknown}. Choose from: {list(TRAINING_PLAYERS)}")
+        return {}
+
+    versions = {key: version or model_registry.next_version(key) for key in keys}
+    taken    = [k for k in keys if os.path.exists(os.path.join(MODELS_DIR, f"{k}_hr_logistic_{versions[k]}_model.pkl"))]
+    if taken:
+        print(f"❌ {version} already exists for {taken} — pick an unused --version (or omit it)")
+        return {}
+
+    print(f"🚀 Loading design matrices for {len(keys)} players...")
+    jobs = {}
+    for key in keys:
+        df = design_matrix(key, refresh=refresh_features)
+        if df.empty:
+            print(f"  ⚠️ {key}: no feature rows — skipping")
+            continue
+        jobs[key] = df
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(train_player, key, df, TRAINING_PLAYERS[key]['features'], versions[key]): key
+            for key, df in jobs.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                m = future.result()
+            except Exception as e:
+                print(f"  ❌ {key}: {e}")
+                continue
+            results[key] = m
+            print(
+                f"  ✅ {key} {m['version']}: {m['n_games']} games  |  C={m['best_C']}  |  "
+                f"CV AUC {m['cv_auc']:.3f} ± {m['cv_auc_std']:.3f}  |  spread {m['spread']:.3f}"
+            )
+
+    # Every version trained here is new, so setting its baseline never touches
+    # the entry predict.py serves — that only changes with --activate
+    model_registry.scan_models()
+    for key, m in results.items():
+        fields = {'baseline': m['hr_rate']}
+        if activate:
+            fields['active'] = True
+        model_registry.update_manifest_entry(key, m['version'], **fields)
+        # Serving reads only the fused artifact and won't export one itself
+        model_registry.registry.export(key, m['version'])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train HR models for every configured player.")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("players", nargs="*", help="players to train (default: all in TRAINING_PLAYERS)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--refresh-features", action="store_true",
+                        help="rebuild design matrices from the DB + Statcast cache")
+    parser.add_argument("--version", help="artifact version to write, e.g. v11 — must not exist yet "
+                             "(default: each player's next unused version)")
+    parser.add_argument("--activate", action="store_true", help="mark the new artifacts active in the manifest")
+    args = parser.parse_args()
+
+    train_all(args.players, args.workers, args.refresh_features, args.version, args.activate)
@@ -1,9 +1,13 @@
 ### predict.py - HR Prop Prediction Script
-# Supports: Bobby Witt Jr. (witt), Julio Rodriguez (julio)
+# Supports every tracked player in data_collection.PLAYERS (witt, julio, greene, ...)
 #
-# Usage: python3 scripts/predict.py
-# Set PLAYER at the bottom, then fill in game inputs.
+# Usage: python3 scripts/predict.py [single]
+# Scores one hand-filled matchup — set PLAYER and the game inputs at the bottom.
+#
+#        python3 scripts/predict.py slate [--date YYYY-MM-DD] [--players witt julio ...]
+# Scores every tracked player on the slate from the day's probable pitchers.
 
+import argparse
 import sys
 import warnings
 warnings.filterwarnings("ignore")
@@ -11,84 +15,27 @@ sys.path.append("../scripts")
 
 import pandas as pd
 import numpy as np
-import joblib
-import requests
-import os
-import sys
-import warnings
-from datetime import datetime, timedelta
-from pybaseball import statcast_batter
-from data_collection import engine
-from sqlalchemy import text
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+import mlb_api
+import feature_store
+from datetime import datetime
+from data_collection import PLAYERS as TRACKED_PLAYERS
+from model_registry import registry
+from statcast_cache import ingest_league, read_meta, update_batter
+from statcast_features import ROLLING_COLUMNS, rolling_feature_names
 
 # ─────────────────────────────────────────────
 # PLAYER REGISTRY
 # ─────────────────────────────────────────────
 
+# Every tracked player in data_collection.PLAYERS, keyed by model name. Model,
+# feature order and baseline come from models/manifest.json via the model
+# registry (active version), scored with the fused NumPy artifact
+
 PLAYERS = {
-    'witt': {
-        'name':       'Bobby Witt Jr.',
-        'player_id':  677951,
-        'team_id':    118,       # KC Royals
-        'model':  os.path.join(BASE_DIR, 'models', 'witt_hr_logistic_v10_model.pkl'),
-        'scaler': os.path.join(BASE_DIR, 'models', 'witt_hr_logistic_v10_scaler.pkl'),
-        'baseline':   0.160,
-        'features': [
-            'avg_exit_velo_15',
-            'barrel_rate_15',
-            'hard_hit_rate_15',
-            'hr_zone_rate_15',
-            'is_home',
-            'pitcher_r',
-            'era',
-            'k_per_9',
-            'park_factor',
-        ],
-    },
-    'julio': {
-        'name':       'Julio Rodriguez',
-        'player_id':  677594,
-        'team_id':    136,       # Seattle Mariners
-        'model':  os.path.join(BASE_DIR, 'models', 'julio_hr_logistic_v2_model.pkl'),
-        'scaler': os.path.join(BASE_DIR, 'models', 'julio_hr_logistic_v2_scaler.pkl'),
-        'baseline':   0.181,
-        'features': [
-            'avg_exit_velo_15',
-            'barrel_rate_15',
-            'hard_hit_rate_15',
-            'hr_zone_rate_15',
-            'is_home',
-            'pitcher_r',
-            'era',
-            'k_per_9',
-            'park_factor',
-        ],
-    },
-    'greene': {
-        'name':       'Riley Greene',
-        'player_id':  682985,
-        'team_id':    116,       # Detroit Tigers
-        'model':  os.path.join(BASE_DIR, 'models', 'greene_hr_logistic_v1_model.pkl'),
-        'scaler': os.path.join(BASE_DIR, 'models', 'greene_hr_logistic_v1_scaler.pkl'),
-        'baseline':   0.145,
-        'features': [
-            'avg_exit_velo_15',
-            'barrel_rate_15',
-            'hard_hit_rate_15',
-            'hr_zone_rate_15',
-            'is_home',
-            'pitcher_r',
-            'era',
-            'park_factor',
-        ],
-    },
+    info['key']: {'name': info['name'], 'player_id': player_id, 'team_id': info['team_id']}
+    for player_id, info in TRACKED_PLAYERS.items()
 }
 
-LEAGUE_AVG = {'era': 4.20, 'k_per_9': 8.9}
-MIN_IP     = 10
-
 
 # ─────────────────────────────────────────────
 # HELPERS
@@ -106,138 +53,68 @@ def american_odds_to_prob(odds):
     else:
         return 100 / (odds + 100)
 
+def pitcher_hand(throws):
+    return f"{throws}HP" if throws in ('R', 'L') else "hand unknown"
+
 
 # ─────────────────────────────────────────────
-# STEP 1: PITCHER STATS
+# FEATURE ROW
+# Pitcher, bullpen, park and Statcast features all come from
+# feature_store.as_of_many() — the same columns the models were trained on,
+# built from the prefetched starter and the rolling Statcast state
 # ─────────────────────────────────────────────
 
-def fetch_pitcher_stats(pitcher_id, pitcher_name):
-    """
-    Fetch ERA, K/9, and handedness for a pitcher.
-    Priority: current season (if MIN_IP met) -> prior season -> league average.
-    """
-    current_year = datetime.now().year
-
-    for season in [current_year, current_year - 1]:
-        url = (
-            f"https://statsapi.mlb.com/api/v1/people/{pitcher_id}"
-            f"?hydrate=stats(group=pitching,type=season,season={season})"
-        )
-        try:
-            r = requests.get(url, timeout=10)
-            data = r.json()
-            person = data['people'][0]
-            throws = person.get('pitchHand', {}).get('code', 'R')
-
-            stats_list = person.get('stats', [])
-            if not stats_list:
-                continue
-
-            s = stats_list[0].get('splits', [])
-            if not s:
-                continue
-
-            pitching = s[0]['stat']
-            ip_str   = pitching.get('inningsPitched', '0.0')
-            ip_whole, ip_frac = divmod(float(ip_str), 1)
-            ip = ip_whole + (ip_frac * 10 / 3)
+NEUTRAL_CONTACT = {
+    'avg_exit_velo': 89.0,
+    'barrel_rate':    0.08,
+    'hard_hit_rate':  0.38,
+    'hr_zone_rate':   0.12,
+}
 
-            if ip < MIN_IP:
-                print(f"  {season} sample too small ({ip:.1f} IP) — trying prior season...")
-                continue
+# Every rolling window / EWMA of a contact column gets that column's neutral value
+NEUTRAL_STATCAST = {
+    name: NEUTRAL_CONTACT[col]
+    for col in ROLLING_COLUMNS
+    for name in rolling_feature_names([col])
+}
 
-            era     = float(pitching.get('era', LEAGUE_AVG['era']))
-            so      = float(pitching.get('strikeOuts', 0))
-            k_per_9 = round((so / ip) * 9, 2) if ip > 0 else LEAGUE_AVG['k_per_9']
 
-            print(f"  Loaded {pitcher_name} {season}: ERA {era}, K/9 {k_per_9}, IP {ip:.1f}, throws {throws}")
-            return era, k_per_9, throws
+def missing_features(row, features):
+    """Features the row has no finite value for — a scorer would return NaN."""
+    values = pd.to_numeric(row.reindex(features), errors='coerce').astype('float64')
+    return [f for f, v in values.items() if not np.isfinite(v)]
 
-        except Exception as e:
-            print(f"  API error for {pitcher_name} {season}: {e}")
-            continue
 
-    print(f"  Falling back to league averages for {pitcher_name}")
-    return LEAGUE_AVG['era'], LEAGUE_AVG['k_per_9'], 'R'
+def feature_rows(matchups, date, features=None):
+    """
+    As-of feature rows for matchups on date (each with its 'player' key) from
+    one batched feature_store.as_of_many(), with neutral Statcast values for
+    any rolling feature a player doesn't have enough history for, and a
+    neutral park when the park isn't stored.
+    features (every scorer's) limits the optional columns built.
+    None where no row can be built.
+    """
+    rows = feature_store.as_of_many(date, [
+        {**m, 'player_id': PLAYERS[m['player']]['player_id']} for m in matchups
+    ], features)
 
+    filled = []
+    for m, row in zip(matchups, rows):
+        thin = [] if row is None else missing_features(row, list(NEUTRAL_STATCAST))
+        if thin:
+            print(f"  {PLAYERS[m['player']]['name']}: not enough Statcast history for "
+                  f"{len(thin)} rolling feature(s) — using neutral values")
+            row = row.fillna({name: NEUTRAL_STATCAST[name] for name in thin})
+        if row is not None and pd.isna(row['park_factor']):
+            print(f"  No park factor found for team_id {m.get('park_team_id')}, using 100")
+            row = row.fillna({'park_factor': 100.0})
+        filled.append(row)
+    return filled
 
-# ─────────────────────────────────────────────
-# STEP 2: PARK FACTOR
-# ─────────────────────────────────────────────
 
-def get_park_factor(opponent_id, is_home, home_team_id):
-    """Look up park factor. Home = player's home park, Away = opponent park."""
-    park_team_id = home_team_id if is_home else opponent_id
-    with engine.connect() as conn:
-        result = conn.execute(text(
-            "SELECT park_factor FROM park_factors WHERE team_id = :tid"
-        ), {"tid": park_team_id}).fetchone()
-    if result:
-        return float(result[0])
-    print(f"  No park factor found for team_id {park_team_id}, using 100")
-    return 100.0
-
-
-# ─────────────────────────────────────────────
-# STEP 3: STATCAST ROLLING FEATURES
-# ─────────────────────────────────────────────
-
-def get_statcast_features(player_id, player_name):
-    """
-    Pull player's Statcast data and compute 15-day rolling features.
-    Returns the most recent row's rolling values.
-    """
-    today    = datetime.now().date()
-    lookback = today - timedelta(days=60)
-
-    print(f"  Pulling Statcast data for {player_name}...")
-    raw = statcast_batter(str(lookback), str(today), player_id=player_id)
-
-    if raw.empty:
-        print("  No Statcast data — using neutral values")
-        return {
-            'avg_exit_velo_15': 89.0,
-            'barrel_rate_15':    0.08,
-            'hard_hit_rate_15':  0.38,
-            'hr_zone_rate_15':   0.12,
-        }
-
-    batted = raw[raw['launch_speed'].notna()].copy()
-    batted['in_hr_zone'] = batted['launch_angle'].between(25, 35).astype(int)
-
-    game_stats = batted.groupby('game_date').agg(
-        avg_exit_velo=('launch_speed', 'mean'),
-        barrel_count=('launch_speed_angle', lambda x: (x == 6).sum()),
-        hard_hit_count=('launch_speed', lambda x: (x >= 95).sum()),
-        hr_zone_count=('in_hr_zone', 'sum'),
-        batted_balls=('launch_speed', 'count'),
-    ).reset_index().sort_values('game_date')
-
-    game_stats['barrel_rate']   = game_stats['barrel_count']   / game_stats['batted_balls']
-    game_stats['hard_hit_rate'] = game_stats['hard_hit_count'] / game_stats['batted_balls']
-    game_stats['hr_zone_rate']  = game_stats['hr_zone_count']  / game_stats['batted_balls']
-
-    game_stats['avg_exit_velo_15'] = game_stats['avg_exit_velo'].shift(1).rolling(15, min_periods=5).mean()
-    game_stats['barrel_rate_15']   = game_stats['barrel_rate'].shift(1).rolling(15, min_periods=5).mean()
-    game_stats['hard_hit_rate_15'] = game_stats['hard_hit_rate'].shift(1).rolling(15, min_periods=5).mean()
-    game_stats['hr_zone_rate_15']  = game_stats['hr_zone_rate'].shift(1).rolling(15, min_periods=5).mean()
-
-    last = game_stats.dropna(subset=['avg_exit_velo_15']).iloc[-1]
-
-    features = {
-        'avg_exit_velo_15': round(last['avg_exit_velo_15'], 2),
-        'barrel_rate_15':   round(last['barrel_rate_15'],   3),
-        'hard_hit_rate_15': round(last['hard_hit_rate_15'], 3),
-        'hr_zone_rate_15':  round(last['hr_zone_rate_15'],  3),
-    }
-    print(
-        f"  Statcast (15-day rolling): "
-        f"exit velo {features['avg_exit_velo_15']:.1f} mph  |  "
-        f"barrel {features['barrel_rate_15']*100:.1f}%  |  "
-        f"hard hit {features['hard_hit_rate_15']*100:.1f}%  |  "
-        f"HR zone {features['hr_zone_rate_15']*100:.1f}%"
-    )
-    return features
+def feature_row(player_key, matchup, date, features=None):
+    """feature_rows() for a single matchup."""
+    return feature_rows([{**matchup, 'player': player_key}], date, features)[0]
 
 
 # ─────────────────────────────────────────────
@@ -251,46 +128,58 @@ def predict(player_key, pitcher_name, pitcher_id, opponent_id, is_home, book_odd
         return
 
     player   = PLAYERS[player_key]
-    model    = joblib.load(player['model'])
-    scaler   = joblib.load(player['scaler'])
-    features = player['features']
-    baseline = player['baseline']
+    scorer   = registry.get_fused(player_key)
+    features = scorer.features
 
     print("\n" + "="*50)
     print(f"  {player['name']} HR Prop — {datetime.now().strftime('%B %d, %Y')}")
     print("="*50)
 
-    # Pitcher
-    print("\n[1/3] Fetching pitcher stats...")
-    era, k_per_9, throws = fetch_pitcher_stats(pitcher_id, pitcher_name)
-    pitcher_r = 1 if throws == 'R' else 0
-
-    # Park
-    print("\n[2/3] Looking up park factor...")
-    park_factor = get_park_factor(opponent_id, is_home, player['team_id'])
-    location    = "Home" if is_home else "Away"
-    print(f"  Park factor: {park_factor} ({location})")
-
     # Statcast
-    print("\n[3/3] Computing rolling Statcast features...")
-    statcast = get_statcast_features(player['player_id'], player['name'])
-
-    # Assemble feature row — only pass features this player's model uses
-    row = {
-        'avg_exit_velo_15': statcast['avg_exit_velo_15'],
-        'barrel_rate_15':   statcast['barrel_rate_15'],
-        'hard_hit_rate_15': statcast['hard_hit_rate_15'],
-        'hr_zone_rate_15':  statcast['hr_zone_rate_15'],
-        'is_home':          int(is_home),
-        'pitcher_r':        pitcher_r,
-        'era':              era,
-        'k_per_9':          k_per_9,
-        'park_factor':      park_factor,
-    }
+    print("\n[1/2] Refreshing Statcast cache...")
+    update_batter(player['player_id'])
+
+    # Pitcher, park, bullpen and rolling Statcast as of today
+    print("\n[2/2] Building as-of feature row...")
+
+    # Tonight's game_pk from the schedule, so the prefetched starter and
+    # bullpen rows are used instead of the as-of fallback
+    date  = datetime.now().strftime('%Y-%m-%d')
+    game  = next((m for m in resolve_matchups(fetch_slate(date), [player_key])
+                  if m['opponent_id'] == opponent_id), None)
+    if game is None:
+        print(f"  ⚠️ No game vs team_id {opponent_id} on today's schedule — building from the as-of fallback")
+    row = feature_row(player_key, {
+        'game_pk':      game and game['game_pk'],
+        'opponent_id':  opponent_id,
+        'is_home':      int(is_home),
+        'park_team_id': game['park_team_id'] if game else (player['team_id'] if is_home else opponent_id),
+        'pitcher_id':   pitcher_id,
+        'throws':       game['throws'] if game and game['pitcher_id'] == pitcher_id else None,
+    }, date, features)
+    if row is None:
+        print("❌ Could not build a feature row for this matchup.")
+        return
+    missing = missing_features(row, features)
+    if missing:
+        print(f"❌ No value for {missing} — can't score this matchup.")
+        return
+
+    era, k_per_9 = row['era'], row['k_per_9']
+    park_factor  = row['park_factor']
+    print(f"  Loaded {pitcher_name}: ERA {era}, K/9 {k_per_9}, {pitcher_hand(row['throws'])}"
+          + ("  (league average — no stats stored)" if row.get('pitcher_imputed') else ""))
+    print(f"  Park factor: {park_factor} ({'Home' if is_home else 'Away'})")
+    print(
+        f"  Statcast (15-game rolling): "
+        f"exit velo {row['avg_exit_velo_15']:.1f} mph  |  "
+        f"barrel {row['barrel_rate_15']*100:.1f}%  |  "
+        f"hard hit {row['hard_hit_rate_15']*100:.1f}%  |  "
+        f"HR zone {row['hr_zone_rate_15']*100:.1f}%"
+    )
 
     X = pd.DataFrame([row])[features]
-    X_scaled = scaler.transform(X)
-    p_hr = model.predict_proba(X_scaled)[0][1]
+    p_hr = scorer.predict_proba(X)[0]
 
     # Output
     implied = prob_to_american_odds(p_hr)
@@ -299,7 +188,7 @@ def predict(player_key, pitcher_name, pitcher_id, opponent_id, is_home, book_odd
     print(f"  {player['name']}  |  {datetime.now().strftime('%b %d, %Y')}")
     print(f"  {'Home vs' if is_home else 'Away @'} team_id {opponent_id}  |  Park factor: {park_factor}")
     print("-"*50)
-    print(f"  Pitcher:   {pitcher_name} ({'RHP' if pitcher_r else 'LHP'})  |  ERA {era}" + (f"  |  K/9 {k_per_9}" if 'k_per_9' in features else ""))
+    print(f"  Pitcher:   {pitcher_name} ({pitcher_hand(row['throws'])})  |  ERA {era}" + (f"  |  K/9 {k_per_9}" if 'k_per_9' in features else ""))
     print("-"*50)
     print(f"  Model:   {implied:+d}   ({p_hr*100:.1f}%)")
 
@@ -322,12 +211,158 @@ def predict(player_key, pitcher_name, pitcher_id, opponent_id, is_home, book_odd
     print("="*50 + "\n")
 
 
+# ─────────────────────────────────────────────
+# SLATE — every tracked player from one schedule call
+# ─────────────────────────────────────────────
+
+def fetch_slate(date):
+    """Games on date with probable pitchers — one schedule call."""
+    url = (
+        f"{mlb_api.BASE_URL}/schedule"
+        f"?sportId=1&date={date}&hydrate=probablePitcher"
+    )
+    data = mlb_api.get_json(url)
+    return [game for d in data.get('dates', []) for game in d.get('games', [])]
+
+
+def resolve_matchups(games, player_keys):
+    """
+    One row per (tracked player, game on the slate): opponent, home/away,
+    park team, and the opposing probable starter (None if not announced) with
+    his hand when the schedule includes it.
+    """
+    matchups = []
+    for key in player_keys:
+        team_id = PLAYERS[key]['team_id']
+        for game in games:
+            home = game['teams']['home']
+            away = game['teams']['away']
+            if home['team']['id'] == team_id:
+                side, opp = home, away
+            elif away['team']['id'] == team_id:
+                side, opp = away, home
+            else:
+                continue
+
+            pitcher = opp.get('probablePitcher') or {}
+            matchups.append({
+                'player':       key,
+                'game_pk':      game['gamePk'],
+                'opponent_id':  opp['team']['id'],
+                'opponent':     opp['team'].get('name', opp['team']['id']),
+                'is_home':      int(side is home),
+                'park_team_id': home['team']['id'],
+                'pitcher_id':   pitcher.get('id'),
+                'pitcher_name': pitcher.get('fullName', 'TBD'),
+                'throws':       pitcher.get('pitchHand', {}).get('code'),
+            })
+    return matchups
+
+
+def _refresh_statcast(player_ids):
+    """Top up every player's Statcast cache — league-wide daily pulls shared by all players."""
+    for pid in player_ids:
+        if not read_meta(pid):
+            update_batter(pid)   # first run pulls the player's history
+    ingest_league(player_ids)
+
+
+def predict_slate(date=None, player_keys=None, book_odds=None):
+    """
+    Score every tracked player playing on date (default today) in one run:
+    one schedule call, one Statcast refresh, one batched as-of build (one
+    context query, plus one warm + one pitcher read only for starters the
+    prefetch hasn't stored), then one fused predict_proba per model over all
+    its rows.
+    Returns the slate as a DataFrame.
+    """
+    date        = date or datetime.now().strftime('%Y-%m-%d')
+    player_keys = player_keys or list(PLAYERS)
+    book_odds   = book_odds or {}
+
+    print(f"\n🚀 Slate for {date} — {len(player_keys)} tracked players")
+    matchups = resolve_matchups(fetch_slate(date), player_keys)
+
+    idle = sorted(set(player_keys) - {m['player'] for m in matchups})
+    for key in idle:
+        print(f"  ℹ️ {PLAYERS[key]['name']}: no game on {date}")
+    tbd = [m for m in matchups if m['pitcher_id'] is None]
+    for m in tbd:
+        print(f"  ⚠️ {PLAYERS[m['player']]['name']}: probable pitcher not announced — skipping")
+    matchups = [m for m in matchups if m['pitcher_id'] is not None]
+    if not matchups:
+        print("❌ No scorable matchups.")
+        return pd.DataFrame()
+
+    keys    = sorted({m['player'] for m in matchups})
+    scorers = {key: registry.get_fused(key) for key in keys}
+    _refresh_statcast([PLAYERS[k]['player_id'] for k in keys])
+
+    features = sorted(set().union(*(scorer.features for scorer in scorers.values())))
+    rows     = []
+    for m, row in zip(matchups, feature_rows(matchups, date, features)):
+        if row is None:
+            print(f"  ⚠️ {PLAYERS[m['player']]['name']}: no feature row — skipping")
+            continue
+        missing = missing_features(row, scorers[m['player']].features)
+        if missing:
+            print(f"  ⚠️ {PLAYERS[m['player']]['name']}: no value for {missing} — skipping")
+            continue
+        rows.append({**m, **row.to_dict()})
+    if not rows:
+        print("❌ No scorable matchups.")
+        return pd.DataFrame()
+    slate = pd.DataFrame(rows)
+
+    # One fused predict_proba per model over every row it scores
+    slate['p_hr'] = np.nan
+    slate['baseline'] = np.nan
+    for key, idx in slate.groupby('player').groups.items():
+        scorer = scorers[key]
+        slate.loc[idx, 'p_hr']     = scorer.predict_proba(slate.loc[idx])
+        slate.loc[idx, 'baseline'] = scorer.baseline
+
+    slate['name']       = slate['player'].map(lambda k: PLAYERS[k]['name'])
+    slate['model_odds'] = slate['p_hr'].map(prob_to_american_odds)
+    slate['book_odds']  = slate['player'].map(book_odds)
+    slate['edge']       = slate['p_hr'] - slate['book_odds'].map(
+        lambda o: american_odds_to_prob(o) if pd.notna(o) else np.nan
+    )
+
+    print("\n" + "="*50)
+    for _, r in slate.sort_values('p_hr', ascending=False).iterrows():
+        where = 'vs' if r['is_home'] else '@'
+        line  = (
+            f"  {r['name']:<18} {where} {r['opponent']:<22} "
+            f"{r['pitcher_name']} ({pitcher_hand(r['throws'])})  |  "
+            f"{r['model_odds']:+d} ({r['p_hr']*100:.1f}%)"
+        )
+        if pd.notna(r['edge']):
+            line += f"  |  book {int(r['book_odds']):+d}  edge {r['edge']*100:+.1f}pp"
+        print(line)
+    print("="*50 + "\n")
+
+    return slate
+
+
 # ─────────────────────────────────────────────
 # INPUTS — fill these in before running
 # ─────────────────────────────────────────────
 
 if __name__ == "__main__":
-    PLAYER       = "julio"   # "witt", "julio", or "greene"
+    parser = argparse.ArgumentParser(description="HR prop predictions.")
+    parser.add_argument("command", nargs="?", default="single", choices=["single", "slate"],
+                        help="single: the hand-filled matchup below (default); slate: every tracked player tonight")
+    parser.add_argument("--date", help="slate date YYYY-MM-DD (default: today)")
+    parser.add_argument("--players", nargs="*", choices=list(PLAYERS),
+                        help="limit the slate to these players (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "slate":
+        predict_slate(args.date, args.players)
+        sys.exit(0)
+
+    PLAYER       = "julio"   # any key in PLAYERS, e.g. "witt", "schwarber"
 
     PITCHER_NAME = "Walker Buehler"       # e.g. "Tanner Bibee"
     PITCHER_ID   = 621111     # e.g. 669456
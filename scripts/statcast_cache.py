@@ -0,0 +1,422 @@
+### statcast_cache.py - Local Parquet cache of Statcast pitch-level data
+# Partitioned by batter and season: data/statcast/player_id=<id>/season=<yyyy>.parquet
+# predict.py and the model notebooks read from here instead of scraping Baseball Savant;
+# the daily update only pulls dates after each player's last fetched date
+#
+# Usage:
+#   python scripts/statcast_cache.py ingest             # daily: one league-wide pull per day, sliced per player
+#   python scripts/statcast_cache.py update             # per-player pulls for every player in PLAYERS
+#   python scripts/statcast_cache.py update 677951      # one player
+#   python scripts/statcast_cache.py backfill 694192 --start 2024-03-01 --workers 6
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+BASE_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "data", "statcast")
+
+DEFAULT_START = "2022-04-01"
+
+# Savant often publishes the previous day only partially — a day is marked
+# fetched (final) once it is at least this many days old, so yesterday is
+# re-pulled on the next run and its late rows replace the partial ones
+FINAL_LAG_DAYS = 2
+
+# One row per pitch — re-fetched days overwrite instead of duplicating
+PITCH_KEY = ["game_pk", "at_bat_number", "pitch_number"]
+
+# Only the columns the models use are cached, with compact dtypes
+# (~40 bytes/pitch instead of ~118 mostly-unused Savant columns)
+STATCAST_DTYPES = {
+    "game_date":          "datetime64[ns]",
+    "game_pk":            "int32",
+    "at_bat_number":      "int16",
+    "pitch_number":       "int16",
+    "batter":             "int32",
+    "pitcher":            "int32",
+    "stand":              "category",
+    "p_throws":           "category",
+    "events":             "category",
+    "launch_speed":       "float32",
+    "launch_angle":       "float32",
+    "launch_speed_angle": "Int8",
+}
+
+
+# ─────────────────────────────────────────────
+# PATHS + METADATA
+# ─────────────────────────────────────────────
+
+def _player_dir(player_id):
+    return os.path.join(CACHE_DIR, f"player_id={player_id}")
+
+
+def _season_path(player_id, season):
+    return os.path.join(_player_dir(player_id), f"season={season}.parquet")
+
+
+def _meta_path(player_id):
+    return os.path.join(_player_dir(player_id), "_meta.json")
+
+
+def _chunk_path(player_id, start, end):
+    return os.path.join(_player_dir(player_id), "_chunks", f"{start}_{end}.parquet")
+
+
+def _to_date(d):
+    return pd.Timestamp(d).date()
+
+
+def _final_through(through):
+    """Last day of [.., through] that can be recorded as fetched_through."""
+    return min(through, datetime.now().date() - timedelta(days=FINAL_LAG_DAYS))
+
+
+def read_meta(player_id):
+    """
+    Fetched date range for a player: {'fetched_from', 'fetched_through', 'pulled_through'}.
+    fetched_through is the last final day; pulled_through is the last day with
+    any rows cached, possibly still partial.
+    """
+    path = _meta_path(player_id)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        meta = json.load(f)
+    meta = {k: _to_date(v) for k, v in meta.items()}
+    meta.setdefault("pulled_through", meta["fetched_through"])
+    return meta
+
+
+def _write_meta(player_id, meta):
+    os.makedirs(_player_dir(player_id), exist_ok=True)
+    path = _meta_path(player_id)
+    with open(path + ".tmp", "w") as f:
+        json.dump({k: str(v) for k, v in meta.items()}, f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_parquet(df, path):
+    # Write then rename so a crash never leaves a half-written partition
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+# ─────────────────────────────────────────────
+# WRITE
+# ─────────────────────────────────────────────
+
+def compact_pitches(pitches):
+    """Project raw Savant rows to STATCAST_DTYPES columns and downcast."""
+    if pitches.empty:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in STATCAST_DTYPES.items()})
+
+    out = pitches[list(STATCAST_DTYPES)].copy()
+    out["game_date"] = pd.to_datetime(out["game_date"])
+    for col, dtype in STATCAST_DTYPES.items():
+        if col == "game_date":
+            continue
+        if dtype == "Int8":
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype(dtype)
+        elif dtype == "category":
+            out[col] = out[col].astype("object").astype(dtype)
+        else:
+            out[col] = out[col].astype(dtype)
+    return out
+
+
+def append_pitches(player_id, pitches):
+    """Merge pitch rows into the player's season partitions (deduplicated on PITCH_KEY)."""
+    if pitches.empty:
+        return
+
+    pitches = compact_pitches(pitches)
+
+    for season, part in pitches.groupby(pitches["game_date"].dt.year):
+        path = _season_path(player_id, season)
+        if os.path.exists(path):
+            part = compact_pitches(pd.concat([pd.read_parquet(path), part], ignore_index=True))
+
+        part = (
+            part.drop_duplicates(subset=PITCH_KEY, keep="last")
+                .sort_values(["game_date", "game_pk", "at_bat_number", "pitch_number"])
+                .reset_index(drop=True)
+        )
+        _write_parquet(part, path)
+
+
+def _fetch_batter(player_id, start, end):
+    from pybaseball import statcast_batter   # heavy import — only paid on a cache miss
+    return statcast_batter(str(start), str(end), player_id=player_id)
+
+
+def _missing_ranges(meta, start, through):
+    """Date ranges in [start, through] not yet covered by a player's cache."""
+    if not meta:
+        gaps = [(start, through)]
+    else:
+        gaps = [
+            (start, meta["fetched_from"] - timedelta(days=1)),
+            (meta["fetched_through"] + timedelta(days=1), through),
+        ]
+    return [(s, e) for s, e in gaps if s <= e]
+
+
+def update_batter(player_id, through=None, start=DEFAULT_START):
+    """
+    Extend a player's cache to cover [start, through] (through defaults to yesterday).
+    Only the missing dates on either end are fetched, plus any day too recent
+    to be final (see FINAL_LAG_DAYS). Returns pitches fetched.
+    """
+    through = _to_date(through) if through else datetime.now().date() - timedelta(days=1)
+    start   = _to_date(start)
+    meta    = read_meta(player_id)
+    gaps    = _missing_ranges(meta, start, through)
+
+    fetched = 0
+    for gap_start, gap_end in gaps:
+        print(f"  Statcast cache: fetching {player_id} {gap_start} → {gap_end}...")
+        raw = _fetch_batter(player_id, gap_start, gap_end)
+        append_pitches(player_id, raw)
+        fetched += len(raw)
+
+    if gaps:
+        final = _final_through(through)
+        _write_meta(player_id, {
+            "fetched_from":    min(start, meta.get("fetched_from", start)),
+            "fetched_through": max(final, meta.get("fetched_through", final)),
+            "pulled_through":  max(through, meta.get("pulled_through", through)),
+        })
+    return fetched
+
+
+# ─────────────────────────────────────────────
+# CHUNKED BACKFILL
+# Multi-season history split into fixed-size date chunks, fetched on a
+# bounded pool and checkpointed one file per chunk — a crash or a failed
+# chunk only costs that chunk, rerunning resumes from the checkpoints
+# ─────────────────────────────────────────────
+
+OFFSEASON_MONTHS = {12, 1, 2}
+
+
+def date_chunks(start, end, chunk_days=7):
+    """Split [start, end] into chunk_days windows, skipping chunks entirely in the offseason."""
+    chunk_days = max(1, min(chunk_days, 31))
+    chunks = []
+    day = start
+    while day <= end:
+        chunk_end = min(day + timedelta(days=chunk_days - 1), end)
+        if not (day.month in OFFSEASON_MONTHS and chunk_end.month in OFFSEASON_MONTHS):
+            chunks.append((day, chunk_end))
+        day = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def _fetch_chunk(player_id, start, end):
+    pitches = compact_pitches(_fetch_batter(player_id, start, end))
+    _write_parquet(pitches, _chunk_path(player_id, start, end))
+    return len(pitches)
+
+
+def backfill_batter(player_id, start=DEFAULT_START, end=None, chunk_days=7, workers=4):
+    """
+    Fill a player's cache for [start, end] (end defaults to yesterday) with
+    concurrent chunk fetches. Returns True once every chunk is merged.
+    """
+    end   = _to_date(end) if end else datetime.now().date() - timedelta(days=1)
+    start = _to_date(start)
+    meta  = read_meta(player_id)
+
+    chunks = [
+        chunk
+        for gap_start, gap_end in _missing_ranges(meta, start, end)
+        for chunk in date_chunks(gap_start, gap_end, chunk_days)
+    ]
+    todo = [c for c in chunks if not os.path.exists(_chunk_path(player_id, *c))]
+    print(f"  {player_id}: {len(chunks)} chunks, {len(chunks) - len(todo)} already checkpointed")
+
+    t0      = time.monotonic()
+    pitches = 0
+    failed  = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_fetch_chunk, player_id, s, e): (s, e) for s, e in todo}
+        for i, future in enumerate(as_completed(futures), 1):
+            s, e = futures[future]
+            try:
+                pitches += future.result()
+            except Exception as ex:
+                failed.append((s, e))
+                print(f"  ⚠️ Chunk {s} → {e} failed: {ex}")
+                continue
+            elapsed = time.monotonic() - t0
+            print(f"  [{i}/{len(todo)}] {s} → {e}  |  {pitches / elapsed:,.0f} pitches/s  |  {i / elapsed:.2f} chunks/s")
+
+    if failed:
+        print(f"  ⚠️ {len(failed)} chunk(s) failed — rerun backfill to resume from checkpoints")
+        return False
+
+    if chunks:
+        frames = [pd.read_parquet(_chunk_path(player_id, *c)) for c in chunks]
+        append_pitches(player_id, pd.concat(frames, ignore_index=True))
+        final = _final_through(end)
+        _write_meta(player_id, {
+            "fetched_from":    min(start, meta.get("fetched_from", start)),
+            "fetched_through": max(final, meta.get("fetched_through", final)),
+            "pulled_through":  max(end, meta.get("pulled_through", end)),
+        })
+        for c in chunks:
+            os.remove(_chunk_path(player_id, *c))
+
+    elapsed = time.monotonic() - t0
+    print(f"  ✅ {player_id}: {pitches:,} pitches fetched in {elapsed:.1f}s")
+    return True
+
+
+# ─────────────────────────────────────────────
+# LEAGUE-WIDE DAILY INGEST
+# One Savant pull per day for the whole league, sliced to every tracked
+# batter — network cost no longer grows with the number of players
+# ─────────────────────────────────────────────
+
+def _fetch_league(start, end):
+    from pybaseball import statcast
+    return statcast(start_dt=str(start), end_dt=str(end), verbose=False)
+
+
+LEAGUE_INGEST_DAYS = 7     # most recent days the shared league-wide pull may cover
+
+
+def ingest_league(player_ids, through=None):
+    """
+    Pull league-wide pitches for each day after the laggiest tracked player's
+    fetched_through (through defaults to yesterday) and fan them out per batter.
+    Days newer than FINAL_LAG_DAYS are pulled but not marked fetched, so the
+    next run pulls them again.
+
+    The league pull covers at most the last LEAGUE_INGEST_DAYS days; a player
+    further behind (stale, or re-added) is caught up to that window with their
+    own update_batter first, so one laggard never costs every player a
+    league-wide download per missed day. Players with no cache yet start at
+    the first ingested day — their history comes from update_batter /
+    backfill. Returns pitches cached per player.
+    """
+    through = _to_date(through) if through else datetime.now().date() - timedelta(days=1)
+    window  = through - timedelta(days=LEAGUE_INGEST_DAYS - 1)
+    metas   = {pid: read_meta(pid) for pid in player_ids}
+
+    for pid, meta in metas.items():
+        if meta and meta["fetched_through"] < window - timedelta(days=1):
+            print(f"  ℹ️ {pid} last final {meta['fetched_through']} — catching up on its own before the league pull")
+            update_batter(pid, through=window - timedelta(days=1), start=meta["fetched_from"])
+            metas[pid] = read_meta(pid)
+
+    known = [m["fetched_through"] for m in metas.values() if m]
+    begin = max(min(known) + timedelta(days=1), window) if known else through
+
+    tracked = {pid: [] for pid in player_ids}
+    day = begin
+    while day <= through:
+        pitches = compact_pitches(_fetch_league(day, day))
+        print(f"  {day}: {len(pitches)} league pitches")
+
+        mine = pitches[pitches["batter"].isin(player_ids)]
+        for pid, part in mine.groupby("batter", observed=True):
+            meta = metas[pid]
+            if not meta or meta["fetched_through"] < day:
+                tracked[pid].append(part)
+        day += timedelta(days=1)
+
+    if begin > through:
+        return {pid: 0 for pid in player_ids}
+
+    final  = _final_through(through)
+    counts = {}
+    for pid, parts in tracked.items():
+        if parts:
+            append_pitches(pid, pd.concat(parts, ignore_index=True))
+        meta = metas[pid]
+        _write_meta(pid, {
+            "fetched_from":    meta.get("fetched_from", begin),
+            "fetched_through": max(final, meta.get("fetched_through", final)),
+            "pulled_through":  max(through, meta.get("pulled_through", through)),
+        })
+        counts[pid] = sum(len(p) for p in parts)
+    return counts
+
+
+# ─────────────────────────────────────────────
+# READ
+# ─────────────────────────────────────────────
+
+def load_batter(player_id, start, end):
+    """Read cached pitches for [start, end] from local Parquet only — no network."""
+    start, end = _to_date(start), _to_date(end)
+
+    frames = [
+        pd.read_parquet(_season_path(player_id, season))
+        for season in range(start.year, end.year + 1)
+        if os.path.exists(_season_path(player_id, season))
+    ]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    dates = df["game_date"].dt.date
+    return df[(dates >= start) & (dates <= end)].reset_index(drop=True)
+
+
+def cached_statcast_batter(start_dt, end_dt, player_id):
+    """
+    Stand-in for pybaseball.statcast_batter backed by the local cache — same
+    arguments and rows, but only the STATCAST_DTYPES columns (the ones the
+    models use), not Savant's full column set.
+    Tops the cache up (through yesterday at most) before reading.
+    """
+    yesterday = datetime.now().date() - timedelta(days=1)
+    update_batter(player_id, through=min(_to_date(end_dt), yesterday), start=start_dt)
+    return load_batter(player_id, start_dt, end_dt)
+
+
+# ─────────────────────────────────────────────
+# DAILY UPDATE
+# ─────────────────────────────────────────────
+
+if __name__ == "__main__":
+    from data_collection import PLAYERS
+
+    parser = argparse.ArgumentParser(description="Maintain the local Statcast pitch cache.")
+    parser.add_argument("command", choices=["ingest", "update", "backfill"],
+                        help="ingest = league-wide daily pull sliced per player; update = per-player pulls; "
+                             "backfill = concurrent chunked history pull with checkpoints")
+    parser.add_argument("player_ids", nargs="*", type=int,
+                        help="players to refresh (default: every player in PLAYERS)")
+    parser.add_argument("--start", default=DEFAULT_START, help=f"backfill start date (default {DEFAULT_START})")
+    parser.add_argument("--end", default=None, help="backfill end date (default yesterday)")
+    parser.add_argument("--chunk-days", type=int, default=7, help="days per backfill chunk (max 31)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent backfill chunk fetches")
+    args = parser.parse_args()
+
+    player_ids = args.player_ids or list(PLAYERS)
+
+    if args.command == "backfill":
+        for player_id in player_ids:
+            backfill_batter(player_id, start=args.start, end=args.end,
+                            chunk_days=args.chunk_days, workers=args.workers)
+    elif args.command == "ingest":
+        counts = ingest_league(player_ids)
+        for player_id in player_ids:
+            name = PLAYERS.get(player_id, {}).get("name", player_id)
+            print(f"✅ {name}: {counts[player_id]} new pitches cached (through {read_meta(player_id)['fetched_through']})")
+    else:
+        for player_id in player_ids:
+            name = PLAYERS.get(player_id, {}).get("name", player_id)
+            n = update_batter(player_id)
+            print(f"✅ {name}: {n} new pitches cached (through {read_meta(player_id)['fetched_through']})")
@@ -0,0 +1,271 @@
+### statcast_features.py - Shared Statcast game-level aggregation
+# Used by predict.py and every model notebook so training and serving compute
+# contact quality the same way. Keyed on (batter, game_pk) — doubleheaders stay
+# two games — and vectorized: boolean flag columns + native sum/mean reducers,
+# no per-group Python lambdas, so league-wide pitch data aggregates in one pass.
+#
+# Rolling features (7/15/30-game windows + EWMA) come in two matching forms:
+# add_rolling_features() over full history for training, and RollingFeatures,
+# an O(1)-per-game incremental state persisted in data/features/rolling/ for serving.
+
+import json
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+HARD_HIT_MPH  = 95     # exit velocity threshold for a hard-hit ball
+BARREL_CODE   = 6      # launch_speed_angle category 6 = barrel
+HR_ZONE_ANGLE = (25, 35)   # launch angle band where balls most frequently leave the park
+
+GAME_KEY = ["batter", "game_pk"]
+
+# Rolling contact-quality features: {column}_{window} over the prior N games
+# and {column}_ewm{span} exponentially weighted — always strictly before the game
+ROLLING_COLUMNS = ["avg_exit_velo", "barrel_rate", "hard_hit_rate", "hr_zone_rate"]
+ROLLING_WINDOWS = (7, 15, 30)
+MIN_PERIODS     = {7: 3, 15: 7, 30: 15}   # matches the notebooks' rolling(7, 3) / rolling(15, 7)
+EWM_SPANS       = (7, 15)
+
+BASE_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.path.join(BASE_DIR, "data", "features", "rolling")
+
+
+def aggregate_games(pitches):
+    """
+    Collapse pitch-level Statcast rows to one row per (batter, game_pk).
+
+    Only batted balls (launch_speed present) count. Returns game_date plus
+    avg/max exit velo, barrel / hard-hit / HR-zone counts and rates, and
+    batted_balls, sorted by batter, game_date, game_pk.
+    """
+    batted = pitches[pitches["launch_speed"].notna()]
+
+    launch_speed = batted["launch_speed"].astype("float64")
+    flags = pd.DataFrame({
+        "batter":       batted["batter"].to_numpy(),
+        "game_pk":      batted["game_pk"].to_numpy(),
+        "game_date":    pd.to_datetime(batted["game_date"]).to_numpy(),
+        "launch_speed": launch_speed.to_numpy(),
+        "is_barrel":    batted["launch_speed_angle"].eq(BARREL_CODE).fillna(False).to_numpy(dtype="int8"),
+        "is_hard_hit":  (launch_speed >= HARD_HIT_MPH).to_numpy(dtype="int8"),
+        "in_hr_zone":   batted["launch_angle"].between(*HR_ZONE_ANGLE).to_numpy(dtype="int8"),
+    })
+
+    games = (
+        flags.groupby(GAME_KEY, sort=False)
+             .agg(
+                 game_date=("game_date", "first"),
+                 avg_exit_velo=("launch_speed", "mean"),
+                 max_exit_velo=("launch_speed", "max"),
+                 barrel_count=("is_barrel", "sum"),
+                 hard_hit_count=("is_hard_hit", "sum"),
+                 hr_zone_count=("in_hr_zone", "sum"),
+                 batted_balls=("launch_speed", "count"),
+             )
+             .reset_index()
+    )
+
+    games["barrel_rate"]   = games["barrel_count"]   / games["batted_balls"]
+    games["hard_hit_rate"] = games["hard_hit_count"] / games["batted_balls"]
+    games["hr_zone_rate"]  = games["hr_zone_count"]  / games["batted_balls"]
+
+    return games.sort_values(["batter", "game_date", "game_pk"]).reset_index(drop=True)
+
+
+# ─────────────────────────────────────────────
+# ROLLING FEATURES — TRAINING (vectorized over history)
+# ─────────────────────────────────────────────
+
+def rolling_feature_names(columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS, ewm_spans=EWM_SPANS):
+    return (
+        [f"{col}_{w}" for w in windows for col in columns]
+        + [f"{col}_ewm{span}" for span in ewm_spans for col in columns]
+    )
+
+
+def add_rolling_features(games, columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS, ewm_spans=EWM_SPANS):
+    """
+    Add as-of rolling features to aggregate_games() output, per batter.
+    Each game's value uses only earlier games (shift(1)) — same numbers
+    RollingFeatures.as_of() serves before that game.
+    """
+    games = games.sort_values(["batter", "game_date", "game_pk"]).reset_index(drop=True)
+    prior = games.groupby("batter", sort=False)[columns].shift(1)
+    prior["batter"] = games["batter"]
+    grouped = prior.groupby("batter", sort=False)
+
+    for w in windows:
+        rolled = grouped[columns].rolling(w, min_periods=MIN_PERIODS.get(w, 1)).mean()
+        rolled = rolled.reset_index(level=0, drop=True).sort_index()
+        for col in columns:
+            games[f"{col}_{w}"] = rolled[col]
+
+    for span in ewm_spans:
+        smoothed = grouped[columns].ewm(span=span).mean()
+        smoothed = smoothed.reset_index(level=0, drop=True).sort_index()
+        for col in columns:
+            games[f"{col}_ewm{span}"] = smoothed[col]
+
+    return games
+
+
+# ─────────────────────────────────────────────
+# ROLLING FEATURES — SERVING (O(1) incremental state)
+# Ring buffer of the last max(windows) games plus running sums per window
+# and running EWMA numerator/denominator — appending a game costs the
+# same whether the player has 10 games of history or 1,000
+# ─────────────────────────────────────────────
+
+class RollingFeatures:
+    """Incremental per-player rolling state; as_of() is the feature vector for the next game."""
+
+    def __init__(self, columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS, ewm_spans=EWM_SPANS):
+        self.columns   = list(columns)
+        self.windows   = tuple(windows)
+        self.ewm_spans = tuple(ewm_spans)
+        self.last_game = None    # (game_date, game_pk) of the latest game folded in
+        self.built_from = None   # cache fetched_from when the state was built — earlier history means rebuild
+
+        k = len(self.columns)
+        self.buffer = deque(maxlen=max(self.windows))
+        self.sums   = {w: np.zeros(k) for w in self.windows}
+        self.counts = {w: np.zeros(k) for w in self.windows}
+        self.ewm    = {span: [np.zeros(k), np.zeros(k)] for span in self.ewm_spans}
+
+    def update(self, game):
+        """Fold one game (mapping with game_date, game_pk and self.columns) into the state."""
+        key = (str(pd.Timestamp(game["game_date"]).date()), int(game["game_pk"]))
+        if self.last_game is not None and key <= tuple(self.last_game):
+            return False   # already seen
+
+        values = np.array([game[col] for col in self.columns], dtype="float64")
+        valid  = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        for w in self.windows:
+            if len(self.buffer) >= w:
+                leaving = self.buffer[-w]
+                left_ok = ~np.isnan(leaving)
+                self.sums[w]   -= np.where(left_ok, leaving, 0.0)
+                self.counts[w] -= left_ok
+            self.sums[w]   += filled
+            self.counts[w] += valid
+
+        # pandas ewm(adjust=True, ignore_na=False): weights decay every game, NaN adds nothing
+        for span in self.ewm_spans:
+            decay = 1 - 2 / (span + 1)
+            num, den = self.ewm[span]
+            self.ewm[span] = [num * decay + filled, den * decay + valid]
+
+        self.buffer.append(values)
+        self.last_game = key
+        return True
+
+    def as_of(self):
+        """Current feature vector — what the next game's row would carry."""
+        features = {}
+        for w in self.windows:
+            enough = (self.counts[w] >= MIN_PERIODS.get(w, 1)) & (self.counts[w] > 0)
+            means  = np.divide(self.sums[w], self.counts[w], out=np.full(len(self.columns), np.nan), where=enough)
+            for col, value in zip(self.columns, means):
+                features[f"{col}_{w}"] = value
+        for span in self.ewm_spans:
+            num, den = self.ewm[span]
+            means = np.divide(num, den, out=np.full(len(self.columns), np.nan), where=den > 0)
+            for col, value in zip(self.columns, means):
+                features[f"{col}_ewm{span}"] = value
+        return features
+
+    def to_dict(self):
+        return {
+            "columns":   self.columns,
+            "windows":   list(self.windows),
+            "ewm_spans": list(self.ewm_spans),
+            "last_game": self.last_game,
+            "built_from": self.built_from,
+            "buffer":    [[None if np.isnan(v) else v for v in row] for row in self.buffer],
+            "sums":      {w: s.tolist() for w, s in self.sums.items()},
+            "counts":    {w: c.tolist() for w, c in self.counts.items()},
+            "ewm":       {span: [num.tolist(), den.tolist()] for span, (num, den) in self.ewm.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d["columns"], d["windows"], d["ewm_spans"])
+        state.last_game = tuple(d["last_game"]) if d["last_game"] else None
+        state.built_from = d.get("built_from")
+        state.buffer.extend(np.array(row, dtype="float64") for row in d["buffer"])
+        state.sums   = {int(w): np.array(s) for w, s in d["sums"].items()}
+        state.counts = {int(w): np.array(c) for w, c in d["counts"].items()}
+        state.ewm    = {int(span): [np.array(num), np.array(den)] for span, (num, den) in d["ewm"].items()}
+        return state
+
+
+def _state_path(player_id):
+    return os.path.join(STATE_DIR, f"{player_id}.json")
+
+
+def save_rolling_state(player_id, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = _state_path(player_id)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state.to_dict(), f)
+    os.replace(path + ".tmp", path)
+
+
+def load_rolling_state(player_id):
+    """
+    Player's rolling state caught up with the local Statcast cache.
+
+    Only games newer than the saved state are read and folded in; the first
+    call for a player builds the state from the full cached history. If the
+    cache has since been backfilled earlier than the state was built from,
+    the state is rebuilt — update() never folds in games older than the last
+    one. Games on days the cache hasn't marked final are applied to the
+    returned copy only, never saved, so a partial day can't stick.
+    """
+    import statcast_cache
+
+    path  = _state_path(player_id)
+    state = None
+    if os.path.exists(path):
+        with open(path) as f:
+            state = RollingFeatures.from_dict(json.load(f))
+
+    meta = statcast_cache.read_meta(player_id)
+    if not meta:
+        return state or RollingFeatures()
+
+    fetched_from = str(meta["fetched_from"])
+    if state is not None and (state.built_from is None or fetched_from < state.built_from):
+        print(f"  ℹ️ Statcast cache for {player_id} now starts {fetched_from} — rebuilding rolling state")
+        state = None
+
+    if state is None:
+        state, start = RollingFeatures(), meta["fetched_from"]
+        state.built_from = fetched_from
+    elif state.last_game:
+        start = pd.Timestamp(state.last_game[0]).date()
+    else:
+        start = meta["fetched_from"]
+
+    pitches = statcast_cache.load_batter(player_id, start, meta["pulled_through"])
+    games   = aggregate_games(pitches).to_dict("records") if not pitches.empty else []
+    final   = pd.Timestamp(meta["fetched_through"])
+
+    changed = False
+    for game in games:
+        if pd.Timestamp(game["game_date"]) <= final:
+            changed |= state.update(game)
+
+    if changed or not os.path.exists(path):
+        save_rolling_state(player_id, state)
+
+    tail = [game for game in games if pd.Timestamp(game["game_date"]) > final]
+    if tail:
+        state = RollingFeatures.from_dict(state.to_dict())
+        for game in tail:
+            state.update(game)
+    return state
@@ -0,0 +1,8 @@
+### conftest.py - Put scripts/ on the import path
+# The scripts import each other as top-level modules (run from scripts/), so
+# the tests do the same. Nothing here needs a database or the network.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
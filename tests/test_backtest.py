@@ -0,0 +1,83 @@
+### test_backtest.py - Bet evaluation and walk-forward leakage
+# evaluate_bets() against a hand-computed ledger; walk_forward() must score
+# each game from earlier games only.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import evaluate_bets, walk_forward
+
+
+# ─────────────────────────────────────────────
+# BET EVALUATION
+# ─────────────────────────────────────────────
+
+def test_evaluate_bets_matches_hand_ledger():
+    #            implied   edge     hit  profit  closing implied  CLV
+    # game 0  +300  .2500  +.0500   yes   +3     +250  .2857    +.0357
+    # game 1  +400  .2000  -.1000   no    -1     +300  .2500    (never bet)
+    # game 2  +200  .3333  +.0667   no    -1     +250  .2857    -.0476
+    # game 3  +400  .2000  +.1500   no    -1      NaN           (no close)
+    p_hr    = np.array([0.30, 0.10, 0.40, 0.35])
+    hit     = np.array([True, False, False, False])
+    odds    = np.array([300, 400, 200, 400])
+    closing = np.array([250, 300, 250, np.nan])
+
+    result = evaluate_bets(p_hr, hit, odds, closing, thresholds=[0.0, 0.06]).set_index("threshold")
+
+    # edge > 0: games 0, 2, 3 — equity 3, 3, 2, 1
+    low = result.loc[0.0]
+    assert (low["n_bets"], low["hits"]) == (3, 1)
+    assert (low["pnl"], low["roi"], low["max_drawdown"]) == pytest.approx((1.0, 0.3333, 2.0))
+    assert low["avg_clv"] == pytest.approx(-0.006)         # (.0357 - .0476) / 2 — game 3 has no close
+    assert low["beat_close"] == pytest.approx(0.5)
+
+    # edge > .06: games 2, 3 — equity 0, 0, -1, -2, drawdown from the 0 start
+    high = result.loc[0.06]
+    assert (high["n_bets"], high["hits"]) == (2, 0)
+    assert (high["pnl"], high["roi"], high["max_drawdown"]) == pytest.approx((-2.0, -1.0, 2.0))
+    assert high["avg_clv"] == pytest.approx(-0.0476)
+    assert high["beat_close"] == pytest.approx(0.0)
+
+
+# ─────────────────────────────────────────────
+# WALK-FORWARD — no lookahead
+# ─────────────────────────────────────────────
+
+def _games(rng, n=360):
+    """One game a day with a doubleheader every 20th day; HR more likely with a higher x."""
+    days  = pd.date_range("2024-04-01", periods=n, freq="D")
+    dates = np.sort(np.concatenate([days, days[::20]]))
+    x     = rng.normal(size=len(dates))
+    return pd.DataFrame({
+        "date":    dates,
+        "game_id": np.arange(len(dates)),
+        "x":       x,
+        "z":       rng.normal(size=len(dates)),
+        "hr":      (rng.random(len(dates)) < 1 / (1 + np.exp(1.5 - x))).astype(int),
+    })
+
+
+def test_walk_forward_never_sees_its_own_date_or_later():
+    rng      = np.random.default_rng(5)
+    df       = _games(rng)
+    features = ["x", "z"]
+    base     = walk_forward(df, features, min_train=150).set_index("game_id")["p_hr"]
+
+    scored = base.dropna().index
+    # Block starts, mid-block games and a doubleheader day
+    days = df.set_index("game_id").loc[scored, "date"]
+    for day in [days.min(), days[days.dt.day == 1].iloc[1], days[days.dt.day == 15].iloc[2],
+                days[days.duplicated()].iloc[0]]:
+        # Rewrite everything from day on: every label, and every other game's features
+        later = df["date"] >= day
+        other = later & ~df["date"].eq(day)
+        changed = df.copy()
+        changed.loc[later, "hr"] = 1 - changed.loc[later, "hr"]
+        changed.loc[other, features] = rng.normal(size=(other.sum(), len(features))) * 5
+
+        p = walk_forward(changed, features, min_train=150).set_index("game_id")["p_hr"]
+        on_day = df.loc[df["date"] == day, "game_id"]
+        assert not base[on_day].isna().any()
+        np.testing.assert_allclose(p[on_day], base[on_day], rtol=1e-12, err_msg=str(day.date()))
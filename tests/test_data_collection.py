@@ -0,0 +1,342 @@
+### test_data_collection.py - The pipeline's database paths, without a database
+# upsert_table runs against a recorded raw connection; the as-of pitcher
+# query's rows are turned into stats by plain functions, checked here
+# against hand-built rows.
+
+from unittest import mock
+
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import Column, Date, Float, Integer, MetaData, Table, Text
+from sqlalchemy.dialects import postgresql
+
+import data_collection
+from data_collection import (
+    BULLPEN_LEAGUE_AVG, BULLPEN_MIN_OUTS, PITCHER_LEAGUE_AVG, PITCHER_MIN_OUTS, build_bullpen_season_log,
+    START_SEASON, bullpen_stats_as_of, classify_probable, fetch_new_game_logs, get_bullpen_stats,
+    get_player_watermark, pitcher_stats_from_row, profile_is_current, upsert_table,
+)
+
+
+# ─────────────────────────────────────────────
+# UPSERT — COPY into staging, then one INSERT ... ON CONFLICT
+# ─────────────────────────────────────────────
+
+class _RecordingCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.log.append(("execute", sql))
+
+    def copy_expert(self, sql, buffer):
+        self.log.append(("copy", sql, buffer.read()))
+
+
+class _RecordingConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return _RecordingCursor(self.log)
+
+    def commit(self):
+        self.log.append(("commit",))
+
+    def rollback(self):
+        self.log.append(("rollback",))
+
+    def close(self):
+        self.log.append(("close",))
+
+
+@pytest.fixture
+def recorded_upsert(monkeypatch):
+    """upsert_table against a fake engine; yields the raw connection's call log."""
+    table = Table(
+        "pitcher_game_logs", MetaData(),
+        Column("game_id", Integer), Column("side", Text), Column("date", Date),
+        Column("pitcher_id", Integer), Column("era", Float),
+    )
+    raw    = _RecordingConnection()
+    engine = mock.Mock(dialect=postgresql.dialect(), raw_connection=mock.Mock(return_value=raw))
+    monkeypatch.setitem(data_collection._table_cache, "pitcher_game_logs", table)
+    monkeypatch.setattr(data_collection, "get_engine", lambda: engine)
+    return raw.log
+
+
+def test_upsert_copies_into_staging_and_merges_on_conflict(recorded_upsert):
+    df = pd.DataFrame({
+        "game_id":    [1, 1, 2],
+        "side":       ["home", "home", "away"],
+        "date":       ["2026-04-01", "2026-04-01", "2026-04-02"],
+        "pitcher_id": [10.0, 11.0, None],    # float with a gap — must reach COPY as integers
+        "era":        [3.5, 4.0, None],
+    })
+    upsert_table(df, "pitcher_game_logs", ["game_id", "side"])
+
+    (_, create), (_, copy, payload), (_, merge), commit, close = recorded_upsert
+    assert create == ("CREATE TEMP TABLE _stage_pitcher_game_logs "
+                      "(LIKE pitcher_game_logs INCLUDING DEFAULTS) ON COMMIT DROP")
+    assert copy == ("COPY _stage_pitcher_game_logs (game_id, side, date, pitcher_id, era) "
+                    "FROM STDIN WITH (FORMAT csv, NULL '\\N')")
+    # Last write wins within the batch; NULLs as \N; no "11.0"
+    assert payload.splitlines() == ["1,home,2026-04-01,11,4.0", "2,away,2026-04-02,\\N,\\N"]
+    assert merge == (
+        "INSERT INTO pitcher_game_logs (game_id, side, date, pitcher_id, era) "
+        "SELECT game_id, side, date, pitcher_id, era FROM _stage_pitcher_game_logs "
+        "ON CONFLICT (game_id, side) DO UPDATE SET "
+        "date = EXCLUDED.date, pitcher_id = EXCLUDED.pitcher_id, era = EXCLUDED.era"
+    )
+    assert (commit, close) == (("commit",), ("close",))
+
+
+def test_upsert_key_only_frame_does_nothing_on_conflict(recorded_upsert):
+    upsert_table(pd.DataFrame({"game_id": [1], "side": ["home"]}), "pitcher_game_logs", ["game_id", "side"])
+    assert recorded_upsert[2][1].endswith("ON CONFLICT (game_id, side) DO NOTHING")
+
+
+def test_upsert_rejects_unknown_columns(recorded_upsert):
+    with pytest.raises(ValueError, match="no column"):
+        upsert_table(pd.DataFrame({"game_id": [1], "side": ["home"], "whoops": [1]}),
+                     "pitcher_game_logs", ["game_id", "side"])
+    assert recorded_upsert == []
+
+
+# ─────────────────────────────────────────────
+# PITCHER AS-OF STATS — prior-season fallback
+# ─────────────────────────────────────────────
+
+def _as_of_row(current=None, prior=None, throws="R", prior_throws="R"):
+    """A PITCHER_AS_OF_SQL row; current/prior are (outs, er, h, bb, k, go, ao) totals or None."""
+    row = {
+        "pitcher_id": 1, "season": 2026, "before_date": "2026-04-10",
+        "throws": throws, "era_vs_rhb": 3.5, "whip_vs_rhb": 1.1,
+        "prior_throws": prior_throws, "prior_era_vs_rhb": 3.9, "prior_whip_vs_rhb": 1.2,
+    }
+    for prefix, totals in (("", current), ("prior_", prior)):
+        fields = dict(zip(("outs", "er", "h", "bb", "k", "go", "ao"), totals or (None,) * 7))
+        row.update({prefix + f: v for f, v in fields.items()})
+        row.update({f"{prefix}{f}_last5": fields[f] for f in ("outs", "er", "h", "bb", "k")})
+        row[prefix + "appearances"] = 1 if totals else None
+        row[prefix + "starts"]      = 1 if totals else None
+    return row
+
+
+def test_qualified_current_season_is_used():
+    stats = pitcher_stats_from_row(_as_of_row(current=(PITCHER_MIN_OUTS, 5, 8, 2, 12, 10, 10),
+                                              prior=(540, 60, 150, 50, 180, 200, 200)))
+    assert stats["stats_season"] == 2026
+    assert stats["era"] == pytest.approx(4.5)
+    assert (stats["era_vs_rhb"], stats["gb_rate"]) == (3.5, 0.5)
+
+
+def test_thin_current_season_falls_back_to_prior():
+    # One 2-inning, 4-run opener — the Chad Patrick case
+    stats = pitcher_stats_from_row(_as_of_row(current=(6, 4, 5, 2, 1, 2, 3),
+                                              prior=(540, 60, 150, 50, 180, 300, 200)))
+    assert stats["stats_season"] == 2025
+    assert stats["era"] == pytest.approx(3.0)
+    assert (stats["era_vs_rhb"], stats["gb_rate"]) == (3.9, 0.6)
+
+
+def test_no_qualified_season_is_league_average():
+    stats = pitcher_stats_from_row(_as_of_row(current=(6, 4, 5, 2, 1, 2, 3), prior=(9, 0, 2, 0, 3, 1, 1),
+                                              throws="L"))
+    assert stats["stats_season"] is None
+    assert stats["throws"] == "L"
+    assert {k: stats[k] for k in PITCHER_LEAGUE_AVG} == PITCHER_LEAGUE_AVG
+
+
+def test_prior_profile_supplies_handedness():
+    stats = pitcher_stats_from_row(_as_of_row(prior=(540, 60, 150, 50, 180, 200, 200), throws=None, prior_throws="L"))
+    assert (stats["stats_season"], stats["throws"]) == (2025, "L")
+    assert pitcher_stats_from_row(_as_of_row(throws=None, prior_throws=None)) is None
+
+
+# ─────────────────────────────────────────────
+# PITCHER PROFILE STALENESS — what warm_pitcher_appearances re-hydrates
+# ─────────────────────────────────────────────
+
+TODAY = date(2026, 4, 10)
+
+
+@pytest.mark.parametrize("updated_at,season,day,current", [
+    (None,                         2026, date(2026, 4, 12), False),   # never stored
+    (datetime(2026, 4, 10, 7, 0),  2026, date(2026, 4, 12), True),    # upcoming game, refreshed today
+    (datetime(2026, 4, 9, 23, 0),  2026, date(2026, 4, 12), False),   # upcoming game, refreshed yesterday
+    (datetime(2026, 4, 9, 23, 0),  2026, date(2026, 4, 9),  True),    # past game, refreshed that day
+    (datetime(2025, 6, 1),         2025, date(2025, 6, 15), False),   # past game, refreshed before it
+    (datetime(2026, 1, 5),         2025, date(2026, 4, 12), True),    # prior season, refreshed after it ended
+])
+def test_profile_is_current(updated_at, season, day, current):
+    assert profile_is_current(updated_at, season, day, today=TODAY) is current
+
+
+# ─────────────────────────────────────────────
+# PROBABLE STARTER DIFF — one (game_id, side) across successive sweeps
+# ─────────────────────────────────────────────
+
+def _sweep(prev, pitcher_id, now):
+    """Classify, then build the row the next sweep will see as prev."""
+    status, history = classify_probable(prev, pitcher_id, now)
+    return status, {"pitcher_id": pitcher_id, **history}
+
+
+def test_probable_transitions():
+    t = [datetime(2026, 4, 8, h) for h in range(6)]
+
+    status, row = _sweep(None, None, t[0])
+    assert (status, row["changed_at"]) == (None, None)                  # TBD, still TBD
+
+    status, row = _sweep(row, 111, t[1])
+    assert status == "new"
+    assert (row["previous_pitcher_id"], row["changed_at"]) == (None, None)
+
+    status, row = _sweep(row, 111, t[2])
+    assert status == "unchanged"
+    assert (row["previous_pitcher_id"], row["changed_at"]) == (None, None)
+
+    status, row = _sweep(row, 222, t[3])
+    assert status == "changed"
+    assert (row["previous_pitcher_id"], row["changed_at"]) == (111, t[3])
+
+    status, row = _sweep(row, None, t[4])
+    assert status == "scratched"
+    assert (row["pitcher_id"], row["previous_pitcher_id"], row["changed_at"]) == (None, 222, t[4])
+
+    status, row = _sweep(row, 333, t[5])
+    assert status == "new"                                               # re-announced after the scratch
+    assert (row["pitcher_id"], row["previous_pitcher_id"], row["changed_at"]) == (333, 222, t[4])
+
+
+def test_first_sight_of_a_tbd_slot_is_not_a_scratch():
+    assert classify_probable(None, None, datetime(2026, 4, 8)) == (
+        None, {"previous_pitcher_id": None, "changed_at": None},
+    )
+
+
+# ─────────────────────────────────────────────
+# BULLPEN AS-OF STATS — strictly before the game date
+# ─────────────────────────────────────────────
+
+def _relief_log():
+    """
+    Team pitching game log: every 2nd day from Apr 1, a starter (excluded) and
+    two relievers with 1 IP each; Apr 11 is a doubleheader with a second pair.
+    """
+    splits = []
+    for i in range(15):
+        day = (pd.Timestamp("2025-04-01") + pd.Timedelta(days=2 * i)).strftime("%Y-%m-%d")
+        splits.append({"date": day, "stat": {"gamesStarted": 1, "inningsPitched": "6.0", "earnedRuns": 9,
+                                             "hits": 9, "baseOnBalls": 9, "strikeOuts": 9}})
+        for _ in range(4 if day == "2025-04-11" else 2):
+            splits.append({"date": day, "stat": {"gamesStarted": 0, "inningsPitched": "1.0", "earnedRuns": 1,
+                                                 "hits": 1, "baseOnBalls": 0, "strikeOuts": 2}})
+    return splits
+
+
+def test_bullpen_as_of_uses_only_earlier_dates():
+    splits = _relief_log()
+    log    = build_bullpen_season_log({"stats": [{"splits": splits}]})
+
+    for day in pd.date_range("2025-03-30", "2025-05-05").strftime("%Y-%m-%d"):
+        relief = [g["stat"] for g in splits if g["date"] < day and not g["stat"]["gamesStarted"]]
+        outs   = 3 * len(relief)
+        stats  = bullpen_stats_as_of(log, day)
+        if outs < BULLPEN_MIN_OUTS:
+            assert stats is None, day
+            continue
+        # Every relief inning here is 1 ER, 1 H, 0 BB, 2 K — rates don't move, the sample does
+        assert stats == {"bullpen_era": 9.0, "bullpen_whip": 1.0, "bullpen_k_per_9": 18.0}, day
+
+
+def test_bullpen_threshold_counts_a_day_only_after_it():
+    log = build_bullpen_season_log({"stats": [{"splits": _relief_log()}]})
+    # Apr 1-9: 5 days x 6 outs = 30; the Apr 11 doubleheader adds 12; Apr 13, 15, 17 add 6 each
+    assert bullpen_stats_as_of(log, "2025-04-01") is None                  # before the first appearance
+    assert log["cum"]["outs"][5:7] == [30, 42]                            # both Apr 11 games on one date
+    assert bullpen_stats_as_of(log, "2025-04-17") is None                  # 54 outs — Apr 17 not yet counted
+    assert bullpen_stats_as_of(log, "2025-04-18") is not None              # 60 outs
+
+
+def test_get_bullpen_stats_falls_back_to_league_average(monkeypatch):
+    log = build_bullpen_season_log({"stats": [{"splits": _relief_log()}]})
+    monkeypatch.setattr(data_collection, "get_bullpen_season_log", lambda team_id, season: log)
+    assert get_bullpen_stats(118, 2025, before_date="2025-04-02") == BULLPEN_LEAGUE_AVG
+    assert get_bullpen_stats(118, 2025, before_date="2025-05-01")["bullpen_era"] == 9.0
+
+    monkeypatch.setattr(data_collection, "get_bullpen_season_log", lambda team_id, season: None)
+    assert get_bullpen_stats(118, 2025, before_date="2025-05-01") == BULLPEN_LEAGUE_AVG
+
+
+# ─────────────────────────────────────────────
+# INCREMENTAL WATERMARKS — MAX(date) from a stubbed engine
+# ─────────────────────────────────────────────
+
+@pytest.fixture
+def watermark_db(monkeypatch):
+    """get_engine() returning MAX(date) = the fixture's value; records the SQL run."""
+    db   = {"max_date": None, "queries": []}
+    conn = mock.MagicMock()
+
+    def execute(sql, params):
+        db["queries"].append((str(sql), params))
+        return mock.Mock(fetchone=mock.Mock(return_value=(db["max_date"],)))
+
+    conn.__enter__.return_value.execute.side_effect = execute
+    monkeypatch.setattr(data_collection, "get_engine", lambda: mock.Mock(connect=mock.Mock(return_value=conn)))
+    return db
+
+
+@pytest.fixture
+def fetched_seasons(monkeypatch):
+    """fetch_player_game_logs returning one game a day around the 2025 watermark; yields the seasons asked for."""
+    calls = []
+
+    def fetch(player_id, seasons):
+        calls.append(seasons)
+        dates = ["2025-06-01", "2025-06-02", "2025-06-02", "2025-06-03"]
+        return pd.DataFrame({"game_id": range(len(dates)), "player_id": player_id, "date": dates})
+
+    monkeypatch.setattr(data_collection, "fetch_player_game_logs", fetch)
+    return calls
+
+
+def test_empty_table_has_no_watermark_and_pulls_every_season(watermark_db, fetched_seasons):
+    assert get_player_watermark(677951) is None
+    assert watermark_db["queries"][-1][1] == {"pid": 677951}
+
+    watermark, df = fetch_new_game_logs(677951, 2026)
+    assert watermark is None
+    assert fetched_seasons == [list(range(START_SEASON, 2027))]
+    assert len(df) == 4
+
+
+def test_watermark_pulls_its_season_on_and_keeps_games_from_its_date(watermark_db, fetched_seasons):
+    watermark_db["max_date"] = date(2025, 6, 2)
+    assert get_player_watermark(677951) == date(2025, 6, 2)
+
+    watermark, df = fetch_new_game_logs(677951, 2026)
+    assert watermark == date(2025, 6, 2)
+    assert fetched_seasons == [[2025, 2026]]
+    # The watermark day is re-pulled — a doubleheader's second game may have landed after the last run
+    assert df["date"].tolist() == ["2025-06-02", "2025-06-02", "2025-06-03"]
+    assert df.index.tolist() == [0, 1, 2]
+
+
+def test_full_refresh_ignores_the_watermark(watermark_db, fetched_seasons):
+    watermark_db["max_date"] = date(2025, 6, 2)
+    watermark, df = fetch_new_game_logs(677951, 2026, full_refresh=True)
+    assert watermark is None
+    assert watermark_db["queries"] == []
+    assert fetched_seasons == [list(range(START_SEASON, 2027))]
+    assert len(df) == 4
@@ -0,0 +1,64 @@
+### test_feature_store.py - Training rows vs serving rows
+# build_player_features() (training) and _next_game_row() (serving) must
+# derive the same feature values from the same game context.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_store
+from statcast_features import RollingFeatures
+
+
+def _training_rows(monkeypatch, throws):
+    """build_player_features() over one stored game per starter hand, no DB or Statcast cache."""
+    base = pd.DataFrame({
+        "game_id":     range(1, len(throws) + 1),
+        "player_id":   677951,
+        "date":        pd.date_range("2025-06-01", periods=len(throws), freq="2D"),
+        "season":      2025,
+        "home_away":   "home",
+        "opponent_id": 114,
+        "hr":          0,
+        "tb":          1,
+        "pitcher_id":  range(100, 100 + len(throws)),
+        "throws":      throws,
+        **{col: 1.0 for col in feature_store.PITCHER_COLUMNS if col != "throws"},
+        "is_first_time_opponent": False,
+        **{col: 1.0 for col in feature_store.BULLPEN_COLUMNS},
+        "park_factor": 100, "park_factor_hr": 100,
+    })
+    monkeypatch.setattr(feature_store, "_load_base", lambda pid, team_id: base)
+    monkeypatch.setattr(feature_store, "_load_statcast_features",
+                        lambda pid: pd.DataFrame(columns=["game_pk"]))
+    return feature_store.build_player_features(677951, 118)
+
+
+def _serving_row(throws):
+    ctx = {
+        "last_date": None, "is_first_time_opponent": True,
+        "park_factor": 100, "park_factor_hr": 100, "bullpen_era": None,
+    }
+    pitcher = {**{col: 1.0 for col in feature_store.PITCHER_COLUMNS}, "throws": throws}
+    matchup = {"player_id": 677951, "game_pk": 1, "opponent_id": 114, "is_home": 1, "pitcher_id": 100}
+    return feature_store._next_game_row(matchup, pd.Timestamp("2026-04-02"), ctx, pitcher,
+                                        RollingFeatures(), with_bullpen=False)
+
+
+def test_pitcher_r_matches_between_training_and_serving(monkeypatch):
+    hands    = ["R", "L", None]
+    training = _training_rows(monkeypatch, hands)["pitcher_r"].tolist()
+    serving  = [_serving_row(hand)["pitcher_r"] for hand in hands]
+
+    np.testing.assert_array_equal(training, serving)
+    assert training[:2] == [1, 0]
+    assert np.isnan(training[2])    # unknown hand is not a left-hander
+
+
+def test_unknown_hand_rows_are_dropped_from_training(monkeypatch):
+    df = _training_rows(monkeypatch, ["R", None, "L"])
+    monkeypatch.setattr(feature_store, "load_player", lambda pid: df)
+
+    frame = feature_store.training_frame([677951], ["pitcher_r", "era"])
+    assert frame["game_id"].tolist() == [1, 3]
+    assert frame["pitcher_r"].tolist() == pytest.approx([1, 0])
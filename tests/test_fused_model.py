@@ -0,0 +1,41 @@
+### test_fused_model.py - Fused NumPy scorer vs scaler + sklearn
+# FusedLogistic must give the same probabilities as predict_proba on the
+# scaled features, for every StandardScaler mode, before and after a round trip.
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from fused_model import FusedLogistic, export_fused, fuse
+
+
+# ─────────────────────────────────────────────
+# FUSED SCORER
+# ─────────────────────────────────────────────
+
+@pytest.mark.parametrize("with_mean,with_std", [(True, True), (False, True), (True, False)])
+def test_fused_matches_sklearn(tmp_path, with_mean, with_std):
+    rng      = np.random.default_rng(11)
+    features = ["barrel_rate_15", "era", "park_factor", "pitcher_r"]
+    X = pd.DataFrame({
+        "barrel_rate_15": rng.normal(0.08, 0.03, 400),
+        "era":            rng.normal(4.2, 1.0, 400),
+        "park_factor":    rng.normal(100, 5, 400),
+        "pitcher_r":      rng.integers(0, 2, 400),
+    })
+    y = (rng.random(400) < 0.15).astype(int)
+
+    scaler   = StandardScaler(with_mean=with_mean, with_std=with_std).fit(X)
+    model    = LogisticRegression(C=0.5).fit(scaler.transform(X), y)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+
+    coef, intercept = fuse(model, scaler)
+    np.testing.assert_allclose(FusedLogistic(features, coef, intercept).predict_proba(X), expected, rtol=1e-10)
+
+    # Round trip through the artifact, with the columns shuffled — picked by name
+    path   = export_fused(model, scaler, features, str(tmp_path / "m.npz"), baseline=0.15, source="abc")
+    scorer = FusedLogistic.load(path)
+    assert (scorer.features, scorer.baseline, scorer.source) == (features, 0.15, "abc")
+    np.testing.assert_allclose(scorer.predict_proba(X[features[::-1]]), expected, rtol=1e-10)
@@ -0,0 +1,51 @@
+### test_statcast_features.py - Serving vs training rolling features
+# RollingFeatures.as_of() (the O(1) serving state) must reproduce
+# add_rolling_features() (the vectorized training pass) game for game.
+
+import numpy as np
+import pandas as pd
+
+from statcast_features import RollingFeatures, add_rolling_features, aggregate_games, rolling_feature_names
+
+
+# ─────────────────────────────────────────────
+# ROLLING FEATURES
+# ─────────────────────────────────────────────
+
+def _pitches(rng, batter, n_games, first_pk):
+    """Synthetic pitch-level Statcast rows — games 10 and 11 are a doubleheader."""
+    rows = []
+    for i in range(n_games):
+        date = pd.Timestamp("2025-04-01") + pd.Timedelta(days=i if i <= 10 else i - 1)
+        for _ in range(rng.integers(1, 6)):
+            rows.append({
+                "batter":             batter,
+                "game_pk":            first_pk + i,
+                "game_date":          date,
+                "launch_speed":       rng.normal(90, 8),
+                "launch_angle":       rng.normal(15, 20),
+                "launch_speed_angle": rng.integers(1, 7),
+            })
+        rows.append({**rows[-1], "launch_speed": np.nan})   # a pitch with no batted ball
+    return rows
+
+
+def test_rolling_state_matches_training_features():
+    rng     = np.random.default_rng(7)
+    pitches = pd.DataFrame(_pitches(rng, 1, 45, 1000) + _pitches(rng, 2, 20, 5000))
+    games   = add_rolling_features(aggregate_games(pitches))
+    names   = rolling_feature_names()
+
+    for _, history in games.groupby("batter"):
+        state = RollingFeatures()
+        for _, game in history.iterrows():
+            served = state.as_of()
+            np.testing.assert_allclose(
+                [served[name] for name in names], game[names].to_numpy(dtype="float64"),
+                rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=f"game_pk {game['game_pk']}",
+            )
+            assert state.update(game)
+
+        restored = RollingFeatures.from_dict(state.to_dict())
+        assert restored.as_of().keys() == state.as_of().keys()
+        np.testing.assert_allclose(list(restored.as_of().values()), list(state.as_of().values()), equal_nan=True)